@@ -12,9 +12,14 @@ from time import perf_counter
 import numpy as np
 from scipy.interpolate import interp1d
 
+from kernels import egm_step, resolve_backend
+from telemetry import report, warn_not_converged
+from utility import CRRA, preferences
 
 
-def egm(par, tol=1.0e-8, maxiter=10000):
+
+def egm(par, tol=1.0e-8, maxiter=10000, backend='numpy', accelerator=None,
+        pfun_c_init=None, callback=None):
     """
     Solve infinite-horizon problem with deterministic labour income using EGM.
 
@@ -26,6 +31,18 @@ def egm(par, tol=1.0e-8, maxiter=10000):
         Termination tolerance
     maxiter : int, optional
         Max. number of iterations
+    backend : str, optional
+        If 'numba', perform each EGM iteration using a compiled kernel.
+        Falls back to 'numpy' if Numba is not installed.
+    accelerator : object, optional
+        Convergence accelerator applied to the consumption policy in each
+        iteration, see Anderson, Aitken and Damped in accelerate.py.
+    pfun_c_init : np.ndarray, optional
+        Initial guess for the consumption policy function. Defaults to
+        cash-at-hand.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. The solver does not report progress otherwise.
 
     Returns
     -------
@@ -37,44 +54,71 @@ def egm(par, tol=1.0e-8, maxiter=10000):
 
     t0 = perf_counter()
 
-    N_a = len(par.grid_a)
+    N_a = par.N_a
 
     # Cash-at-hand at every asset/savings level
-    cah = (1.0 + par.r) * par.grid_a + par.y
+    cah = par.cah
 
     # Initial guess for consumption policy function
-    pfun_c = np.copy(cah)
+    if pfun_c_init is None:
+        pfun_c = np.copy(cah)
+    else:
+        pfun_c = np.array(pfun_c_init, dtype=float)
     pfun_c_upd = np.zeros(N_a)
 
     # Extract parameters from par object
     beta, gamma, r = par.beta, par.gamma, par.r
 
-    for it in range(maxiter):
-
-        # Marginal utility tomorrow
-        mu = pfun_c**(-gamma)
-        # Compute right-hand side of Euler equation (EE)
-        ee_rhs = beta * (1.0 + r) * mu
+    backend = resolve_backend(backend)
 
-        # Invert EE to get consumption as a function of savings today
-        cons_sav = ee_rhs**(-1.0/gamma)
+    util = preferences(par)
+    if backend == 'numba' and type(util) is not CRRA:
+        msg = 'Numba backend only supports CRRA utility'
+        raise ValueError(msg)
 
-        # Use budget constraint to get beginning-of-period assets
-        assets_sav = (cons_sav + par.grid_a - par.y) / (1.0 + r)
+    if accelerator is not None:
+        accelerator.reset()
+    if backend == 'numba':
+        # Deterministic problem is a special case with a single income state
+        grid_y = np.array([par.y])
+        tm_y = np.ones((1, 1))
 
-        # Interpolate back onto exogenous savings grid
-        f_cons = interp1d(
-            assets_sav, cons_sav, 
-            copy=False, assume_sorted=True,
-            bounds_error=False, fill_value='extrapolate'
-        )
-        pfun_c_upd[:] = f_cons(par.grid_a)
+    for it in range(maxiter):
 
-        # Fix consumption in region where HH does not save
-        amin = assets_sav[0]
-        idx = np.where(par.grid_a <= amin)[0]
-        # HH consumes entire cash-at-hand
-        pfun_c_upd[idx] = cah[idx]
+        t1 = perf_counter()
+
+        if backend == 'numba':
+            egm_step(
+                pfun_c[None], cah[None], par.grid_a, grid_y, tm_y,
+                beta, gamma, r, pfun_c_upd[None]
+            )
+        else:
+            # Marginal utility tomorrow
+            mu = util.marginal(pfun_c)
+            # Compute right-hand side of Euler equation (EE)
+            ee_rhs = beta * (1.0 + r) * mu
+
+            # Invert EE to get consumption as a function of savings today
+            cons_sav = util.inverse_marginal(ee_rhs)
+
+            # Use budget constraint to get beginning-of-period assets
+            assets_sav = (cons_sav + par.grid_a - par.y) / (1.0 + r)
+
+            # Interpolate back onto exogenous savings grid
+            f_cons = interp1d(
+                assets_sav, cons_sav, 
+                copy=False, assume_sorted=True,
+                bounds_error=False, fill_value='extrapolate'
+            )
+            pfun_c_upd[:] = f_cons(par.grid_a)
+
+            # Fix consumption in region where HH does not save
+            amin = assets_sav[0]
+            idx = np.where(par.grid_a <= amin)[0]
+            # HH consumes entire cash-at-hand
+            pfun_c_upd[idx] = cah[idx]
+
+        time_max = perf_counter() - t1
 
         # Make sure that consumption policy satisfies constraints
         assert np.all(pfun_c_upd >= 0.0) and np.all(pfun_c_upd <= cah)
@@ -83,22 +127,21 @@ def egm(par, tol=1.0e-8, maxiter=10000):
         # iteration.
         diff = np.max(np.abs(pfun_c - pfun_c_upd))
 
-        # switch references to policy functions for next iteration
-        pfun_c, pfun_c_upd = pfun_c_upd, pfun_c
+        if accelerator is None or diff < tol:
+            # switch references to policy functions for next iteration
+            pfun_c, pfun_c_upd = pfun_c_upd, pfun_c
+        else:
+            # Accelerate in terms of log consumption, which guarantees
+            # positive consumption, and enforce budget constraint.
+            log_c = accelerator.update(np.log(pfun_c), np.log(pfun_c_upd))
+            pfun_c = np.minimum(np.exp(log_c), cah)
+
+        report(callback, 'EGM', it, diff, perf_counter() - t0, time_max, tol)
 
         if diff < tol:
-            # Convergence achieved, exit loop
-            td = perf_counter() - t0
-            msg = f'EGM: Converged after {it:d} iterations ({td:.3f} sec.): ' \
-                  f'd(c)={diff:4.2e}'
-            print(msg)
             break
-        elif it == 1 or it % 10 == 0:
-            msg = f'EGM: Iteration {it:4d}, dV={diff:4.2e}'
-            print(msg)
     else:
-        msg = f'Did not converge in {it:d} iterations'
-        print(msg)
+        warn_not_converged('EGM', maxiter, diff)
 
     pfun_a = cah - pfun_c
 
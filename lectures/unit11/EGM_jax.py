@@ -0,0 +1,491 @@
+"""
+Differentiable EGM solver for the model with risky labour income,
+implemented with JAX.
+
+The batched EGM step (all income states at once) and the forward step of
+the stationary distribution are written as pure JAX functions. Both
+fixed points are computed by iteration, and their derivatives are obtained
+by implicit differentiation: at a fixed point x = f(x, theta),
+    dx/dtheta = (I - df/dx)^(-1) df/dtheta
+so the backward pass solves one linear (adjoint) fixed-point problem
+instead of differentiating through all iterations. A single solve
+therefore yields exact gradients of aggregate moments with respect to all
+parameters at once, at a cost of roughly two solves per moment.
+
+JAX is optional. If it is not installed, value_and_jacobian() falls back
+to central finite differences using the NumPy solver in EGM_risk.py.
+Importing this module enables 64-bit floats in JAX.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import warnings
+from dataclasses import fields, replace
+from functools import lru_cache, partial
+
+import numpy as np
+
+try:
+    import jax
+    import jax.numpy as jnp
+    from jax import lax
+except ImportError:
+    jax = None
+
+HAS_JAX = jax is not None
+
+if HAS_JAX:
+    # Solvers require double precision to attain the usual tolerances
+    jax.config.update('jax_enable_x64', True)
+
+from EGM_risk import egm
+from distribution import stationary_distribution
+from parameters import with_income
+from utility import CRRA
+
+# Parameters with respect to which moments can be differentiated
+FIELDS = ('beta', 'gamma', 'r', 'rho', 'sigma')
+
+# Aggregate moments returned by aggregates()
+MOMENTS = ('A', 'C')
+
+
+def rouwenhorst(n, rho, sigma):
+    """
+    Discretise log labour income using the Rouwenhorst method, such that
+    the result is differentiable with respect to rho and sigma. Income
+    states are normalised to have an unconditional mean of 1.0, as in
+    main_risk.py.
+
+    Parameters
+    ----------
+    n : int
+        Number of states
+    rho : float
+        Autocorrelation of log labour income
+    sigma : float
+        Conditional standard deviation of log labour income
+
+    Returns
+    -------
+    grid_y : jax.Array
+        Labour income states
+    tm_y : jax.Array
+        Transition matrix
+    """
+
+    if n == 1:
+        return jnp.ones(1), jnp.ones((1, 1))
+
+    # Recursive construction of Kopecky & Suen (2010)
+    p = (1.0 + rho) / 2.0
+    tm_y = jnp.array([[p, 1.0 - p], [1.0 - p, p]])
+    for m in range(3, n + 1):
+        z = jnp.zeros((m - 1, 1))
+        z_row = jnp.zeros((1, m))
+        tm_y = (
+            p * jnp.block([[tm_y, z], [z_row]])
+            + (1.0 - p) * jnp.block([[z, tm_y], [z_row]])
+            + (1.0 - p) * jnp.block([[z_row], [tm_y, z]])
+            + p * jnp.block([[z_row], [z, tm_y]])
+        )
+        tm_y = tm_y.at[1:-1].divide(2.0)
+
+    fi = jnp.sqrt(n - 1.0) * sigma / jnp.sqrt(1.0 - rho**2)
+    grid_y = jnp.exp(jnp.linspace(-fi, fi, n))
+
+    # Ergodic distribution solves edist' (I - P) = 0 with sum(edist) = 1
+    lhs = (tm_y.T - jnp.eye(n)).at[-1].set(1.0)
+    rhs = jnp.zeros(n).at[-1].set(1.0)
+    edist = jnp.linalg.solve(lhs, rhs)
+    grid_y = grid_y / jnp.dot(edist, grid_y)
+
+    return grid_y, tm_y
+
+
+def _interp_extrap(x, xp, fp):
+    # Linearly interpolate a single row, extrapolating with the slopes of
+    # the first and last segment (same as interp_rows(..., extrapolate=True))
+    fx = jnp.interp(x, xp, fp)
+    lo = fp[0] + (fp[1] - fp[0]) / (xp[1] - xp[0]) * (x - xp[0])
+    hi = fp[-1] + (fp[-1] - fp[-2]) / (xp[-1] - xp[-2]) * (x - xp[-1])
+    fx = jnp.where(x < xp[0], lo, fx)
+    fx = jnp.where(x > xp[-1], hi, fx)
+    return fx
+
+
+def egm_step(pfun_c, theta):
+    """
+    Perform one EGM iteration for all income states at once.
+
+    Parameters
+    ----------
+    pfun_c : jax.Array
+        Next-period consumption policy function, shape (N_y, N_a)
+    theta : tuple
+        Tuple (model, grid_a) where model is a dict with keys 'beta',
+        'gamma', 'r', 'grid_y' and 'tm_y'.
+
+    Returns
+    -------
+    jax.Array
+        Updated consumption policy function
+    """
+
+    model, grid_a = theta
+    beta, gamma, r = model['beta'], model['gamma'], model['r']
+    grid_y = model['grid_y']
+
+    # Expected marginal utility tomorrow for each (y, a')
+    mu = jnp.dot(model['tm_y'], pfun_c**(-gamma))
+
+    # Invert EE to get consumption as a function of savings today
+    cons_sav = (beta * (1.0 + r) * mu)**(-1.0 / gamma)
+
+    # Use budget constraint to get beginning-of-period assets
+    assets_sav = (cons_sav + grid_a - grid_y[:, None]) / (1.0 + r)
+
+    # Interpolate back onto exogenous asset grid, separately for each
+    # income state
+    pfun_c_upd = jax.vmap(_interp_extrap, in_axes=(None, 0, 0))(
+        grid_a, assets_sav, cons_sav
+    )
+
+    # HH consumes entire cash-at-hand in region where it does not save
+    cah = (1.0 + r) * grid_a + grid_y[:, None]
+    pfun_c_upd = jnp.where(grid_a <= assets_sav[:, :1], cah, pfun_c_upd)
+
+    return pfun_c_upd
+
+
+def distribution_step(dist, theta):
+    """
+    Move the distribution over (y, a) one period forward.
+
+    Savings choices between two grid points are assigned to these grid
+    points with lottery weights, as in distribution.py.
+
+    Parameters
+    ----------
+    dist : jax.Array
+        Distribution, shape (N_y, N_a)
+    theta : tuple
+        Tuple (pfun_a, tm_y, grid_a) of the savings policy function,
+        the income transition matrix and the asset grid.
+
+    Returns
+    -------
+    jax.Array
+        Distribution in the next period
+    """
+
+    pfun_a, tm_y, grid_a = theta
+    N_y, N_a = dist.shape
+
+    # Savings outside of the grid are assigned to the boundary points
+    a_to = jnp.clip(pfun_a, grid_a[0], grid_a[-1])
+    ilo = jnp.searchsorted(grid_a, a_to, side='right') - 1
+    ilo = jnp.clip(ilo, 0, N_a - 2)
+    wgt = (grid_a[ilo + 1] - a_to) / (grid_a[ilo + 1] - grid_a[ilo])
+
+    iy = jnp.broadcast_to(jnp.arange(N_y)[:, None], (N_y, N_a))
+    dist_a = jnp.zeros_like(dist)
+    dist_a = dist_a.at[iy, ilo].add(dist * wgt)
+    dist_a = dist_a.at[iy, ilo + 1].add(dist * (1.0 - wgt))
+
+    # Realisation of next-period labour income
+    return jnp.dot(tm_y.T, dist_a)
+
+
+def _iterate(f, x0, theta, tol, maxiter):
+    # Iterate x = f(x, theta) until the max. absolute change is below tol
+    def cond(state):
+        it, x, diff = state
+        return (diff >= tol) & (it < maxiter)
+
+    def body(state):
+        it, x, diff = state
+        x_upd = f(x, theta)
+        return it + 1, x_upd, jnp.max(jnp.abs(x_upd - x))
+
+    _, x, _ = lax.while_loop(cond, body, (0, x0, jnp.inf))
+    return x
+
+
+def _fixed_point(f, x0, theta, tol, maxiter, normalise):
+    return _iterate(f, x0, theta, tol, maxiter)
+
+
+def _fixed_point_fwd(f, x0, theta, tol, maxiter, normalise):
+    x = _iterate(f, x0, theta, tol, maxiter)
+    return x, (x, theta)
+
+
+def _fixed_point_bwd(f, tol, maxiter, normalise, res, x_bar):
+    x, theta = res
+    _, vjp_x = jax.vjp(lambda y: f(y, theta), x)
+    _, vjp_theta = jax.vjp(lambda t: f(x, t), theta)
+
+    if normalise:
+        # Fixed point is a distribution with fixed total mass, so the
+        # adjoint system is only solvable for cotangents orthogonal to x,
+        # and its solution is only determined up to a constant. Remove
+        # the constant in each iteration as it would otherwise drift due
+        # to rounding errors.
+        x_bar = x_bar - jnp.vdot(x, x_bar)
+
+        def step(u, _):
+            u = x_bar + vjp_x(u)[0]
+            return u - jnp.vdot(x, u)
+    else:
+        def step(u, _):
+            return x_bar + vjp_x(u)[0]
+
+    # Adjoint fixed point u = x_bar + (df/dx)' u
+    u = _iterate(step, x_bar, None, tol, maxiter)
+    theta_bar, = vjp_theta(u)
+
+    return jnp.zeros_like(x), theta_bar
+
+
+if HAS_JAX:
+    _fixed_point = jax.custom_vjp(_fixed_point, nondiff_argnums=(0, 3, 4, 5))
+    _fixed_point.defvjp(_fixed_point_fwd, _fixed_point_bwd)
+
+
+def fixed_point(f, x0, theta, tol=1.0e-8, maxiter=10000, normalise=False):
+    """
+    Compute fixed point x = f(x, theta) by iteration, differentiable with
+    respect to theta by implicit differentiation.
+
+    Parameters
+    ----------
+    f : callable
+        Function f(x, theta) built from JAX operations
+    x0 : jax.Array
+        Initial guess. Derivatives with respect to x0 are zero.
+    theta : pytree
+        Parameters of f
+    tol : float, optional
+        Termination tolerance, used for both the forward and the adjoint
+        iterations.
+    maxiter : int, optional
+        Max. number of iterations
+    normalise : bool, optional
+        If true, f is a Markov operator acting on a distribution, so
+        that the fixed point is only determined up to scale.
+
+    Returns
+    -------
+    jax.Array
+    """
+    return _fixed_point(f, x0, theta, tol, maxiter, normalise)
+
+
+def _check_par(par):
+    # JAX solver only implements CRRA utility
+    util = getattr(par, 'utility', None)
+    if util is not None and type(util) is not CRRA:
+        msg = 'JAX solver only supports CRRA utility'
+        raise ValueError(msg)
+    if par.grid_y is None:
+        msg = 'JAX solver requires risky labour income'
+        raise ValueError(msg)
+
+
+def aggregates(theta, par, income='rouwenhorst', tol=1.0e-8, maxiter=10000,
+               dist_tol=1.0e-10, dist_maxiter=100000):
+    """
+    Solve household problem and compute aggregate moments in the
+    stationary distribution, differentiable with respect to theta.
+
+    Parameters
+    ----------
+    theta : dict
+        Maps a subset of names in FIELDS to (traced) parameter values.
+        Parameters not included are taken from par.
+    par : Parameters
+        Model parameters and asset grid
+    income : str, optional
+        If 'rouwenhorst', the income process is discretised from rho
+        and sigma with par.N_y states, see rouwenhorst(). If 'fixed',
+        par.grid_y and par.tm_y are used and do not depend on rho or sigma.
+    tol : float, optional
+        Termination tolerance for the household problem
+    maxiter : int, optional
+        Max. number of EGM iterations
+    dist_tol : float, optional
+        Termination tolerance for the stationary distribution
+    dist_maxiter : int, optional
+        Max. number of iterations for the stationary distribution
+
+    Returns
+    -------
+    dict
+        Aggregate assets 'A' and consumption 'C'
+    """
+
+    values = {name: theta.get(name, getattr(par, name)) for name in FIELDS}
+
+    if income == 'rouwenhorst':
+        grid_y, tm_y = rouwenhorst(par.N_y, values['rho'], values['sigma'])
+    elif income == 'fixed':
+        if 'rho' in theta or 'sigma' in theta:
+            msg = 'Fixed income process does not depend on rho or sigma'
+            raise ValueError(msg)
+        grid_y, tm_y = jnp.asarray(par.grid_y), jnp.asarray(par.tm_y)
+    else:
+        msg = f'Unknown income process: {income}'
+        raise ValueError(msg)
+
+    model = {
+        'beta': values['beta'], 'gamma': values['gamma'], 'r': values['r'],
+        'grid_y': grid_y, 'tm_y': tm_y,
+    }
+    grid_a = jnp.asarray(par.grid_a)
+    cah = (1.0 + model['r']) * grid_a + grid_y[:, None]
+
+    # Initial guess: consume cash-at-hand
+    pfun_c0 = lax.stop_gradient(cah)
+    pfun_c = fixed_point(egm_step, pfun_c0, (model, grid_a), tol, maxiter)
+    pfun_a = cah - pfun_c
+
+    # Initial guess: ergodic income and uniform asset distribution
+    N_y, N_a = pfun_c.shape
+    dist0 = jnp.full((N_y, N_a), 1.0 / (N_y * N_a))
+    dist = fixed_point(
+        distribution_step, dist0, (pfun_a, tm_y, grid_a),
+        dist_tol, dist_maxiter, normalise=True
+    )
+
+    A = jnp.sum(dist * pfun_a)
+    C = jnp.sum(dist * pfun_c)
+
+    return {'A': A, 'C': C}
+
+
+def _static(par, income):
+    # Copy of par with all parameters in FIELDS (and the income process,
+    # unless it is fixed) set to placeholder values. Parameters objects
+    # which only differ in these attributes map to the same compiled
+    # function.
+    values = {f.name: f.default for f in fields(par) if f.name in FIELDS}
+    if income != 'fixed':
+        values.update(grid_y=np.ones(par.N_y), tm_y=np.eye(par.N_y))
+    return replace(par, **values)
+
+
+@lru_cache(maxsize=16)
+def _compile(par, income, tol, dist_tol):
+    # Compiled function which returns aggregate moments and their
+    # derivatives with respect to all parameters in theta.
+    f = partial(aggregates, par=par, income=income, tol=tol, dist_tol=dist_tol)
+
+    def value_and_jac(theta):
+        values, vjp = jax.vjp(f, theta)
+        # One adjoint solve per moment yields derivatives with respect to
+        # all parameters. Solves for all moments are batched.
+        basis = {
+            m: jnp.eye(len(MOMENTS))[i] for i, m in enumerate(MOMENTS)
+        }
+        theta_bar, = jax.vmap(vjp)(basis)
+        return values, theta_bar
+
+    return jax.jit(value_and_jac)
+
+
+def _aggregates_numpy(par, income, tol, dist_tol):
+    # Aggregate moments computed with the NumPy solver
+    if income == 'rouwenhorst':
+        par = with_income(par, par.N_y)
+
+    pfun_a, pfun_c = egm(par, tol=tol)
+    _, A, C = stationary_distribution(par, pfun_a, pfun_c, tol=dist_tol)
+
+    return {'A': float(A), 'C': float(C)}
+
+
+def value_and_jacobian(par, wrt=('beta', 'sigma'), income='rouwenhorst',
+                       backend='jax', eps=1.0e-4, tol=1.0e-8,
+                       dist_tol=1.0e-10):
+    """
+    Compute aggregate moments and their derivatives with respect to
+    model parameters.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters and asset grid
+    wrt : sequence of str
+        Names of parameters in FIELDS
+    income : str, optional
+        Either 'rouwenhorst' or 'fixed', see aggregates()
+    backend : str, optional
+        If 'jax', derivatives are computed by implicit differentiation.
+        The compiled solver is reused for all parameter values on the
+        same grids, so only the first call incurs compilation time.
+        If 'numpy', or if JAX is not installed, derivatives are
+        approximated by central finite differences, which requires
+        2 * len(wrt) additional solves.
+    eps : float, optional
+        Relative step size for finite differences
+    tol : float, optional
+        Termination tolerance for the household problem
+    dist_tol : float, optional
+        Termination tolerance for the stationary distribution
+
+    Returns
+    -------
+    values : dict
+        Maps names in MOMENTS to their values
+    jac : dict
+        Maps names in MOMENTS to dicts which map names in wrt to
+        derivatives.
+    """
+
+    if backend not in ('numpy', 'jax'):
+        msg = f'Unknown backend: {backend}'
+        raise ValueError(msg)
+    if income not in ('rouwenhorst', 'fixed'):
+        msg = f'Unknown income process: {income}'
+        raise ValueError(msg)
+    # Parameters on which moments depend
+    names = FIELDS if income == 'rouwenhorst' else ('beta', 'gamma', 'r')
+    for name in wrt:
+        if name not in names:
+            msg = f'Cannot differentiate with respect to: {name}'
+            raise ValueError(msg)
+
+    _check_par(par)
+
+    if backend == 'jax' and not HAS_JAX:
+        msg = 'JAX is not installed, falling back to finite differences'
+        warnings.warn(msg, RuntimeWarning, stacklevel=2)
+        backend = 'numpy'
+
+    if backend == 'jax':
+        # All parameters are traced, so the compiled function can be reused
+        # for other parameter values on the same grids.
+        theta = {name: float(getattr(par, name)) for name in names}
+        f = _compile(_static(par, income), income, tol, dist_tol)
+        values, theta_bar = f(theta)
+        values = {m: float(v) for m, v in values.items()}
+        jac = {
+            m: {name: float(theta_bar[name][i]) for name in wrt}
+            for i, m in enumerate(MOMENTS)
+        }
+    else:
+        values = _aggregates_numpy(par, income, tol, dist_tol)
+        jac = {m: {} for m in MOMENTS}
+        for name in wrt:
+            x = getattr(par, name)
+            h = eps * max(1.0, abs(x))
+            up = _aggregates_numpy(replace(par, **{name: x + h}), income, tol, dist_tol)
+            dn = _aggregates_numpy(replace(par, **{name: x - h}), income, tol, dist_tol)
+            for m in MOMENTS:
+                jac[m][name] = float((up[m] - dn[m]) / (2.0 * h))
+
+    return values, jac
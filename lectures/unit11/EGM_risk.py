@@ -10,11 +10,18 @@ Author: Richard Foltyn
 
 from time import perf_counter
 import numpy as np
-from scipy.interpolate import interp1d
 
+from interpolation import interp_rows
+from kernels import egm_step, resolve_backend
+from parallel import StatePool
+from telemetry import report, warn_not_converged
+from utility import CRRA, preferences
 
 
-def egm(par, tol=1.0e-8, maxiter=10000):
+
+def egm(par, tol=1.0e-8, maxiter=10000, backend='numpy', workers=None,
+        executor='process', accelerator=None, pfun_c_init=None,
+        callback=None):
     """
     Solve infinite-horizon problem with stochastic labour income using EGM.
 
@@ -26,6 +33,23 @@ def egm(par, tol=1.0e-8, maxiter=10000):
         Termination tolerance
     maxiter : int, optional
         Max. number of iterations
+    backend : str, optional
+        If 'numba', perform each EGM iteration using a compiled kernel.
+        Falls back to 'numpy' if Numba is not installed.
+    workers : int, optional
+        If given, distribute the EGM step for each income state across
+        this many workers. Ignored if backend='numba'.
+    executor : str, optional
+        Type of worker pool, either 'process' or 'thread'.
+    accelerator : object, optional
+        Convergence accelerator applied to the consumption policy in each
+        iteration, see Anderson, Aitken and Damped in accelerate.py.
+    pfun_c_init : np.ndarray, optional
+        Initial guess for the consumption policy function. Defaults to
+        cash-at-hand.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. The solver does not report progress otherwise.
 
     Returns
     -------
@@ -37,73 +61,186 @@ def egm(par, tol=1.0e-8, maxiter=10000):
 
     t0 = perf_counter()
 
-    N_a, N_y = len(par.grid_a), len(par.grid_y)
+    N_a, N_y = par.N_a, par.N_y
     shape = (N_y, N_a)
 
     # Cash-at-hand at every asset/savings level
-    cah = (1.0 + par.r) * par.grid_a[None] + par.grid_y[:, None]
+    cah = par.cah
 
     # Initial guess for consumption policy function
-    pfun_c = np.copy(cah)
+    if pfun_c_init is None:
+        pfun_c = np.copy(cah)
+    else:
+        pfun_c = np.array(pfun_c_init, dtype=float)
     pfun_c_upd = np.zeros(shape)
 
     # Extract parameters from par object
     beta, gamma, r = par.beta, par.gamma, par.r
 
-    for it in range(maxiter):
+    backend = resolve_backend(backend)
+
+    util = preferences(par)
+    if backend == 'numba' and type(util) is not CRRA:
+        msg = 'Numba backend only supports CRRA utility'
+        raise ValueError(msg)
+
+    if accelerator is not None:
+        accelerator.reset()
+
+    pool = None
+    if workers and backend == 'numpy':
+        arrays = {
+            'grid_a': par.grid_a, 'cah': cah, 'EMU': np.zeros(shape),
+            'pfun_c': np.zeros(shape)
+        }
+        pool = StatePool(workers, arrays, executor)
+
+    try:
+        for it in range(maxiter):
+
+            t1 = perf_counter()
+
+            if pool is not None:
+                # Expected marginal utility tomorrow for all income states
+                EMU = pool.arrays['EMU']
+                np.dot(par.tm_y, util.marginal(pfun_c), out=EMU)
+                pool.map(_egm_state, range(N_y), par.grid_y, beta, util, r)
+                pfun_c_upd[...] = pool.arrays['pfun_c']
+            elif backend == 'numba':
+                egm_step(
+                    pfun_c, cah, par.grid_a, par.grid_y, par.tm_y,
+                    beta, gamma, r, pfun_c_upd
+                )
+            else:
+                egm_update(par, pfun_c, cah, out=pfun_c_upd)
+
+            time_max = perf_counter() - t1
+
+            # Make sure that consumption policy satisfies constraints
+            assert np.all(pfun_c_upd >= 0.0) and np.all(pfun_c_upd <= cah)
+
+            # Compute max. absolute difference to policy function from previous
+            # iteration.
+            diff = np.max(np.abs(pfun_c - pfun_c_upd))
+
+            if accelerator is None or diff < tol:
+                # switch references to policy functions for next iteration
+                pfun_c, pfun_c_upd = pfun_c_upd, pfun_c
+            else:
+                # Accelerate in terms of log consumption, which guarantees
+                # positive consumption, and enforce budget constraint.
+                log_c = accelerator.update(np.log(pfun_c), np.log(pfun_c_upd))
+                pfun_c = np.minimum(np.exp(log_c), cah)
+
+            report(
+                callback, 'EGM', it, diff, perf_counter() - t0, time_max, tol
+            )
 
-        # Iterate over all labour income states
-        for iy, y in enumerate(par.grid_y):
+            if diff < tol:
+                break
+        else:
+            warn_not_converged('EGM', maxiter, diff)
+    finally:
+        if pool is not None:
+            pool.close()
 
-            # Expected marginal utility tomorrow
-            mu = np.dot(par.tm_y[iy], pfun_c**(-gamma))
-            # Compute right-hand side of Euler equation (EE)
-            ee_rhs = beta * (1.0 + r) * mu
+    pfun_a = cah - pfun_c
 
-            # Invert EE to get consumption as a function of savings today
-            cons_sav = ee_rhs**(-1.0/gamma)
+    return pfun_a, pfun_c
 
-            # Use budget constraint to get beginning-of-period assets
-            assets_sav = (cons_sav + par.grid_a - y) / (1.0 + r)
 
-            # Interpolate back onto exogenous savings grid
-            f_cons = interp1d(
-                assets_sav, cons_sav, 
-                copy=False, assume_sorted=True,
-                bounds_error=False, fill_value='extrapolate'
-            )
-            pfun_c_upd[iy] = f_cons(par.grid_a)
-
-            # Fix consumption in region where HH does not save
-            amin = assets_sav[0]
-            idx = np.where(par.grid_a <= amin)[0]
-            # HH consumes entire cash-at-hand
-            pfun_c_upd[iy, idx] = cah[iy, idx]
-
-        # Make sure that consumption policy satisfies constraints
-        assert np.all(pfun_c_upd >= 0.0) and np.all(pfun_c_upd <= cah)
-
-        # Compute max. absolute difference to policy function from previous
-        # iteration.
-        diff = np.max(np.abs(pfun_c - pfun_c_upd))
-
-        # switch references to policy functions for next iteration
-        pfun_c, pfun_c_upd = pfun_c_upd, pfun_c
-
-        if diff < tol:
-            # Convergence achieved, exit loop
-            td = perf_counter() - t0
-            msg = f'EGM: Converged after {it:d} iterations ({td:.3f} sec.): ' \
-                  f'd(c)={diff:4.2e}'
-            print(msg)
-            break
-        elif it == 1 or it % 10 == 0:
-            msg = f'EGM: Iteration {it:4d}, dV={diff:4.2e}'
-            print(msg)
-    else:
-        msg = f'Did not converge in {it:d} iterations'
-        print(msg)
+def egm_update(par, pfun_c, cah, out=None, grid_y=None, beta=None):
+    """
+    Perform one EGM iteration for all income states at once.
 
-    pfun_a = cah - pfun_c
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+    pfun_c : np.ndarray
+        Next-period consumption policy function, shape (N_y, N_a)
+    cah : np.ndarray
+        Cash-at-hand at each (y, a) grid point
+    out : np.ndarray, optional
+        Array where the updated consumption policy is stored
+    grid_y : np.ndarray, optional
+        Labour income in each state if different from par.grid_y, e.g.
+        at a given age in the life-cycle model.
+    beta : float, optional
+        Effective discount factor if different from par.beta, e.g. when
+        it includes the survival probability.
 
-    return pfun_a, pfun_c
+    Returns
+    -------
+    np.ndarray
+        Updated consumption policy function
+    """
+
+    r = par.r
+    if beta is None:
+        beta = par.beta
+    if grid_y is None:
+        grid_y = par.grid_y
+    util = preferences(par)
+
+    # Expected marginal utility tomorrow for each (y, a')
+    mu = np.dot(par.tm_y, util.marginal(pfun_c))
+    # Compute right-hand side of Euler equation (EE)
+    ee_rhs = beta * (1.0 + r) * mu
+
+    # Invert EE to get consumption as a function of savings today
+    cons_sav = util.inverse_marginal(ee_rhs)
+
+    # Use budget constraint to get beginning-of-period assets
+    assets_sav = (cons_sav + par.grid_a - grid_y[:, None]) / (1.0 + r)
+
+    # Interpolate back onto exogenous savings grid, separately for each
+    # income state
+    grid_a = np.broadcast_to(par.grid_a, assets_sav.shape)
+    pfun_c_upd = interp_rows(grid_a, assets_sav, cons_sav, extrapolate=True)
+
+    # HH consumes entire cash-at-hand in region where it does not save
+    pfun_c_upd = np.where(grid_a <= assets_sav[:, :1], cah, pfun_c_upd)
+
+    if out is not None:
+        out[...] = pfun_c_upd
+        pfun_c_upd = out
+
+    return pfun_c_upd
+
+
+def _egm_state(arrays, iy, grid_y, beta, util, r):
+    """
+    Perform EGM step for a single income state. Executed by worker processes.
+
+    Parameters
+    ----------
+    arrays : dict
+        Shared arrays 'grid_a', 'cah', 'EMU' (expected marginal utility
+        for each (y, a')) and output array 'pfun_c'
+    iy : int
+        Index of income state
+    grid_y : np.ndarray
+        Labour income grid
+    beta : float
+        Discount factor
+    util : object
+        Preferences, see utility.py
+    r : float
+        Interest rate
+    """
+
+    grid_a, cah, EMU = arrays['grid_a'], arrays['cah'][iy], arrays['EMU'][iy]
+    pfun_c_out = arrays['pfun_c'][iy]
+
+    # Invert EE to get consumption as a function of savings today
+    cons_sav = util.inverse_marginal(beta * (1.0 + r) * EMU)
+
+    # Use budget constraint to get beginning-of-period assets
+    assets_sav = (cons_sav + grid_a - grid_y[iy]) / (1.0 + r)
+
+    # Interpolate back onto exogenous savings grid, as in egm_update()
+    pfun_c = interp_rows(grid_a, assets_sav, cons_sav, extrapolate=True)
+
+    # HH consumes entire cash-at-hand in region where it does not save
+    pfun_c_out[:] = np.where(grid_a <= assets_sav[0], cah, pfun_c)
@@ -9,13 +9,20 @@ Author: Richard Foltyn
 
 import numpy as np
 
+from scipy import sparse
 from scipy.optimize import minimize_scalar
 from scipy.interpolate import interp1d
+from scipy.sparse.linalg import spsolve
 
 from time import perf_counter
 
+from kernels import bellman_grid, bellman_interp, resolve_backend
+from telemetry import report, warn_not_converged
+from utility import CRRA, preferences
 
-def vfi_grid(par, tol=1e-5, maxiter=1000):
+
+def vfi_grid(par, tol=1e-5, maxiter=1000, method='loop', howard_steps=0,
+             backend='numpy', vfun_init=None, callback=None):
     """
     Solve the household problem using VFI with grid search.
 
@@ -27,6 +34,29 @@ def vfi_grid(par, tol=1e-5, maxiter=1000):
         Termination tolerance
     maxiter : int, optional
         Max. number of iterations
+    method : str, optional
+        Grid search implementation. 'loop' iterates over the asset grid
+        in Python, 'vectorized' precomputes the utility of every (a, a')
+        combination once and performs each maximisation step as a
+        single argmax over a 2-dimensional array. The vectorized variant
+        requires memory proportional to N_a**2. 'monotone' exploits
+        monotonicity of the savings policy and concavity of the objective
+        in a' to restrict the search over a' (see Heer & Maussner, 2009).
+    howard_steps : int or str, optional
+        Number of policy evaluation steps performed after each
+        maximisation step (Howard's improvement algorithm). If 'exact',
+        the value of the current policy is instead obtained by solving
+        the corresponding linear system.
+    backend : str, optional
+        If 'numba', perform the maximisation step using a compiled kernel.
+        The kernel only distinguishes between exhaustive ('loop',
+        'vectorized') and monotone search. Falls back to 'numpy' if
+        Numba is not installed.
+    vfun_init : np.ndarray, optional
+        Initial guess for the value function. Defaults to zeros.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. The solver does not report progress otherwise.
 
     Returns
     -------
@@ -39,67 +69,109 @@ def vfi_grid(par, tol=1e-5, maxiter=1000):
     # Keep track of time
     t0 = perf_counter()
 
-    N_a = len(par.grid_a)
-    vfun = np.zeros(N_a)
+    N_a = par.N_a
+    if vfun_init is None:
+        vfun = np.zeros(N_a)
+    else:
+        vfun = np.array(vfun_init, dtype=float)
     vfun_upd = np.empty(N_a)
     # index of optimal savings decision (stored in integer array!)
     pfun_ia = np.empty(N_a, dtype=np.uint)
 
-    # pre-compute cash at hand for each asset grid point
-    cah = (1 + par.r) * par.grid_a + par.y
+    if method not in ('loop', 'vectorized', 'monotone'):
+        msg = f'Unknown grid search method: {method}'
+        raise ValueError(msg)
+
+    backend = resolve_backend(backend)
+
+    util = preferences(par)
+    if backend == 'numba' and type(util) is not CRRA:
+        msg = 'Numba backend only supports CRRA utility'
+        raise ValueError(msg)
+
+    # cash at hand for each asset grid point
+    cah = par.cah
+
+    if backend == 'numpy' and method == 'vectorized':
+        # Lookup table with utility of each (a, a') combination, with
+        # infeasible choices set to -inf such that they are never selected
+        # by argmax.
+        u_mat = util.table(cah, par.grid_a)
+        # Buffer for candidate values, reused across iterations
+        v_cand = np.empty_like(u_mat)
+        # Row indices used to extract maximised values
+        rows = np.arange(N_a)
 
     for it in range(maxiter):
 
-        for ia, a in enumerate(par.grid_a):
+        t1 = perf_counter()
 
-            # find all values of a' that are feasible, ie. they satisfy
-            # the budget constraint
-            ia_to = np.where(par.grid_a <= cah[ia])[0]
+        if backend == 'numba':
+            bellman_grid(
+                cah[None], par.grid_a, vfun[None], par.beta, par.gamma,
+                method == 'monotone', vfun_upd[None], pfun_ia[None]
+            )
+        elif method == 'vectorized':
+            # 'candidate' value for each combination (a, a')
+            np.add(u_mat, par.beta * vfun[None], out=v_cand)
+            # find the a' which maximizes utility for each a
+            pfun_ia[:] = np.argmax(v_cand, axis=1)
+            vfun_upd[:] = v_cand[rows, pfun_ia]
+        elif method == 'monotone':
+            grid_search_monotone(
+                cah, par.grid_a, vfun, par.beta, util.scalar(), vfun_upd,
+                pfun_ia
+            )
+        else:
+            for ia, a in enumerate(par.grid_a):
 
-            # consumption implied by choice a'
-            #   c = (1+r)a + y - a'
-            cons = cah[ia] - par.grid_a[ia_to]
+                # number of values of a' that are feasible, ie. they
+                # satisfy the budget constraint
+                n = par.n_feasible[ia]
 
-            # Evaluate "instantaneous" utility
-            if par.gamma == 1.0:
-                u = np.log(cons)
-            else:
-                u = (cons**(1.0 - par.gamma) - 1.0) / (1.0 - par.gamma)
+                # "instantaneous" utility implied by each feasible choice
+                # a', where consumption is c = (1+r)a + y - a'
+                u = util(cah[ia] - par.grid_a[:n])
 
-            # 'candidate' value for each choice a'
-            v_cand = u + par.beta * vfun[ia_to]
+                # 'candidate' value for each choice a'
+                v_cand = u + par.beta * vfun[:n]
 
-            # find the 'candidate' a' which maximizes utility
-            ia_to_max = np.argmax(v_cand)
+                # find the 'candidate' a' which maximizes utility
+                ia_to_max = np.argmax(v_cand)
 
-            # Maximised utility V(a)
-            vopt = v_cand[ia_to_max]
+                # Maximised utility V(a)
+                vopt = v_cand[ia_to_max]
 
-            # store results for next iteration
-            vfun_upd[ia] = vopt
-            pfun_ia[ia] = ia_to_max
+                # store results for next iteration
+                vfun_upd[ia] = vopt
+                pfun_ia[ia] = ia_to_max
+
+        time_max = perf_counter() - t1
 
         diff = np.max(np.abs(vfun - vfun_upd))
 
         # switch references to value functions for next iteration
         vfun, vfun_upd = vfun_upd, vfun
 
+        report(callback, 'VFI', it, diff, perf_counter() - t0, time_max, tol)
+
         if diff < tol:
-            td = perf_counter() - t0
-            msg = f'VFI: Converged after {it:3d} iterations ({td:.3f} sec.): dV={diff:4.2e}'
-            print(msg)
             break
-        elif it == 1 or it % 10 == 0:
-            msg = f'VFI: Iteration {it:3d}, dV={diff:4.2e}'
-            print(msg)
+
+        if howard_steps:
+            # Improve value function by evaluating the current policy
+            cons = cah - par.grid_a[pfun_ia]
+            u_pol = util(cons)
+            vfun = howard_grid(vfun, u_pol, pfun_ia, par.beta, howard_steps)
     else:
-        msg = f'Did not converge in {it:d} iterations'
-        print(msg)
+        warn_not_converged('VFI', maxiter, diff)
 
     return vfun, pfun_ia
 
 
-def vfi_interp(par, kind='linear', tol=1e-5, maxiter=1000):
+def vfi_interp(par, kind='linear', tol=1e-5, maxiter=1000, howard_steps=0,
+               optimizer='scipy', backend='numpy', vfun_init=None,
+               accelerator=None, callback=None):
     """
     Solve the household problem using VFI combined with interpolation
     of the continuation value.
@@ -114,6 +186,26 @@ def vfi_interp(par, kind='linear', tol=1e-5, maxiter=1000):
         Termination tolerance
     maxiter : int, optional
         Max. number of iterations
+    howard_steps : int, optional
+        Number of policy evaluation steps performed after each
+        maximisation step (Howard's improvement algorithm).
+    optimizer : str, optional
+        Optimizer used in the maximisation step. 'scipy' calls
+        minimize_scalar separately for each grid point, 'golden' runs
+        a golden-section search for all grid points at once.
+    backend : str, optional
+        If 'numba', perform the maximisation step using a compiled
+        golden-section search kernel, irrespective of `optimizer`. Only
+        supported for linear interpolation. Falls back to 'numpy' if
+        Numba is not installed.
+    vfun_init : np.ndarray, optional
+        Initial guess for the value function. Defaults to zeros.
+    accelerator : object, optional
+        Convergence accelerator applied to the value function in each
+        iteration, see Anderson, Aitken and Damped in accelerate.py.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. The solver does not report progress otherwise.
 
     Returns
     -------
@@ -125,64 +217,312 @@ def vfi_interp(par, kind='linear', tol=1e-5, maxiter=1000):
 
     t0 = perf_counter()
 
-    N_a = len(par.grid_a)
-    vfun = np.zeros(N_a)
+    if optimizer not in ('scipy', 'golden'):
+        msg = f'Unknown optimizer: {optimizer}'
+        raise ValueError(msg)
+
+    backend = resolve_backend(backend)
+    if backend == 'numba' and kind != 'linear':
+        msg = 'Numba backend requires linear interpolation'
+        raise ValueError(msg)
+
+    util = preferences(par)
+    if backend == 'numba' and type(util) is not CRRA:
+        msg = 'Numba backend only supports CRRA utility'
+        raise ValueError(msg)
+    # Utility function for scalar arguments used by minimize_scalar()
+    f_util = util.scalar()
+
+    N_a = par.N_a
+    if vfun_init is None:
+        vfun = np.zeros(N_a)
+    else:
+        vfun = np.array(vfun_init, dtype=float)
     vfun_upd = np.empty(N_a)
     # Optimal savings decision
     pfun_a = np.zeros(N_a)
 
-    for it in range(maxiter):
+    # Cash-at-hand at all asset levels
+    cah_all = par.cah
+
+    if accelerator is not None:
+        accelerator.reset()
 
+    def f_interp(v):
+        # Create function to interpolate given values on asset grid
         if kind == 'linear':
-            f_vfun = lambda x: np.interp(x, par.grid_a, vfun)
+            return lambda x: np.interp(x, par.grid_a, v)
         else:
             # Use any other interpolation that is supported by Scipy's interp1d
-            f_vfun = interp1d(
-                par.grid_a, vfun, 
+            return interp1d(
+                par.grid_a, v,
                 kind=kind, bounds_error=False,
                 fill_value='extrapolate', assume_sorted=True,
                 copy=False
             )
 
-        for ia, a in enumerate(par.grid_a):
-            # Solve maximization problem at given asset level
-            # Cash-at-hand at current asset level
-            cah = (1.0 + par.r) * a + par.y
-            # Restrict maximisation to following interval:
-            bounds = (0.0, cah)
-            # Arguments to be passed to objective function
-            args = (cah, par, f_vfun)
-            # perform maximisation
-            res = minimize_scalar(f_objective, bracket=bounds, args=args)
+    for it in range(maxiter):
 
-            # Minimiser returns NEGATIVE utility, revert that
-            vopt = - res.fun
-            sav_opt = float(res.x)
+        t1 = perf_counter()
 
-            vfun_upd[ia] = vopt
-            pfun_a[ia] = sav_opt
+        f_vfun = f_interp(vfun)
+
+        if backend == 'numba':
+            bellman_interp(
+                cah_all[None], par.grid_a, vfun[None], par.beta, par.gamma,
+                1.0e-8, 100, vfun_upd[None], pfun_a[None]
+            )
+        elif optimizer == 'golden':
+            # Objective evaluated at savings levels for all grid points
+            f_obj = lambda sav: util(cah_all - sav) + par.beta * f_vfun(sav)
+            sav_opt, vopt = golden_section_max(f_obj, 0.0, cah_all)
+            pfun_a[:] = sav_opt
+            vfun_upd[:] = vopt
+        else:
+            for ia, a in enumerate(par.grid_a):
+                # Solve maximization problem at given asset level
+                # Cash-at-hand at current asset level
+                cah = cah_all[ia]
+                # Restrict maximisation to following interval:
+                bounds = (0.0, cah)
+                # Arguments to be passed to objective function
+                args = (cah, par.beta, f_util, f_vfun)
+                # perform maximisation
+                res = minimize_scalar(f_objective, bracket=bounds, args=args)
+
+                # Minimiser returns NEGATIVE utility, revert that
+                vopt = - res.fun
+                sav_opt = float(res.x)
+
+                vfun_upd[ia] = vopt
+                pfun_a[ia] = sav_opt
+
+        time_max = perf_counter() - t1
 
         diff = np.max(np.abs(vfun - vfun_upd))
 
-        # switch references to value functions for next iteration
-        vfun, vfun_upd = vfun_upd, vfun
+        if accelerator is None or diff < tol:
+            # switch references to value functions for next iteration
+            vfun, vfun_upd = vfun_upd, vfun
+        else:
+            vfun = accelerator.update(vfun, vfun_upd)
+
+        report(callback, 'VFI', it, diff, perf_counter() - t0, time_max, tol)
 
         if diff < tol:
-            td = perf_counter() - t0
-            msg = f'VFI: Converged after {it:3d} iterations ({td:.3f} sec.): dV={diff:4.2e}'
-            print(msg)
             break
-        elif it == 1 or it % 10 == 0:
-            msg = f'VFI: Iteration {it:3d}, dV={diff:4.2e}'
-            print(msg)
+
+        if howard_steps > 0:
+            # Improve value function by evaluating the current policy
+            u_pol = util(cah_all - pfun_a)
+            for _ in range(howard_steps):
+                vcont = f_interp(vfun)(pfun_a)
+                vfun = u_pol + par.beta * vcont
     else:
-        msg = f'Did not converge in {it:d} iterations'
-        print(msg)
+        warn_not_converged('VFI', maxiter, diff)
 
     return vfun, pfun_a
 
 
-def f_objective(sav, cah, par, f_vfun):
+def golden_section_max(f, lb, ub, xtol=1.0e-8, maxiter=100):
+    """
+    Maximise a function over the interval [lb, ub] using golden-section
+    search, simultaneously for a batch of independent problems.
+
+    Parameters
+    ----------
+    f : callable
+        Objective function which accepts an array of candidate points
+        (one for each problem) and returns the objective values.
+    lb : float or np.ndarray
+        Lower bound of the search interval for each problem
+    ub : np.ndarray
+        Upper bound of the search interval for each problem
+    xtol : float, optional
+        Absolute tolerance on the location of the maximum
+    maxiter : int, optional
+        Max. number of iterations
+
+    Returns
+    -------
+    xmax : np.ndarray
+        Maximiser for each problem
+    fmax : np.ndarray
+        Maximum for each problem
+    """
+
+    # Inverse golden ratio
+    invphi = (np.sqrt(5.0) - 1.0) / 2.0
+
+    a = np.broadcast_to(lb, np.shape(ub)).astype(float)
+    b = np.array(ub, dtype=float)
+
+    # Interior points with a < c < d < b
+    c = b - invphi * (b - a)
+    d = a + invphi * (b - a)
+    fc = f(c)
+    fd = f(d)
+
+    for it in range(maxiter):
+        if np.max(b - a) < xtol:
+            break
+
+        # Maximum is bracketed in [a, d] if f(c) > f(d), in [c, b] otherwise
+        left = fc > fd
+
+        b = np.where(left, d, b)
+        a = np.where(left, a, c)
+        # One of the interior points is reused, compute the other one
+        x_old = np.where(left, c, d)
+        f_old = np.where(left, fc, fd)
+        x_new = np.where(left, b - invphi * (b - a), a + invphi * (b - a))
+        f_new = f(x_new)
+
+        c = np.where(left, x_new, x_old)
+        fc = np.where(left, f_new, f_old)
+        d = np.where(left, x_old, x_new)
+        fd = np.where(left, f_old, f_new)
+
+    xmax = np.where(fc > fd, c, d)
+    fmax = np.maximum(fc, fd)
+
+    # Golden-section search never evaluates the boundaries, check whether
+    # lower bound is optimal (corner solution).
+    flb = f(np.broadcast_to(lb, xmax.shape))
+    xmax = np.where(flb >= fmax, lb, xmax)
+    fmax = np.maximum(flb, fmax)
+
+    return xmax, fmax
+
+
+def grid_search_monotone(cah, grid_a, vcont, beta, f_util, vfun_out, pfun_out):
+    """
+    Perform grid search over next-period assets exploiting that the
+    savings policy is monotone in cash-at-hand and that the objective is
+    concave in a'.
+
+    For each grid point, the search starts at the optimal index found for
+    the previous (lower) cash-at-hand level and stops as soon as the
+    candidate value starts falling.
+
+    Parameters
+    ----------
+    cah : np.ndarray
+        Cash-at-hand at each asset grid point, in increasing order
+    grid_a : np.ndarray
+        Grid of candidate next-period asset choices a'
+    vcont : np.ndarray
+        Continuation value for each candidate a'
+    beta : float
+        Discount factor
+    f_util : callable
+        Utility function for a single positive consumption level, see
+        the scalar() method of the classes in utility.py
+    vfun_out : np.ndarray
+        Array where the maximised value is stored
+    pfun_out : np.ndarray
+        Array where the index of the optimal a' is stored
+    """
+
+    # Operate on Python floats, indexing into NumPy arrays element by
+    # element is much slower.
+    grid_a = grid_a.tolist()
+    vcont = vcont.tolist()
+    N_a = len(grid_a)
+
+    ia_start = 0
+
+    for ia, cah_ia in enumerate(cah.tolist()):
+        vmax = -np.inf
+        ia_max = ia_start
+
+        for ia_to in range(ia_start, N_a):
+            # consumption implied by choice a'
+            cons = cah_ia - grid_a[ia_to]
+            if cons < 0.0:
+                # a' and all subsequent choices are infeasible
+                break
+            elif cons == 0.0:
+                u = -np.inf
+            else:
+                u = f_util(cons)
+
+            v = u + beta * vcont[ia_to]
+
+            # Objective is concave in a', stop once it starts falling
+            if v <= vmax:
+                break
+
+            vmax = v
+            ia_max = ia_to
+
+        vfun_out[ia] = vmax
+        pfun_out[ia] = ia_max
+
+        # Optimal a' is non-decreasing in cash-at-hand
+        ia_start = ia_max
+
+
+def howard_grid(vfun, u_pol, pfun_ia, beta, steps, tm_y=None):
+    """
+    Update the value function by evaluating a given grid search policy
+    (Howard's improvement step).
+
+    Parameters
+    ----------
+    vfun : np.ndarray
+        Initial guess for the value function, either of shape (N_a, ) or
+        (N_y, N_a) if there is labour income risk.
+    u_pol : np.ndarray
+        Utility implied by the policy at each grid point
+    pfun_ia : np.ndarray
+        Indices of next-period assets a' chosen by the policy
+    beta : float
+        Discount factor
+    steps : int or str
+        Number of policy evaluation steps to perform. If 'exact', the
+        value of the policy is computed by solving the linear system
+            V = u + beta * Q V
+        where Q is the sparse transition matrix implied by the policy.
+    tm_y : np.ndarray, optional
+        Transition matrix of the labour income process, if any.
+
+    Returns
+    -------
+    vfun : np.ndarray
+        Updated value function
+    """
+
+    shape = vfun.shape
+
+    # Treat deterministic problem as problem with a single income state
+    if tm_y is None:
+        tm_y = np.ones((1, 1))
+    vfun = np.atleast_2d(vfun)
+    u_pol = np.atleast_2d(u_pol)
+    pfun_ia = np.atleast_2d(pfun_ia).astype(np.intp)
+    N_y, N_a = vfun.shape
+
+    if steps == 'exact':
+        N = N_y * N_a
+        # State (iy, ia) transitions to (iy', pfun_ia[iy, ia]) with
+        # probability tm_y[iy, iy']
+        rows = np.repeat(np.arange(N), N_y)
+        cols = (np.arange(N_y) * N_a + pfun_ia[..., None]).ravel()
+        vals = np.repeat(tm_y, N_a, axis=0).ravel()
+        Q = sparse.csr_matrix((vals, (rows, cols)), shape=(N, N))
+        A = sparse.identity(N, format='csr') - beta * Q
+        vfun = spsolve(A.tocsc(), u_pol.ravel())
+    else:
+        for _ in range(steps):
+            # Expected continuation value E[V(y',a')|y] for each (y,a')
+            EV = np.dot(tm_y, vfun)
+            vfun = u_pol + beta * np.take_along_axis(EV, pfun_ia, axis=1)
+
+    return vfun.reshape(shape)
+
+
+def f_objective(sav, cah, beta, f_util, f_vfun):
     """
     Objective function for the minimizer.
 
@@ -192,8 +532,10 @@ def f_objective(sav, cah, par, f_vfun):
         Current guess for optional savings
     cah : float
         Current CAH level
-    par : namedtuple
-        Model parameters
+    beta : float
+        Discount factor
+    f_util : callable
+        Utility function for a single consumption level
     f_vfun : callable
         Function interpolating the continuation value.
 
@@ -214,13 +556,10 @@ def f_objective(sav, cah, par, f_vfun):
     vcont = f_vfun(sav)
 
     # evaluate "instantaneous" utility
-    if par.gamma == 1.0:
-        u = np.log(cons)
-    else:
-        u = (cons**(1.0 - par.gamma) - 1.0) / (1.0 - par.gamma)
+    u = f_util(cons)
 
     # Objective evaluated at current savings level
-    obj = u + par.beta * vcont
+    obj = u + beta * vcont
 
     # We are running a minimiser, return negative of objective value
     return -obj
\ No newline at end of file
@@ -0,0 +1,320 @@
+"""
+Solve household problem with endogenous labour supply from lab 5, using
+either VFI + grid search or EGM.
+
+Labour supply is a static choice: given assets a and savings a', the
+household chooses consumption c and labour l to maximise u(c, l) subject to
+    c = (1+r)a - a' + w * y * l
+This problem does not depend on the value function, so it is solved only
+once for all (y, a, a') before iterating on the Bellman equation, either
+in closed form from the intratemporal first-order condition or by grid
+search over labour supply. Each VFI iteration then costs as much as in the
+model with exogenous labour supply.
+
+The solvers work with both deterministic and stochastic labour income.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+from time import perf_counter
+
+import numpy as np
+
+from diagnostics import income_process
+from interpolation import interp_rows
+from telemetry import report, warn_not_converged
+from utility import LabourCRRA
+
+
+def labour_preferences(par):
+    """
+    Return preferences over consumption and labour for given parameters.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+
+    Returns
+    -------
+    LabourCRRA
+        par.utility if present, LabourCRRA(par.gamma, par.chi) otherwise.
+    """
+
+    util = getattr(par, 'utility', None)
+    if util is None:
+        util = LabourCRRA(par.gamma, par.chi)
+    elif not isinstance(util, LabourCRRA):
+        msg = 'Endogenous labour supply requires LabourCRRA preferences'
+        raise ValueError(msg)
+
+    return util
+
+
+def static_choice(par, labour='foc', grid_l=None):
+    """
+    Solve static problem for optimal labour supply for all combinations of
+    labour income state y, assets a and savings a'.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+    labour : str, optional
+        If 'foc', labour supply is determined by the intratemporal
+        first-order condition. If 'grid', labour supply is restricted to
+        the values in grid_l.
+    grid_l : np.ndarray, optional
+        Grid of candidate labour supply levels used if labour='grid'.
+        Defaults to 11 equally spaced points on [0, 1].
+
+    Returns
+    -------
+    u : np.ndarray
+        Utility attained for each (y, a, a'), -inf if a' is infeasible
+    lab : np.ndarray
+        Optimal labour supply for each (y, a, a')
+    """
+
+    grid_y, tm_y = income_process(par)
+    grid_a = par.grid_a
+    util = labour_preferences(par)
+
+    # Resources available for consumption without working, (a, a')
+    resources = (1.0 + par.r) * grid_a[:, None] - grid_a[None]
+    # Labour income per unit of labour supply
+    wage = par.w * grid_y[:, None, None]
+
+    if labour == 'foc':
+        cons, lab = util.intratemporal(resources[None], wage)
+        feasible = np.isfinite(cons)
+        u = np.full(cons.shape, -np.inf)
+        u[feasible] = util(cons[feasible], lab[feasible])
+        lab = np.where(feasible, lab, 0.0)
+    elif labour == 'grid':
+        if grid_l is None:
+            grid_l = np.linspace(0.0, 1.0, 11)
+        shape = (len(grid_y), ) + resources.shape
+        u = np.full(shape, -np.inf)
+        lab = np.zeros(shape)
+        # Evaluate one labour supply level at a time for all (y, a, a')
+        # to avoid creating a 4-dimensional array.
+        for l in grid_l:
+            cons = resources[None] + wage * l
+            feasible = cons >= 0.0
+            u_l = np.full(shape, -np.inf)
+            u_l[feasible] = util(cons[feasible], l)
+            better = u_l > u
+            u[better] = u_l[better]
+            lab[better] = l
+    else:
+        msg = f'Unknown labour supply method: {labour}'
+        raise ValueError(msg)
+
+    return u, lab
+
+
+def vfi_grid(par, tol=1e-5, maxiter=1000, labour='foc', grid_l=None,
+             vfun_init=None, callback=None):
+    """
+    Solve household problem with endogenous labour supply using VFI with
+    vectorised grid search over savings.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+    tol : float, optional
+        Termination tolerance
+    maxiter : int, optional
+        Max. number of iterations
+    labour : str, optional
+        How optimal labour supply is determined for given (a, a'), either
+        'foc' or 'grid', see static_choice().
+    grid_l : np.ndarray, optional
+        Grid of candidate labour supply levels used if labour='grid'.
+    vfun_init : np.ndarray, optional
+        Initial guess for the value function. Defaults to zeros.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. The solver does not report progress otherwise.
+
+    Returns
+    -------
+    vfun : np.ndarray
+        Array containing the value function
+    pfun_ia : np.ndarray
+        Array containing the indices of optimal next-period assets a'
+    pfun_l : np.ndarray
+        Array containing optimal labour supply
+    """
+
+    t0 = perf_counter()
+
+    grid_y, tm_y = income_process(par)
+    deterministic = getattr(par, 'tm_y', None) is None
+
+    N_a, N_y = len(par.grid_a), len(grid_y)
+    shape = (N_y, N_a)
+    if vfun_init is None:
+        vfun = np.zeros(shape)
+    else:
+        vfun = np.array(vfun_init, dtype=float).reshape(shape)
+    vfun_upd = np.empty(shape)
+
+    # Utility and labour supply for each (y, a, a'), computed once
+    u_mat, lab_mat = static_choice(par, labour, grid_l)
+
+    # Buffer for candidate values, reused across iterations
+    v_cand = np.empty_like(u_mat)
+    # Indices used to extract maximised values
+    iy = np.arange(N_y)[:, None]
+    ia = np.arange(N_a)[None]
+
+    for it in range(maxiter):
+
+        t1 = perf_counter()
+
+        # Expected continuation value E[V(y',a')|y] for each (y,a')
+        EV = np.dot(tm_y, vfun)
+
+        # 'candidate' value for each combination (y, a, a')
+        np.add(u_mat, par.beta * EV[:, None], out=v_cand)
+        # find the a' which maximizes utility for each (y, a)
+        pfun_ia = np.argmax(v_cand, axis=2)
+        vfun_upd[...] = v_cand[iy, ia, pfun_ia]
+
+        time_max = perf_counter() - t1
+
+        diff = np.max(np.abs(vfun - vfun_upd))
+
+        # switch references to value functions for next iteration
+        vfun, vfun_upd = vfun_upd, vfun
+
+        report(callback, 'VFI', it, diff, perf_counter() - t0, time_max, tol)
+
+        if diff < tol:
+            break
+    else:
+        warn_not_converged('VFI', maxiter, diff)
+
+    pfun_l = lab_mat[iy, ia, pfun_ia]
+
+    if deterministic:
+        vfun, pfun_ia, pfun_l = vfun[0], pfun_ia[0], pfun_l[0]
+
+    return vfun, pfun_ia, pfun_l
+
+
+def egm(par, tol=1.0e-8, maxiter=10000, pfun_c_init=None, callback=None):
+    """
+    Solve household problem with endogenous labour supply using EGM.
+
+    For each savings level a', the Euler equation determines consumption,
+    the intratemporal first-order condition determines labour supply, and
+    the budget constraint determines the endogenous asset level a.
+    As in vfi_grid(), savings are restricted to [grid_a[0], grid_a[-1]].
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+    tol : float, optional
+        Termination tolerance
+    maxiter : int, optional
+        Max. number of iterations
+    pfun_c_init : np.ndarray, optional
+        Initial guess for the consumption policy function. Defaults to
+        the choice of a household which does not save.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. The solver does not report progress otherwise.
+
+    Returns
+    -------
+    pfun_a : np.ndarray
+        Savings policy function defined on beginning-of-period asset grid.
+    pfun_c : np.ndarray
+        Consumption policy function defined on beginning-of-period asset grid.
+    pfun_l : np.ndarray
+        Labour supply policy function defined on beginning-of-period
+        asset grid.
+    """
+
+    t0 = perf_counter()
+
+    grid_y, tm_y = income_process(par)
+    deterministic = getattr(par, 'tm_y', None) is None
+
+    beta, r = par.beta, par.r
+    grid_a = par.grid_a
+    N_a, N_y = len(grid_a), len(grid_y)
+    util = labour_preferences(par)
+
+    # Labour income per unit of labour supply
+    wage = par.w * grid_y[:, None]
+
+    # Optimal choices of households which do not save
+    resources = (1.0 + r) * grid_a - grid_a[0]
+    cons_con, _ = util.intratemporal(resources[None], wage)
+    # Optimal choices of households which save the upper bound of the
+    # asset grid. Savings are restricted to the grid as in vfi_grid().
+    resources = (1.0 + r) * grid_a - grid_a[-1]
+    cons_max, _ = util.intratemporal(resources[None], wage)
+
+    if pfun_c_init is None:
+        pfun_c = np.copy(cons_con)
+    else:
+        pfun_c = np.array(pfun_c_init, dtype=float).reshape((N_y, N_a))
+
+    x = np.broadcast_to(grid_a, (N_y, N_a))
+
+    for it in range(maxiter):
+
+        t1 = perf_counter()
+
+        # Expected marginal utility tomorrow for each (y, a')
+        mu = np.dot(tm_y, util.marginal(pfun_c))
+
+        # Invert EE to get consumption as a function of savings today
+        cons_sav = util.inverse_marginal(beta * (1.0 + r) * mu)
+        # Labour supply from intratemporal FOC
+        lab_sav = util.labour_supply(cons_sav, wage)
+
+        # Use budget constraint to get beginning-of-period assets
+        assets_sav = (cons_sav + grid_a - wage * lab_sav) / (1.0 + r)
+
+        # Interpolate back onto exogenous asset grid
+        pfun_c_upd = interp_rows(x, assets_sav, cons_sav, extrapolate=True)
+
+        # Choices of households which do not save, or which would like to
+        # save more than the upper bound of the asset grid
+        pfun_c_upd = np.where(x <= assets_sav[:, :1], cons_con, pfun_c_upd)
+        pfun_c_upd = np.where(x >= assets_sav[:, -1:], cons_max, pfun_c_upd)
+
+        time_max = perf_counter() - t1
+
+        diff = np.max(np.abs(pfun_c - pfun_c_upd))
+
+        pfun_c = pfun_c_upd
+
+        report(callback, 'EGM', it, diff, perf_counter() - t0, time_max, tol)
+
+        if diff < tol:
+            break
+    else:
+        warn_not_converged('EGM', maxiter, diff)
+
+    # Recover labour supply and savings
+    pfun_l = util.labour_supply(pfun_c, wage)
+    pfun_a = (1.0 + r) * grid_a + wage * pfun_l - pfun_c
+    # Eliminate rounding errors at the bounds of the asset grid
+    pfun_a = np.clip(pfun_a, grid_a[0], grid_a[-1])
+
+    if deterministic:
+        pfun_a, pfun_c, pfun_l = pfun_a[0], pfun_c[0], pfun_l[0]
+
+    return pfun_a, pfun_c, pfun_l
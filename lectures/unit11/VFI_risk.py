@@ -14,8 +14,17 @@ from scipy.interpolate import interp1d
 
 from time import perf_counter
 
+from VFI import golden_section_max, grid_search_monotone, howard_grid
+from interpolation import interp_rows
+from kernels import bellman_grid, bellman_interp, resolve_backend
+from parallel import StatePool
+from telemetry import report, warn_not_converged
+from utility import CRRA, preferences
 
-def vfi_grid(par, tol=1e-5, maxiter=1000):
+
+def vfi_grid(par, tol=1e-5, maxiter=1000, method='loop', howard_steps=0,
+             backend='numpy', workers=None, executor='process',
+             vfun_init=None, callback=None):
     """
     Solve the household problem with risky labour income using VFI with grid
     search.
@@ -28,6 +37,29 @@ def vfi_grid(par, tol=1e-5, maxiter=1000):
         Termination tolerance
     maxiter : int, optional
         Max. number of iterations
+    method : str, optional
+        Grid search implementation. 'loop' evaluates all feasible choices
+        a' at each grid point, 'monotone' exploits monotonicity of the
+        savings policy and concavity of the objective in a' to restrict
+        the search over a'.
+    howard_steps : int or str, optional
+        Number of policy evaluation steps performed after each
+        maximisation step (Howard's improvement algorithm). If 'exact',
+        the value of the current policy is instead obtained by solving
+        the corresponding linear system.
+    backend : str, optional
+        If 'numba', perform the maximisation step using a compiled kernel.
+        Falls back to 'numpy' if Numba is not installed.
+    workers : int, optional
+        If given, distribute the maximisation step for each income state
+        across this many workers. Ignored if backend='numba'.
+    executor : str, optional
+        Type of worker pool, either 'process' or 'thread'.
+    vfun_init : np.ndarray, optional
+        Initial guess for the value function. Defaults to zeros.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. The solver does not report progress otherwise.
 
     Returns
     -------
@@ -40,70 +72,120 @@ def vfi_grid(par, tol=1e-5, maxiter=1000):
     # Keep track of time
     t0 = perf_counter()
 
-    N_a, N_y = len(par.grid_a), len(par.grid_y)
+    N_a, N_y = par.N_a, par.N_y
     shape = (N_y, N_a)
-    vfun = np.zeros(shape)
+    if vfun_init is None:
+        vfun = np.zeros(shape)
+    else:
+        vfun = np.array(vfun_init, dtype=float)
     vfun_upd = np.empty(shape)
     # index of optimal savings decision (stored in integer array!)
     pfun_ia = np.empty(shape, dtype=np.uint)
 
-    # pre-compute cash at hand for each (labour, asset) grid point
-    cah = (1 + par.r) * par.grid_a[None] + par.grid_y[:,None]
-
-    for it in range(maxiter):
-
-        # Compute expected continuation value E[V(y',a')|y] for each (y,a')
-        EV = np.dot(par.tm_y, vfun)
-
-        for iy in range(N_y):
-            for ia, a in enumerate(par.grid_a):
-
-                # find all values of a' that are feasible, ie. they satisfy
-                # the budget constraint
-                ia_to = np.where(par.grid_a <= cah[iy, ia])[0]
-
-                # consumption implied by choice a'
-                #   c = (1+r)a + y - a'
-                cons = cah[iy, ia] - par.grid_a[ia_to]
-
-                # Evaluate "instantaneous" utility
-                if par.gamma == 1.0:
-                    u = np.log(cons)
-                else:
-                    u = (cons**(1.0 - par.gamma) - 1.0) / (1.0 - par.gamma)
-
-                # 'candidate' value for each choice a'
-                v_cand = u + par.beta * EV[iy, ia_to]
-
-                # find the 'candidate' a' which maximizes utility
-                ia_to_max = np.argmax(v_cand)
+    if method not in ('loop', 'monotone'):
+        msg = f'Unknown grid search method: {method}'
+        raise ValueError(msg)
 
-                # store results for next iteration
-                vopt = v_cand[ia_to_max]
-                vfun_upd[iy, ia] = vopt
-                pfun_ia[iy, ia] = ia_to_max
+    backend = resolve_backend(backend)
 
-        diff = np.max(np.abs(vfun - vfun_upd))
+    util = preferences(par)
+    if backend == 'numba' and type(util) is not CRRA:
+        msg = 'Numba backend only supports CRRA utility'
+        raise ValueError(msg)
 
-        # switch references to value functions for next iteration
-        vfun, vfun_upd = vfun_upd, vfun
-
-        if diff < tol:
-            td = perf_counter() - t0
-            msg = f'VFI: Converged after {it:3d} iterations ({td:.3f} sec.): dV={diff:4.2e}'
-            print(msg)
-            break
-        elif it == 1 or it % 10 == 0:
-            msg = f'VFI: Iteration {it:3d}, dV={diff:4.2e}'
-            print(msg)
-    else:
-        msg = f'Did not converge in {it:d} iterations'
-        print(msg)
+    # pre-compute cash at hand for each (labour, asset) grid point
+    cah = par.cah
+
+    pool = None
+    if workers and backend == 'numpy':
+        arrays = {
+            'grid_a': par.grid_a, 'cah': cah, 'n_feasible': par.n_feasible,
+            'EV': np.zeros(shape), 'vfun': np.empty(shape),
+            'pfun': np.empty_like(pfun_ia)
+        }
+        pool = StatePool(workers, arrays, executor)
+
+    try:
+        for it in range(maxiter):
+
+            t1 = perf_counter()
+
+            # Compute expected continuation value E[V(y',a')|y] for each (y,a')
+            EV = np.dot(par.tm_y, vfun)
+
+            if pool is not None:
+                pool.arrays['EV'][...] = EV
+                pool.map(_grid_state, range(N_y), par.beta, util, method)
+                vfun_upd[...] = pool.arrays['vfun']
+                pfun_ia[...] = pool.arrays['pfun']
+            elif backend == 'numba':
+                bellman_grid(
+                    cah, par.grid_a, EV, par.beta, par.gamma,
+                    method == 'monotone', vfun_upd, pfun_ia
+                )
+            else:
+                for iy in range(N_y):
+                    if method == 'monotone':
+                        grid_search_monotone(
+                            cah[iy], par.grid_a, EV[iy], par.beta,
+                            util.scalar(), vfun_upd[iy], pfun_ia[iy]
+                        )
+                    else:
+                        for ia, a in enumerate(par.grid_a):
+
+                            # number of values of a' that are feasible, ie.
+                            # they satisfy the budget constraint
+                            n = par.n_feasible[iy, ia]
+
+                            # "instantaneous" utility implied by each
+                            # feasible choice a', where consumption is
+                            # c = (1+r)a + y - a'
+                            u = util(cah[iy, ia] - par.grid_a[:n])
+
+                            # 'candidate' value for each choice a'
+                            v_cand = u + par.beta * EV[iy, :n]
+
+                            # find the 'candidate' a' which maximizes utility
+                            ia_to_max = np.argmax(v_cand)
+
+                            # store results for next iteration
+                            vopt = v_cand[ia_to_max]
+                            vfun_upd[iy, ia] = vopt
+                            pfun_ia[iy, ia] = ia_to_max
+
+            time_max = perf_counter() - t1
+
+            diff = np.max(np.abs(vfun - vfun_upd))
+
+            # switch references to value functions for next iteration
+            vfun, vfun_upd = vfun_upd, vfun
+
+            report(
+                callback, 'VFI', it, diff, perf_counter() - t0, time_max, tol
+            )
+
+            if diff < tol:
+                break
+
+            if howard_steps:
+                # Improve value function by evaluating the current policy
+                cons = cah - par.grid_a[pfun_ia]
+                u_pol = util(cons)
+                vfun = howard_grid(
+                    vfun, u_pol, pfun_ia, par.beta, howard_steps, par.tm_y
+                )
+        else:
+            warn_not_converged('VFI', maxiter, diff)
+    finally:
+        if pool is not None:
+            pool.close()
 
     return vfun, pfun_ia
 
 
-def vfi_interp(par, tol=1e-5, maxiter=1000):
+def vfi_interp(par, tol=1e-5, maxiter=1000, howard_steps=0, optimizer='scipy',
+               backend='numpy', workers=None, executor='process',
+               vfun_init=None, accelerator=None, callback=None):
     """
     Solve the household problem using VFI combined with interpolation
     of the continuation value.
@@ -116,6 +198,30 @@ def vfi_interp(par, tol=1e-5, maxiter=1000):
         Termination tolerance
     maxiter : int, optional
         Max. number of iterations
+    howard_steps : int, optional
+        Number of policy evaluation steps performed after each
+        maximisation step (Howard's improvement algorithm).
+    optimizer : str, optional
+        Optimizer used in the maximisation step. 'scipy' calls
+        minimize_scalar separately for each grid point, 'golden' runs
+        a golden-section search for all (y, a) grid points at once.
+    backend : str, optional
+        If 'numba', perform the maximisation step using a compiled
+        golden-section search kernel, irrespective of `optimizer`. Falls
+        back to 'numpy' if Numba is not installed.
+    workers : int, optional
+        If given, distribute the maximisation step for each income state
+        across this many workers. Ignored if backend='numba'.
+    executor : str, optional
+        Type of worker pool, either 'process' or 'thread'.
+    vfun_init : np.ndarray, optional
+        Initial guess for the value function. Defaults to zeros.
+    accelerator : object, optional
+        Convergence accelerator applied to the value function in each
+        iteration, see Anderson, Aitken and Damped in accelerate.py.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. The solver does not report progress otherwise.
 
     Returns
     -------
@@ -127,67 +233,209 @@ def vfi_interp(par, tol=1e-5, maxiter=1000):
 
     t0 = perf_counter()
 
-    N_a, N_y = len(par.grid_a), len(par.grid_y)
+    if optimizer not in ('scipy', 'golden'):
+        msg = f'Unknown optimizer: {optimizer}'
+        raise ValueError(msg)
+
+    backend = resolve_backend(backend)
+
+    util = preferences(par)
+    if backend == 'numba' and type(util) is not CRRA:
+        msg = 'Numba backend only supports CRRA utility'
+        raise ValueError(msg)
+    # Utility function for scalar arguments used by minimize_scalar()
+    f_util = util.scalar()
+
+    N_a, N_y = par.N_a, par.N_y
     shape = (N_y, N_a)
-    vfun = np.zeros(shape)
+    if vfun_init is None:
+        vfun = np.zeros(shape)
+    else:
+        vfun = np.array(vfun_init, dtype=float)
     vfun_upd = np.empty(shape)
     # Optimal savings decision
     pfun_a = np.zeros(shape)
 
-    for it in range(maxiter):
-
-        # Compute expected continuation value E[V(y',a')|y] for each (y,a')
-        EV = np.dot(par.tm_y, vfun)
-
-        for iy, y in enumerate(par.grid_y):
-
-            # function to interpolate continuation value
-            f_vfun = lambda x: np.interp(x, par.grid_a, EV[iy])
-            # Alternative interpolation method:
-            # f_vfun = interp1d(par.grid_a, EV[iy], assume_sorted=True, 
-            #                   copy=False, bounds_error=False,
-            #                   fill_value='extrapolate',
-            #                   kind='quadratic')
-
-            for ia, a in enumerate(par.grid_a):
-                # Solve maximization problem at given asset level
-                # Cash-at-hand at current asset level
-                cah = (1.0 + par.r) * a + y
-                # Restrict maximisation to following interval:
-                bounds = (0.0, cah)
-                # Arguments to be passed to objective function
-                args = (cah, par, f_vfun)
-                # perform maximisation
-                res = minimize_scalar(f_objective, bracket=bounds, args=args)
-
-                # Minimiser returns NEGATIVE utility, revert that
-                vopt = - res.fun
-                sav_opt = float(res.x)
-
-                vfun_upd[iy, ia] = vopt
-                pfun_a[iy, ia] = sav_opt
-
-        diff = np.max(np.abs(vfun - vfun_upd))
-
-        # switch references to value functions for next iteration
-        vfun, vfun_upd = vfun_upd, vfun
-
-        if diff < tol:
-            td = perf_counter() - t0
-            msg = f'VFI: Converged after {it:3d} iterations ({td:.3f} sec.): dV={diff:4.2e}'
-            print(msg)
-            break
-        elif it == 1 or it % 10 == 0:
-            msg = f'VFI: Iteration {it:3d}, dV={diff:4.2e}'
-            print(msg)
-    else:
-        msg = f'Did not converge in {it:d} iterations'
-        print(msg)
+    # Cash-at-hand at all (labour, asset) grid points
+    cah_all = par.cah
+
+    if accelerator is not None:
+        accelerator.reset()
+
+    pool = None
+    if workers and backend == 'numpy':
+        arrays = {
+            'grid_a': par.grid_a, 'cah': cah_all, 'EV': np.zeros(shape),
+            'vfun': np.empty(shape), 'pfun': np.empty(shape)
+        }
+        pool = StatePool(workers, arrays, executor)
+
+    try:
+        for it in range(maxiter):
+
+            t1 = perf_counter()
+
+            # Compute expected continuation value E[V(y',a')|y] for each (y,a')
+            EV = np.dot(par.tm_y, vfun)
+
+            if pool is not None:
+                pool.arrays['EV'][...] = EV
+                pool.map(_interp_state, range(N_y), par.beta, util, optimizer)
+                vfun_upd[...] = pool.arrays['vfun']
+                pfun_a[...] = pool.arrays['pfun']
+            elif backend == 'numba':
+                bellman_interp(
+                    cah_all, par.grid_a, EV, par.beta, par.gamma,
+                    1.0e-8, 100, vfun_upd, pfun_a
+                )
+            elif optimizer == 'golden':
+                # Objective evaluated at savings levels for all grid points
+                f_obj = lambda sav: util(cah_all - sav) \
+                    + par.beta * interp_rows(sav, par.grid_a, EV)
+                sav_opt, vopt = golden_section_max(f_obj, 0.0, cah_all)
+                pfun_a[:] = sav_opt
+                vfun_upd[:] = vopt
+            else:
+                for iy, y in enumerate(par.grid_y):
+
+                    # function to interpolate continuation value
+                    f_vfun = lambda x: np.interp(x, par.grid_a, EV[iy])
+                    # Alternative interpolation method:
+                    # f_vfun = interp1d(par.grid_a, EV[iy], assume_sorted=True, 
+                    #                   copy=False, bounds_error=False,
+                    #                   fill_value='extrapolate',
+                    #                   kind='quadratic')
+
+                    for ia, a in enumerate(par.grid_a):
+                        # Solve maximization problem at given asset level
+                        # Cash-at-hand at current asset level
+                        cah = cah_all[iy, ia]
+                        # Restrict maximisation to following interval:
+                        bounds = (0.0, cah)
+                        # Arguments to be passed to objective function
+                        args = (cah, par.beta, f_util, f_vfun)
+                        # perform maximisation
+                        res = minimize_scalar(
+                            f_objective, bracket=bounds, args=args
+                        )
+
+                        # Minimiser returns NEGATIVE utility, revert that
+                        vopt = - res.fun
+                        sav_opt = float(res.x)
+
+                        vfun_upd[iy, ia] = vopt
+                        pfun_a[iy, ia] = sav_opt
+
+            time_max = perf_counter() - t1
+
+            diff = np.max(np.abs(vfun - vfun_upd))
+
+            if accelerator is None or diff < tol:
+                # switch references to value functions for next iteration
+                vfun, vfun_upd = vfun_upd, vfun
+            else:
+                vfun = accelerator.update(vfun, vfun_upd)
+
+            report(
+                callback, 'VFI', it, diff, perf_counter() - t0, time_max, tol
+            )
+
+            if diff < tol:
+                break
+
+            if howard_steps > 0:
+                # Improve value function by evaluating the current policy
+                u_pol = util(cah_all - pfun_a)
+                for _ in range(howard_steps):
+                    EV = np.dot(par.tm_y, vfun)
+                    for iy in range(N_y):
+                        vcont = np.interp(pfun_a[iy], par.grid_a, EV[iy])
+                        vfun[iy] = u_pol[iy] + par.beta * vcont
+        else:
+            warn_not_converged('VFI', maxiter, diff)
+    finally:
+        if pool is not None:
+            pool.close()
 
     return vfun, pfun_a
 
 
-def f_objective(sav, cah, par, f_vfun):
+def _grid_state(arrays, iy, beta, util, method):
+    """
+    Perform grid search maximisation step for a single income state.
+    Executed by worker processes.
+
+    Parameters
+    ----------
+    arrays : dict
+        Shared arrays 'grid_a', 'cah', 'n_feasible', 'EV', and output
+        arrays 'vfun' and 'pfun'
+    iy : int
+        Index of income state
+    beta : float
+        Discount factor
+    util : object
+        Preferences, see utility.py
+    method : str
+        Grid search method, see vfi_grid()
+    """
+
+    cah, grid_a, EV = arrays['cah'][iy], arrays['grid_a'], arrays['EV'][iy]
+    vfun_out, pfun_out = arrays['vfun'][iy], arrays['pfun'][iy]
+
+    if method == 'monotone':
+        grid_search_monotone(
+            cah, grid_a, EV, beta, util.scalar(), vfun_out, pfun_out
+        )
+    else:
+        n_feasible = arrays['n_feasible'][iy]
+        for ia in range(len(cah)):
+            # Evaluate feasible choices a' only, see vfi_grid()
+            n = n_feasible[ia]
+            v_cand = util(cah[ia] - grid_a[:n]) + beta * EV[:n]
+            ia_to_max = np.argmax(v_cand)
+            vfun_out[ia] = v_cand[ia_to_max]
+            pfun_out[ia] = ia_to_max
+
+
+def _interp_state(arrays, iy, beta, util, optimizer):
+    """
+    Perform maximisation step of VFI with interpolation for a single income
+    state. Executed by worker processes.
+
+    Parameters
+    ----------
+    arrays : dict
+        Shared arrays 'grid_a', 'cah', 'EV', and output arrays 'vfun'
+        and 'pfun'
+    iy : int
+        Index of income state
+    beta : float
+        Discount factor
+    util : object
+        Preferences, see utility.py
+    optimizer : str
+        Optimizer used in the maximisation step, see vfi_interp()
+    """
+
+    cah, grid_a, EV = arrays['cah'][iy], arrays['grid_a'], arrays['EV'][iy]
+    vfun_out, pfun_out = arrays['vfun'][iy], arrays['pfun'][iy]
+
+    f_vfun = lambda x: np.interp(x, grid_a, EV)
+
+    if optimizer == 'golden':
+        f_obj = lambda sav: util(cah - sav) + beta * f_vfun(sav)
+        pfun_out[:], vfun_out[:] = golden_section_max(f_obj, 0.0, cah)
+    else:
+        f_util = util.scalar()
+        for ia in range(len(cah)):
+            args = (cah[ia], beta, f_util, f_vfun)
+            res = minimize_scalar(f_objective, bracket=(0.0, cah[ia]), args=args)
+            vfun_out[ia] = - res.fun
+            pfun_out[ia] = float(res.x)
+
+
+def f_objective(sav, cah, beta, f_util, f_vfun):
     """
     Objective function for the minimizer.
 
@@ -197,8 +445,10 @@ def f_objective(sav, cah, par, f_vfun):
         Current guess for optional savings
     cah : float
         Current CAH level
-    par : namedtuple
-        Model parameters
+    beta : float
+        Discount factor
+    f_util : callable
+        Utility function for a single consumption level
     f_vfun : callable
         Function interpolating the continuation value.
 
@@ -219,13 +469,10 @@ def f_objective(sav, cah, par, f_vfun):
     vcont = f_vfun(sav)
 
     # evaluate "instantaneous" utility
-    if par.gamma == 1.0:
-        u = np.log(cons)
-    else:
-        u = (cons**(1.0 - par.gamma) - 1.0) / (1.0 - par.gamma)
+    u = f_util(cons)
 
     # Objective evaluated at current savings level
-    obj = u + par.beta * vcont
+    obj = u + beta * vcont
 
     # We are running a minimiser, return negative of objective value
     return -obj
\ No newline at end of file
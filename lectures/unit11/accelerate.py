@@ -0,0 +1,198 @@
+"""
+Acceleration schemes for fixed-point iterations x = f(x).
+
+All accelerators share the same interface: reset() is called before a new
+iteration is started, and update(x, fx) returns the next iterate given the
+current iterate x and the fixed-point map evaluated at x. They are passed
+to the solvers in EGM.py, EGM_risk.py, VFI.py and VFI_risk.py using the
+`accelerator` argument.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+
+
+class Damped:
+    """
+    Damped fixed-point iteration, x' = (1 - weight) * x + weight * f(x).
+
+    Parameters
+    ----------
+    weight : float, optional
+        Weight on the updated value f(x)
+    """
+
+    def __init__(self, weight=0.5):
+        if not 0.0 < weight <= 1.0:
+            msg = 'Weight must be in (0, 1]'
+            raise ValueError(msg)
+        self.weight = weight
+
+    def reset(self):
+        """
+        Reset state before a new fixed-point iteration is started.
+        """
+        pass
+
+    def update(self, x, fx):
+        """
+        Compute the next iterate.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Current iterate
+        fx : np.ndarray
+            Fixed-point map evaluated at current iterate
+
+        Returns
+        -------
+        np.ndarray
+            Next iterate
+        """
+        return (1.0 - self.weight) * x + self.weight * fx
+
+
+class Aitken:
+    """
+    Vector Aitken delta-squared extrapolation (Steffensen's method)
+    using the scalar step of Irons & Tuck, Int. J. Numer. Meth. Eng. (1969),
+    Vol. 1, pp. 275-277.
+
+    After every two plain iterations x0 -> x1 = f(x0) -> x2 = f(x1), the
+    next iterate is extrapolated as
+        x2 - lambda * (x2 - x1)
+    where lambda = <x2 - x1, d2> / <d2, d2> and d2 = x2 - 2 x1 + x0.
+
+    Parameters
+    ----------
+    eps : float, optional
+        No extrapolation is performed if the squared norm of d2 is below
+        this value.
+    """
+
+    def __init__(self, eps=1.0e-20):
+        self.eps = eps
+        self._history = []
+
+    def reset(self):
+        """
+        Reset state before a new fixed-point iteration is started.
+        """
+        self._history = []
+
+    def update(self, x, fx):
+        """
+        Compute the next iterate.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Current iterate
+        fx : np.ndarray
+            Fixed-point map evaluated at current iterate
+
+        Returns
+        -------
+        np.ndarray
+            Next iterate
+        """
+        if len(self._history) < 2:
+            self._history = [np.copy(x), np.copy(fx)]
+            return np.copy(fx)
+
+        x0, x1 = self._history
+        x2 = fx
+        self._history = []
+
+        dx = x2 - x1
+        d2 = x2 - 2.0 * x1 + x0
+        denom = np.sum(d2 * d2)
+        if denom < self.eps:
+            return np.copy(x2)
+
+        lam = np.sum(dx * d2) / denom
+        x_new = x2 - lam * dx
+
+        return x_new
+
+
+class Anderson:
+    """
+    Anderson acceleration (Anderson mixing) of type II as described in
+    Walker & Ni, SIAM J. Numer. Anal. (2011), Vol. 49, pp. 1715-1735.
+
+    Parameters
+    ----------
+    memory : int, optional
+        Number of previous iterates used to compute the next iterate
+    mixing : float, optional
+        Mixing (damping) parameter, 1.0 corresponds to no damping
+    """
+
+    def __init__(self, memory=5, mixing=1.0):
+        if memory < 1:
+            msg = 'Memory must be at least 1'
+            raise ValueError(msg)
+        self.memory = memory
+        self.mixing = mixing
+        self.reset()
+
+    def reset(self):
+        """
+        Reset state before a new fixed-point iteration is started.
+        """
+        self._f = []
+        self._g = []
+
+    def update(self, x, fx):
+        """
+        Compute the next iterate.
+
+        Parameters
+        ----------
+        x : np.ndarray
+            Current iterate
+        fx : np.ndarray
+            Fixed-point map evaluated at current iterate
+
+        Returns
+        -------
+        np.ndarray
+            Next iterate
+        """
+
+        f = np.ravel(fx).copy()
+        # Residual of current iterate
+        g = f - np.ravel(x)
+
+        self._f.append(f)
+        self._g.append(g)
+        if len(self._g) > self.memory + 1:
+            del self._f[0]
+            del self._g[0]
+
+        if len(self._g) == 1:
+            x_new = f - (1.0 - self.mixing) * g
+            return x_new.reshape(np.shape(fx))
+
+        # Differences of residuals and function values
+        dG = np.diff(np.array(self._g), axis=0).T
+        dF = np.diff(np.array(self._f), axis=0).T
+
+        # Solve least-squares problem min || g - dG gamma ||
+        gamma = np.linalg.lstsq(dG, g, rcond=None)[0]
+
+        x_new = f - dF @ gamma - (1.0 - self.mixing) * (g - dG @ gamma)
+
+        if not np.all(np.isfinite(x_new)):
+            # Fall back to plain iteration and discard history
+            self.reset()
+            x_new = f
+
+        return x_new.reshape(np.shape(fx))
+
@@ -0,0 +1,121 @@
+"""
+Asset grids adapted to the solution of the household problem.
+
+Starting from a coarse grid, points are added to the intervals with the
+largest Euler equation errors, which are typically those close to the
+asset level where the borrowing constraint starts to bind.
+
+The basic grid constructors are in grids.py, which does not depend on any
+solver.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+from dataclasses import replace
+
+import numpy as np
+
+import EGM
+import EGM_risk
+from diagnostics import dense_grid, euler_errors
+from grids import power_grid
+from interpolation import interp_rows
+
+
+def adaptive_grid(par, a_min, a_max, N_a, N_init=None, curv=1.4,
+                  target=None, step=0.25, density=10, **kwargs):
+    """
+    Create asset grid adapted to the solution of the household problem.
+
+    Starting from a coarse power-spaced grid, the problem is solved by
+    EGM and the largest Euler equation error is computed for each interval
+    of the grid. Midpoints are then added to the intervals with the largest
+    errors, and the problem is solved again (warm-started from the previous
+    solution) until the grid has N_a points or the target accuracy is
+    reached.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters. par.grid_a is ignored.
+    a_min : float
+        Lower bound
+    a_max : float
+        Upper bound
+    N_a : int
+        Max. number of grid points
+    N_init : int, optional
+        Number of points of the initial grid. Defaults to N_a // 4.
+    curv : float, optional
+        Curvature of the initial power-spaced grid
+    target : float, optional
+        If given, stop once the max. log10 Euler error is below target.
+        Errors are evaluated on a test grid with `density` points per
+        interval, which is therefore also refined near the kink.
+    step : float, optional
+        Number of points added in each round, as a fraction of the current
+        number of grid points.
+    density : int, optional
+        Number of test points per interval used to evaluate Euler errors
+    kwargs
+        Additional keyword arguments passed to the EGM solver
+
+    Returns
+    -------
+    np.ndarray
+        Asset grid
+    """
+
+    if N_init is None:
+        N_init = max(N_a // 4, 10)
+
+    if par.grid_y is None:
+        solver = EGM.egm
+    else:
+        solver = EGM_risk.egm
+
+    grid_a = power_grid(a_min, a_max, min(N_init, N_a), curv)
+    grid_prev = None
+    pfun_c = None
+
+    while True:
+        par_grid = replace(par, grid_a=grid_a)
+        if pfun_c is not None:
+            # Interpolate solution from previous grid onto current grid
+            x = np.broadcast_to(grid_a, pfun_c.shape[:-1] + grid_a.shape)
+            kwargs['pfun_c_init'] = interp_rows(x, grid_prev, pfun_c)
+
+        pfun_a, pfun_c = solver(par_grid, **kwargs)
+
+        if len(grid_a) >= N_a:
+            break
+
+        # Largest Euler error in each interval across income states.
+        # Errors are NaN where the borrowing constraint binds.
+        grid = dense_grid(grid_a, density)
+        err = np.atleast_2d(euler_errors(par_grid, pfun_a, pfun_c, grid))
+        err = np.nan_to_num(10.0**err, nan=0.0)
+        err = np.max(err, axis=0)
+        # Test points of interval i are grid[i*density:(i+1)*density],
+        # the last test point coincides with the upper bound.
+        err_int = np.max(err[:-1].reshape((-1, density)), axis=1)
+        err_int[-1] = max(err_int[-1], err[-1])
+
+        if target is not None and np.max(err_int) < 10.0**target:
+            break
+
+        # Bisect intervals with the largest errors
+        N_new = min(N_a - len(grid_a), max(int(step * len(grid_a)), 1))
+        idx = np.argsort(err_int)[::-1][:N_new]
+        idx = idx[err_int[idx] > 0.0]
+        if idx.size == 0:
+            break
+
+        grid_prev = grid_a
+        midpoints = (grid_a[idx] + grid_a[idx + 1]) / 2.0
+        grid_a = np.sort(np.concatenate((grid_a, midpoints)))
+
+    return grid_a
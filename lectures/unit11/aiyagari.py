@@ -0,0 +1,264 @@
+"""
+Solve for the stationary general equilibrium of the Aiyagari (1994) model.
+
+Households solve the problem with risky labour income from EGM_risk.py,
+where labour income is w * y. A representative firm with Cobb-Douglas
+technology Y = K**alpha * L**(1-alpha) rents capital and labour in
+competitive markets, so that
+    r = alpha * (K/L)**(alpha-1) - delta
+    w = (1-alpha) * (K/L)**alpha
+The equilibrium interest rate equates the firm's capital demand to the
+aggregate assets held by households in the stationary distribution.
+
+The interest rate is found with Brent's method. Household problems are
+solved via a SolutionCache and warm-started from the solutions at the
+closest interest rates evaluated so far, and the stationary distribution
+is warm-started from the previous evaluation. A complete solve therefore
+costs only a few times as much as solving the household problem once.
+
+Savings above the asset grid are truncated to its last grid point (see
+distribution.py), which understates aggregate savings. The mass on the
+last grid point is recorded for each evaluated interest rate, and a single
+warning is issued if the returned equilibrium may be affected.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import warnings
+from dataclasses import dataclass, replace
+from time import perf_counter
+
+import numpy as np
+from scipy.optimize import brentq
+
+from EGM_risk import egm
+from cache import SolutionCache
+from distribution import stationary_distribution
+from markov import markov_ergodic_dist
+from telemetry import report
+
+
+@dataclass
+class Equilibrium:
+    """
+    Stationary general equilibrium
+    """
+    r: float                # Interest rate
+    w: float                # Wage rate
+    K: float                # Aggregate capital
+    L: float                # Aggregate labour supply (efficiency units)
+    par: object             # Parameters at equilibrium prices
+    pfun_a: np.ndarray      # Savings policy function
+    pfun_c: np.ndarray      # Consumption policy function
+    dist: np.ndarray        # Stationary distribution
+    evaluations: int        # Number of interest rates evaluated
+    mass_max: dict          # Mass on last asset grid point for each
+                            # evaluated interest rate
+
+
+def firm_demand(r, alpha, delta, L=1.0):
+    """
+    Capital demand and wage rate implied by the firm's first-order
+    conditions for a given interest rate.
+
+    Parameters
+    ----------
+    r : float
+        Interest rate
+    alpha : float
+        Capital share
+    delta : float
+        Depreciation rate
+    L : float, optional
+        Aggregate labour supply
+
+    Returns
+    -------
+    K : float
+        Capital demand
+    w : float
+        Wage rate
+    """
+
+    if r <= -delta:
+        raise ValueError('Interest rate must exceed -delta')
+
+    # Capital-labour ratio
+    k = ((r + delta) / alpha)**(1.0 / (alpha - 1.0))
+    w = (1.0 - alpha) * k**alpha
+
+    return k * L, w
+
+
+def initial_guess(history, r):
+    """
+    Initial guess for the consumption policy at interest rate r, linearly
+    interpolated (or extrapolated) from the solutions at the two closest
+    interest rates evaluated so far.
+
+    Parameters
+    ----------
+    history : dict
+        Maps interest rates to consumption policy functions
+    r : float
+        Interest rate
+
+    Returns
+    -------
+    np.ndarray or None
+        Initial guess, or None if fewer than two solutions exist.
+    """
+
+    if len(history) < 2:
+        return None
+
+    r1, r2 = sorted(history, key=lambda x: abs(x - r))[:2]
+    wgt = (r - r1) / (r2 - r1)
+    pfun_c = (1.0 - wgt) * history[r1] + wgt * history[r2]
+
+    # Consumption must be positive
+    return np.maximum(pfun_c, 1.0e-10)
+
+
+def solve_equilibrium(par, alpha=0.36, delta=0.08, bracket=None, tol=1.0e-6,
+                      cache=None, dist_tol=1.0e-10, mass_tol=1.0e-4,
+                      callback=None, **kwargs):
+    """
+    Find the stationary equilibrium interest rate.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters. par.grid_y contains labour productivity, labour
+        income is w * par.grid_y. par.r is ignored.
+    alpha : float, optional
+        Capital share
+    delta : float, optional
+        Depreciation rate
+    bracket : tuple, optional
+        Interval (r_lo, r_hi) which contains the equilibrium interest rate.
+        Defaults to (-delta/2, 1/beta - 1 - 1e-3).
+    tol : float, optional
+        Termination tolerance for the interest rate
+    cache : SolutionCache, optional
+        Cache for household solutions. A new cache is created if not given;
+        pass an existing cache to reuse solutions across calls.
+    dist_tol : float, optional
+        Termination tolerance for the stationary distribution
+    mass_tol : float, optional
+        Warn if the mass on the last asset grid point exceeds this value
+        at the equilibrium interest rate, or at any evaluated interest rate
+        where truncation may have flipped the sign of excess demand.
+    callback : callable, optional
+        Called after each evaluated interest rate with an IterationRecord,
+        see telemetry.py. The reported diff is the width of the interval
+        which is known to contain the equilibrium interest rate, and is
+        compared to `tol`.
+    kwargs
+        Additional keyword arguments passed to EGM_risk.egm(), for example
+        accelerator=Anderson() to further reduce the number of iterations.
+
+    Returns
+    -------
+    Equilibrium
+    """
+
+    t0 = perf_counter()
+
+    if cache is None:
+        cache = SolutionCache()
+
+    if bracket is None:
+        bracket = (-0.5 * delta, 1.0 / par.beta - 1.0 - 1.0e-3)
+
+    # Aggregate labour supply in efficiency units
+    L = np.dot(markov_ergodic_dist(par.tm_y), par.grid_y)
+
+    # Results of the most recent evaluation
+    last = {'dist': None, 'evaluations': 0}
+    # Interest rates with the same sign of excess demand as r_lo and r_hi,
+    # respectively, which bracket the equilibrium interest rate. Brent's
+    # method always maintains such a bracket.
+    r_bracket = list(bracket)
+    sign_lo = []
+    # Consumption policies for all interest rates evaluated so far
+    history = {}
+    # Mass on last asset grid point and excess demand for capital for all
+    # interest rates evaluated so far
+    mass_max = {}
+    excess = {}
+
+    def solve_households(r):
+        K, w = firm_demand(r, alpha, delta, L)
+        par_r = replace(par, r=r, grid_y=w * par.grid_y)
+        pfun_c_init = initial_guess(history, r)
+        if pfun_c_init is None:
+            # Let cache warm-start from nearest cached solution, if any
+            pfun_a, pfun_c = cache.solve(par_r, egm, **kwargs)
+        else:
+            pfun_a, pfun_c = cache.solve(
+                par_r, egm, pfun_c_init=pfun_c_init, **kwargs
+            )
+        history[r] = pfun_c
+        # Truncation is checked once for the equilibrium below, instead
+        # of warning for every evaluated interest rate.
+        dist, A, C = stationary_distribution(
+            par_r, pfun_a, pfun_c, tol=dist_tol, dist_init=last['dist'],
+            mass_tol=np.inf
+        )
+        last['dist'] = dist
+        mass_max[r] = np.sum(dist[:, -1])
+        excess[r] = K - A
+        return K, w, A, par_r, pfun_a, pfun_c, dist
+
+    def excess_demand(r):
+        t1 = perf_counter()
+        K, w, A = solve_households(r)[:3]
+        it = last['evaluations']
+        last['evaluations'] += 1
+
+        # Update bracket. The first evaluation is at r_lo.
+        sign = np.sign(K - A)
+        if not sign_lo:
+            sign_lo.append(sign)
+        if sign == 0.0:
+            r_bracket[:] = r, r
+        elif sign == sign_lo[0]:
+            r_bracket[0] = r
+        else:
+            r_bracket[1] = r
+
+        report(
+            callback, 'GE', it, abs(r_bracket[1] - r_bracket[0]),
+            perf_counter() - t0, perf_counter() - t1, tol
+        )
+        return K - A
+
+    r = brentq(excess_demand, *bracket, xtol=tol)
+
+    # Household solution at equilibrium interest rate is served from cache
+    K, w, A, par_r, pfun_a, pfun_c, dist = solve_households(r)
+
+    # Truncation understates savings, so it can only flip the sign of excess
+    # demand from negative to positive.
+    suspect = [
+        x for x in mass_max if mass_max[x] > mass_tol and excess[x] > 0.0
+    ]
+    if mass_max[r] > mass_tol or suspect:
+        msg = f'GE: Mass on last asset grid point is {mass_max[r]:4.2e} ' \
+              f'at equilibrium r={r:.4f}'
+        if suspect:
+            msg += f', excess demand may have the wrong sign at ' \
+                   f'{len(suspect):d} evaluated interest rates'
+        msg += ', consider increasing the upper bound of the asset grid'
+        warnings.warn(msg, RuntimeWarning, stacklevel=2)
+
+    eq = Equilibrium(
+        r, w, K, L, par_r, pfun_a, pfun_c, dist, last['evaluations'],
+        mass_max
+    )
+
+    return eq
@@ -0,0 +1,385 @@
+"""
+Benchmark the VFI and EGM solvers over a matrix of grid sizes and
+preference parameters.
+
+For each combination, the benchmark records wall time (in total and in
+the maximisation step), number of iterations, peak memory and Euler
+equation errors. Results can be written
+to JSON or CSV and compared against a stored baseline to flag regressions.
+
+No baseline is distributed with this module, since timings depend on the
+machine. Create one by running the benchmark with --output before making
+changes, then pass it to --baseline on the same machine afterwards:
+    python benchmark.py --N-a 50 100 200 --output baseline.json
+    python benchmark.py --N-a 50 100 200 --baseline baseline.json
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os.path
+import sys
+import tracemalloc
+import warnings
+from time import perf_counter
+
+import numpy as np
+
+from diagnostics import euler_error_stats
+from grids import power_grid
+from parameters import Parameters, with_income
+from solvers import SOLVERS, policies
+from telemetry import MemoryCollector
+
+# Fields identifying a benchmark case
+KEYS = ('model', 'solver', 'N_a', 'N_y', 'beta', 'gamma')
+
+
+def make_parameters(model, N_a, N_y, beta, gamma, a_max=10.0):
+    """
+    Create parameters and grids for a benchmark case.
+
+    Parameters
+    ----------
+    model : str
+        Either 'deterministic' or 'risky'
+    N_a : int
+        Number of asset grid points
+    N_y : int
+        Number of labour income states (ignored for deterministic model)
+    beta : float
+        Discount factor
+    gamma : float
+        Coefficient of relative risk aversion
+    a_max : float, optional
+        Upper bound of asset grid
+
+    Returns
+    -------
+    Parameters
+    """
+
+    grid_a = power_grid(0.0, a_max, N_a)
+    par = Parameters(beta=beta, gamma=gamma, grid_a=grid_a)
+
+    if model == 'risky':
+        par = with_income(par, N_y)
+
+    return par
+
+
+def run_case(model, solver_name, N_a, N_y, beta, gamma, repeat=1,
+             memory=True, density=10, **kwargs):
+    """
+    Benchmark a single solver for a given parametrisation.
+
+    Parameters
+    ----------
+    model : str
+        Either 'deterministic' or 'risky'
+    solver_name : str
+        One of 'vfi_grid', 'vfi_interp' or 'egm'
+    N_a : int
+        Number of asset grid points
+    N_y : int
+        Number of labour income states
+    beta : float
+        Discount factor
+    gamma : float
+        Coefficient of relative risk aversion
+    repeat : int, optional
+        Number of timed runs, the fastest is reported.
+    memory : bool, optional
+        If true, perform one additional run to measure peak memory. This
+        is done separately as tracing allocations slows down the solver.
+    density : int, optional
+        Number of Euler error test points per asset grid interval
+    kwargs
+        Additional keyword arguments passed to the solver
+
+    Returns
+    -------
+    dict
+        Benchmark record
+    """
+
+    solver = SOLVERS[model][solver_name]
+    par = make_parameters(model, N_a, N_y, beta, gamma)
+
+    collector = MemoryCollector()
+
+    times = []
+    with warnings.catch_warnings():
+        # Non-convergence is recorded in the results instead
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        for i in range(repeat):
+            collector.clear()
+            t0 = perf_counter()
+            sol = solver(par, callback=collector, **kwargs)
+            times.append(perf_counter() - t0)
+
+        peak_mem = None
+        if memory:
+            tracemalloc.start()
+            solver(par, **kwargs)
+            peak_mem = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+
+    stats = collector.as_arrays()
+
+    pfun_a, pfun_c = policies(par, solver_name, sol)
+    max_err, mean_err = euler_error_stats(par, pfun_a, pfun_c, density)
+
+    record = {
+        'model': model,
+        'solver': solver_name,
+        'N_a': N_a,
+        'N_y': N_y,
+        'beta': beta,
+        'gamma': gamma,
+        'time': min(times),
+        'time_max': float(np.sum(stats['time_max'])),
+        'iterations': collector.iterations,
+        'converged': collector.converged,
+        'peak_mem_mb': peak_mem,
+        'euler_max': float(max_err),
+        'euler_mean': float(mean_err),
+    }
+
+    return record
+
+
+def run_benchmark(models=('deterministic', 'risky'),
+                  solvers=('vfi_grid', 'vfi_interp', 'egm'),
+                  N_a=(50, 100, 200), N_y=(3, ), beta=(0.96, ),
+                  gamma=(1.0, 2.0), repeat=1, memory=True, density=10,
+                  verbose=True, **kwargs):
+    """
+    Benchmark solvers over all combinations of the given arguments.
+
+    Parameters
+    ----------
+    models : sequence of str
+        Models to benchmark
+    solvers : sequence of str
+        Solvers to benchmark
+    N_a, N_y, beta, gamma : sequence
+        Values of grid sizes and parameters to benchmark. N_y is ignored
+        for the deterministic model.
+    repeat : int, optional
+        Number of timed runs per case
+    memory : bool, optional
+        If true, measure peak memory
+    density : int, optional
+        Number of Euler error test points per asset grid interval
+    verbose : bool, optional
+        If true, print a line for each completed case
+    kwargs
+        Additional keyword arguments passed to all solvers
+
+    Returns
+    -------
+    list of dict
+        Benchmark records
+    """
+
+    records = []
+    for model, solver_name in itertools.product(models, solvers):
+        N_y_model = N_y if model == 'risky' else (1, )
+        for n_a, n_y, b, g in itertools.product(N_a, N_y_model, beta, gamma):
+            rec = run_case(
+                model, solver_name, n_a, n_y, b, g, repeat, memory, density,
+                **kwargs
+            )
+            records.append(rec)
+            if verbose:
+                msg = f'{model:>13s} {solver_name:>10s} N_a={n_a:5d} ' \
+                      f'N_y={n_y:2d} beta={b:.3f} gamma={g:.2f}: ' \
+                      f'{rec["time"]:8.3f} sec., {rec["iterations"]} iter., ' \
+                      f'Euler err. {rec["euler_max"]:.2f}'
+                print(msg)
+
+    return records
+
+
+def write_results(records, path):
+    """
+    Write benchmark records to JSON or CSV file, depending on extension.
+
+    Parameters
+    ----------
+    records : list of dict
+    path : str
+    """
+
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(records[0].keys()))
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, 'w') as f:
+            json.dump(records, f, indent=2)
+
+
+def read_results(path):
+    """
+    Read benchmark records from JSON or CSV file.
+
+    Parameters
+    ----------
+    path : str
+
+    Returns
+    -------
+    list of dict
+    """
+
+    if path.endswith('.csv'):
+        with open(path, newline='') as f:
+            records = list(csv.DictReader(f))
+        # Convert numerical fields which are read as strings
+        for rec in records:
+            for name, value in rec.items():
+                if name in ('model', 'solver'):
+                    continue
+                elif value in ('', 'None'):
+                    rec[name] = None
+                elif value in ('True', 'False'):
+                    rec[name] = value == 'True'
+                else:
+                    rec[name] = float(value)
+    else:
+        with open(path) as f:
+            records = json.load(f)
+
+    return records
+
+
+def _key(rec):
+    # Key identifying a benchmark case, robust to int/float conversions
+    return tuple(
+        rec[k] if isinstance(rec[k], str) else float(rec[k]) for k in KEYS
+    )
+
+
+def compare(records, baseline, time_tol=1.2, euler_tol=0.5, min_diff=0.01):
+    """
+    Compare benchmark records against a baseline.
+
+    Parameters
+    ----------
+    records : list of dict
+        Current benchmark records
+    baseline : list of dict
+        Baseline benchmark records
+    time_tol : float, optional
+        Flag regression if time exceeds baseline time by this factor
+    euler_tol : float, optional
+        Flag regression if the max. log10 Euler error increases by more
+        than this amount
+    min_diff : float, optional
+        Timing differences below this many seconds are ignored, as they
+        are dominated by noise for very fast cases.
+
+    Returns
+    -------
+    list of str
+        Description of each regression
+    """
+
+    base = {_key(rec): rec for rec in baseline}
+
+    regressions = []
+    for rec in records:
+        ref = base.get(_key(rec))
+        if ref is None:
+            continue
+        case = ', '.join(f'{k}={rec[k]}' for k in KEYS)
+        slower = rec['time'] - ref['time']
+        if rec['time'] > time_tol * ref['time'] and slower > min_diff:
+            regressions.append(
+                f'{case}: time {rec["time"]:.3f} vs. {ref["time"]:.3f} sec.'
+            )
+        if rec['euler_max'] > ref['euler_max'] + euler_tol:
+            regressions.append(
+                f'{case}: Euler error {rec["euler_max"]:.2f} '
+                f'vs. {ref["euler_max"]:.2f}'
+            )
+        if ref['converged'] and not rec['converged']:
+            regressions.append(f'{case}: did not converge')
+
+    return regressions
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument(
+        '--models', nargs='+', default=['deterministic', 'risky'],
+        choices=list(SOLVERS)
+    )
+    parser.add_argument(
+        '--solvers', nargs='+', default=['vfi_grid', 'vfi_interp', 'egm'],
+        choices=list(SOLVERS['risky'])
+    )
+    parser.add_argument('--N-a', nargs='+', type=int, default=[50, 100, 200])
+    parser.add_argument('--N-y', nargs='+', type=int, default=[3])
+    parser.add_argument('--beta', nargs='+', type=float, default=[0.96])
+    parser.add_argument('--gamma', nargs='+', type=float, default=[1.0, 2.0])
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument(
+        '--no-memory', action='store_true', help='Skip peak memory measurement'
+    )
+    parser.add_argument(
+        '--density', type=int, default=10,
+        help='Euler error test points per asset grid interval'
+    )
+    parser.add_argument('--output', help='Output file (.json or .csv)')
+    parser.add_argument(
+        '--baseline',
+        help='Baseline file to compare against, written by an earlier run '
+             'with --output on the same machine'
+    )
+    parser.add_argument(
+        '--time-tol', type=float, default=1.2,
+        help='Max. ratio of time relative to baseline'
+    )
+    args = parser.parse_args(argv)
+
+    if args.baseline and not os.path.isfile(args.baseline):
+        parser.error(
+            f'Baseline file {args.baseline} does not exist, create it by '
+            f'running the benchmark with --output {args.baseline}'
+        )
+
+    records = run_benchmark(
+        args.models, args.solvers, args.N_a, args.N_y, args.beta, args.gamma,
+        repeat=args.repeat, memory=not args.no_memory, density=args.density
+    )
+
+    if args.output:
+        write_results(records, args.output)
+
+    if args.baseline:
+        regressions = compare(records, read_results(args.baseline), args.time_tol)
+        for msg in regressions:
+            print(f'REGRESSION: {msg}')
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,282 @@
+"""
+Cache for solutions of the household problem, keyed by model parameters.
+
+Repeated solves with identical parameters are served from the cache. For
+parameters that have not been solved before, the solver is warm-started
+from the cached solution with the closest parameters.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import hashlib
+import os.path
+from collections import OrderedDict
+from dataclasses import fields, is_dataclass
+from numbers import Number
+
+import numpy as np
+
+from continuation import warm_start_spec
+
+
+def parameter_fields(par):
+    """
+    Collect all public data attributes of a Parameters object.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters and grids
+
+    Returns
+    -------
+    scalars : dict
+        Attributes with numerical scalar values
+    arrays : dict
+        Attributes which are arrays
+    """
+
+    if is_dataclass(par):
+        # Exclude derived attributes such as cash-at-hand
+        names = sorted(f.name for f in fields(par))
+    else:
+        names = sorted(dir(par))
+
+    scalars = {}
+    arrays = {}
+    for name in names:
+        if name.startswith('_'):
+            continue
+        value = getattr(par, name)
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif isinstance(value, Number) and not isinstance(value, bool):
+            scalars[name] = float(value)
+
+    return scalars, arrays
+
+
+def _solver_id(solver, kwargs):
+    # Identify solver and options that affect the solution
+    opts = []
+    for name, value in sorted(kwargs.items()):
+        if name in ('callback', 'vfun_init', 'pfun_c_init'):
+            # Telemetry and initial guesses do not affect the solution
+            continue
+        elif value is None or isinstance(value, (Number, str)):
+            opts.append(f'{name}={value!r}')
+        else:
+            opts.append(f'{name}={type(value).__name__}')
+    return f'{solver.__module__}.{solver.__name__}({", ".join(opts)})'
+
+
+def solution_key(par, solver, **kwargs):
+    """
+    Compute hash key identifying a solution. The key is stable across
+    processes, so it can be used to name files.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters, grids and preferences
+    solver : callable
+        Solver function
+    kwargs
+        Options passed to the solver
+
+    Returns
+    -------
+    str
+    """
+
+    # Parameters are identified by their scalar attributes, preferences
+    # and a hash of their arrays, see Parameters._key()
+    h = hashlib.sha1(_solver_id(solver, kwargs).encode())
+    h.update(repr(par._key()).encode())
+
+    return h.hexdigest()
+
+
+class SolutionCache:
+    """
+    LRU cache of household problem solutions with an optional on-disk tier.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        Max. number of solutions kept in memory
+    directory : str, optional
+        If given, solutions are also stored as .npz files in this directory
+        and loaded from there if they are not in memory.
+
+    Attributes
+    ----------
+    hits : int
+        Number of solves served from the cache
+    misses : int
+        Number of solves for which the solver was called
+    warm_starts : int
+        Number of misses which were warm-started from a cached solution
+    """
+
+    def __init__(self, maxsize=128, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        # Maps keys to tuples (solver ID, preferences, scalar parameters,
+        # solution)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.warm_starts = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def _insert(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Look up solution for given key.
+
+        Parameters
+        ----------
+        key : str
+            Key as returned by solution_key()
+
+        Returns
+        -------
+        tuple or None
+            Cached solution, or None if not found
+        """
+
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key][3]
+
+        if self.directory is not None and os.path.isfile(self._path(key)):
+            with np.load(self._path(key)) as data:
+                solver_id = str(data['solver_id'])
+                utility = str(data['utility'])
+                names = sorted(k for k in data.files if k.startswith('par_'))
+                scalars = {k[4:]: float(data[k]) for k in names}
+                n = sum(k.startswith('sol_') for k in data.files)
+                sol = tuple(data[f'sol_{i}'] for i in range(n))
+            for arr in sol:
+                arr.flags.writeable = False
+            self._insert(key, (solver_id, utility, scalars, sol))
+            return sol
+
+        return None
+
+    def nearest(self, par, solver, **kwargs):
+        """
+        Find cached solution with the closest parameters which was computed
+        by the same solver using the same options, preferences and grid
+        sizes.
+
+        Parameters
+        ----------
+        par : Parameters
+            Model parameters and grids
+        solver : callable
+            Solver function
+        kwargs
+            Options passed to the solver
+
+        Returns
+        -------
+        tuple or None
+            Cached solution, or None if no compatible solution exists.
+        """
+
+        solver_id = _solver_id(solver, kwargs)
+        utility = repr(par.utility)
+        scalars, arrays = parameter_fields(par)
+        shape = (len(par.grid_a), )
+        if 'grid_y' in arrays:
+            shape = (len(par.grid_y), ) + shape
+
+        best, dist_best = None, np.inf
+        for sid, utility_c, scalars_c, sol in self._entries.values():
+            if sid != solver_id or sol[0].shape != shape:
+                continue
+            if utility_c != utility:
+                continue
+            if scalars_c.keys() != scalars.keys():
+                continue
+            # Distance in terms of relative parameter differences
+            dist = sum(
+                ((scalars[k] - scalars_c[k]) / max(abs(scalars[k]), 1.0e-8))**2
+                for k in scalars
+            )
+            if dist < dist_best:
+                best, dist_best = sol, dist
+
+        return best
+
+    def solve(self, par, solver, **kwargs):
+        """
+        Return cached solution or call solver, warm-starting from the
+        closest cached solution if possible.
+
+        Parameters
+        ----------
+        par : Parameters
+            Model parameters and grids
+        solver : callable
+            Any of the vfi_grid, vfi_interp or egm functions.
+        kwargs
+            Additional keyword arguments passed to the solver
+
+        Returns
+        -------
+        tuple
+            Solution as returned by the solver. Arrays are read-only as
+            they are shared with the cache.
+        """
+
+        key = solution_key(par, solver, **kwargs)
+        sol = self.get(key)
+        if sol is not None:
+            self.hits += 1
+            return sol
+
+        self.misses += 1
+
+        idx, init_arg = warm_start_spec(solver)
+        near = self.nearest(par, solver, **kwargs)
+        if near is not None and init_arg not in kwargs:
+            self.warm_starts += 1
+            sol = solver(par, **kwargs, **{init_arg: near[idx]})
+        else:
+            sol = solver(par, **kwargs)
+
+        for arr in sol:
+            arr.flags.writeable = False
+
+        solver_id = _solver_id(solver, kwargs)
+        utility = repr(par.utility)
+        scalars, _ = parameter_fields(par)
+        self._insert(key, (solver_id, utility, scalars, sol))
+
+        if self.directory is not None:
+            data = {f'sol_{i}': arr for i, arr in enumerate(sol)}
+            data.update({f'par_{k}': v for k, v in scalars.items()})
+            np.savez(
+                self._path(key), solver_id=solver_id, utility=utility, **data
+            )
+
+        return sol
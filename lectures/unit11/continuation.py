@@ -0,0 +1,116 @@
+"""
+Grid-refinement continuation for the VFI and EGM solvers: solve the
+household problem on coarse asset grids first and use each solution as
+the initial guess on the next finer grid.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+from dataclasses import replace
+
+import numpy as np
+
+from grids import power_grid
+from interpolation import interp_rows
+
+
+def with_grid(par, grid_a):
+    """
+    Return copy of Parameters object with a different asset grid.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters and grids
+    grid_a : np.ndarray
+        New asset grid
+
+    Returns
+    -------
+    Parameters
+    """
+    return replace(par, grid_a=grid_a)
+
+
+def warm_start_spec(solver):
+    """
+    Determine how a solver's solution is used to warm-start another solve.
+
+    Parameters
+    ----------
+    solver : callable
+        Any of the vfi_grid, vfi_interp or egm functions.
+
+    Returns
+    -------
+    idx : int
+        Index of the array in the solver's return value that serves as
+        initial guess: VFI solvers return (vfun, pfun), EGM returns
+        (pfun_a, pfun_c).
+    init_arg : str
+        Name of the solver argument which accepts the initial guess
+    """
+    if solver.__name__ == 'egm':
+        return 1, 'pfun_c_init'
+    else:
+        return 0, 'vfun_init'
+
+
+def solve_continuation(par, solver, stages=None, curv=1.4, **kwargs):
+    """
+    Solve household problem on a sequence of increasingly finer asset
+    grids, warm-starting each stage from the solution of the previous one.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters. The final stage is solved on par.grid_a.
+    solver : callable
+        Any of the vfi_grid, vfi_interp or egm functions.
+    stages : sequence of int, optional
+        Number of grid points for each coarse stage. Defaults to grids
+        with 50, 200, 800, ... points which are smaller than the final grid.
+    curv : float, optional
+        Curvature of the coarse power-spaced grids
+    kwargs
+        Additional keyword arguments passed to the solver in each stage
+
+    Returns
+    -------
+    tuple
+        Solution returned by solver on the final grid
+    """
+
+    idx, init_arg = warm_start_spec(solver)
+
+    N_a = len(par.grid_a)
+    a_min, a_max = par.grid_a[0], par.grid_a[-1]
+
+    if stages is None:
+        stages = []
+        N = 50
+        while N < N_a:
+            stages.append(N)
+            N *= 4
+
+    grids = [power_grid(a_min, a_max, N, curv) for N in stages]
+    grids.append(par.grid_a)
+
+    init = None
+    grid_prev = None
+    for grid_a in grids:
+        par_stage = with_grid(par, grid_a)
+        if init is not None:
+            # Interpolate solution from previous stage onto current grid
+            x = np.broadcast_to(grid_a, init.shape[:-1] + grid_a.shape)
+            kwargs[init_arg] = interp_rows(x, grid_prev, init)
+
+        sol = solver(par_stage, **kwargs)
+
+        init = sol[idx]
+        grid_prev = grid_a
+
+    return sol
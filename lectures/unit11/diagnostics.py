@@ -0,0 +1,157 @@
+"""
+Accuracy diagnostics for solutions of the household problem.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+
+from interpolation import interp_rows
+from utility import preferences
+
+
+def income_process(par):
+    """
+    Return labour income grid and transition matrix, treating deterministic
+    labour income as a Markov chain with a single state.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+
+    Returns
+    -------
+    grid_y : np.ndarray
+    tm_y : np.ndarray
+    """
+    if getattr(par, 'tm_y', None) is None:
+        return np.array([par.y]), np.ones((1, 1))
+    else:
+        return par.grid_y, par.tm_y
+
+
+def dense_grid(grid_a, density=10):
+    """
+    Create dense test grid which contains the asset grid and
+    `density` - 1 equally spaced points between any two grid points.
+
+    Parameters
+    ----------
+    grid_a : np.ndarray
+        Asset grid
+    density : int, optional
+        Number of test points per interval of the asset grid
+
+    Returns
+    -------
+    np.ndarray
+        Test grid with (len(grid_a) - 1) * density + 1 points
+    """
+
+    wgt = np.arange(density) / density
+    grid = grid_a[:-1, None] + wgt[None] * np.diff(grid_a)[:, None]
+
+    return np.append(grid.ravel(), grid_a[-1])
+
+
+def euler_errors(par, pfun_a, pfun_c, grid=None):
+    """
+    Compute unit-free Euler equation errors at given asset levels.
+
+    Policies are linearly interpolated between asset grid points, which
+    is how they are used by the solvers and the simulation code.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+    pfun_a : np.ndarray
+        Savings policy function, shape (N_a, ) or (N_y, N_a)
+    pfun_c : np.ndarray
+        Consumption policy function, same shape as pfun_a
+    grid : np.ndarray, optional
+        Asset levels at which errors are evaluated. Defaults to par.grid_a.
+
+    Returns
+    -------
+    np.ndarray
+        log10 of absolute relative Euler equation errors with shape
+        (len(grid), ) or (N_y, len(grid)). Errors are NaN at asset levels
+        where the borrowing constraint binds.
+    """
+
+    beta, r = par.beta, par.r
+    util = preferences(par)
+    grid_a = par.grid_a
+    grid_y, tm_y = income_process(par)
+
+    if grid is None:
+        grid = grid_a
+
+    deterministic = np.ndim(pfun_c) == 1
+    pfun_a = np.atleast_2d(pfun_a)
+    pfun_c = np.atleast_2d(pfun_c)
+    N_y = len(grid_y)
+
+    # Policies at test points for each current income state
+    x = np.broadcast_to(grid, (N_y, len(grid)))
+    cons = interp_rows(x, grid_a, pfun_c, extrapolate=True)
+    sav = interp_rows(x, grid_a, pfun_a, extrapolate=True)
+
+    # Next-period consumption at chosen savings level for each y' and
+    # (y, a), computed in one batch for all current states
+    x_next = np.broadcast_to(sav.ravel(), (N_y, sav.size))
+    cons_next = interp_rows(x_next, grid_a, pfun_c, extrapolate=True)
+    cons_next = cons_next.reshape((N_y, ) + sav.shape)
+
+    # Expected marginal utility tomorrow: cons_next is indexed (y', y, a)
+    emu = np.einsum('ij,jik->ik', tm_y, util.marginal(cons_next))
+
+    # Consumption implied by the Euler equation
+    cons_ee = util.inverse_marginal(beta * (1.0 + r) * emu)
+
+    with np.errstate(divide='ignore'):
+        err = np.log10(np.abs(1.0 - cons_ee / cons))
+
+    # Euler equation holds with equality only if HH saves
+    err = np.where(sav > grid_a[0] + 1.0e-10, err, np.nan)
+
+    if deterministic:
+        err = err[0]
+
+    return err
+
+
+def euler_error_stats(par, pfun_a, pfun_c, density=10):
+    """
+    Compute max. and mean log10 Euler equation errors on a test grid
+    which is denser than the asset grid.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+    pfun_a : np.ndarray
+        Savings policy function
+    pfun_c : np.ndarray
+        Consumption policy function
+    density : int, optional
+        Number of test points per interval of the asset grid
+
+    Returns
+    -------
+    max_err : float
+    mean_err : float
+    """
+
+    grid = dense_grid(par.grid_a, density)
+    err = euler_errors(par, pfun_a, pfun_c, grid)
+    err = err[np.isfinite(err)]
+    if err.size == 0:
+        return np.nan, np.nan
+
+    return np.max(err), np.mean(err)
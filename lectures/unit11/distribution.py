@@ -0,0 +1,220 @@
+"""
+Stationary distribution of households over labour income and assets
+for the model with risky labour income, using the histogram method
+of Young, Journal of Economic Dynamics & Control (2010), Vol. 34, pp. 36-41.
+
+Savings choices which fall between two asset grid points are assigned to
+these grid points with lottery weights. The transition operator is never
+formed explicitly: the asset transition is a sparse matrix with two
+non-zero elements per row, and the income transition is applied with the
+(small) transition matrix of the income process. Memory therefore scales
+with N_y * N_a.
+
+Savings above the largest asset grid point are truncated, i.e. assigned to
+the last grid point, and savings below the borrowing limit to the first.
+The aggregates are therefore biased if the distribution puts non-negligible
+mass on the upper bound of the grid, which stationary_distribution() warns
+about; the fix is to extend the asset grid.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import warnings
+from time import perf_counter
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import LinearOperator, eigs
+
+from markov import markov_ergodic_dist
+from telemetry import report, warn_not_converged
+
+
+def lottery(pfun_a, grid_a):
+    """
+    Assign savings choices to the two bracketing asset grid points.
+
+    Parameters
+    ----------
+    pfun_a : np.ndarray
+        Savings policy function
+    grid_a : np.ndarray
+        Asset grid
+
+    Returns
+    -------
+    ilo : np.ndarray
+        Index of lower bracketing grid point for each element of pfun_a
+    wgt : np.ndarray
+        Probability assigned to the lower grid point. The remaining
+        probability is assigned to the grid point ilo + 1.
+    """
+
+    # Savings outside of the grid are assigned to the boundary points,
+    # i.e. the distribution is truncated at the upper end of the grid.
+    a_to = np.clip(pfun_a, grid_a[0], grid_a[-1])
+
+    ilo = np.searchsorted(grid_a, a_to, side='right') - 1
+    ilo = np.clip(ilo, 0, len(grid_a) - 2)
+
+    wgt = (grid_a[ilo + 1] - a_to) / (grid_a[ilo + 1] - grid_a[ilo])
+
+    return ilo, wgt
+
+
+def asset_transition(pfun_a, grid_a):
+    """
+    Create sparse transition matrix over (y, a) implied by the savings
+    policy, keeping labour income fixed.
+
+    Parameters
+    ----------
+    pfun_a : np.ndarray
+        Savings policy function, shape (N_y, N_a)
+    grid_a : np.ndarray
+        Asset grid
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix
+        Matrix of shape (N_y*N_a, N_y*N_a) where element (i, j) is the
+        probability of moving from flattened state i to state j.
+    """
+
+    N_y, N_a = pfun_a.shape
+    N = N_y * N_a
+
+    ilo, wgt = lottery(pfun_a, grid_a)
+
+    # Column indices in terms of flattened (y, a') states
+    offset = N_a * np.arange(N_y)[:, None]
+    cols = np.stack((ilo + offset, ilo + 1 + offset), axis=-1)
+    vals = np.stack((wgt, 1.0 - wgt), axis=-1)
+
+    # Each row has exactly two entries
+    indptr = np.arange(0, 2*N + 1, 2)
+    Q = csr_matrix((vals.ravel(), cols.ravel(), indptr), shape=(N, N))
+
+    return Q
+
+
+def stationary_distribution(par, pfun_a, pfun_c=None, method='iterate',
+                            tol=1.0e-10, maxiter=100000, dist_init=None,
+                            mass_tol=1.0e-4, callback=None):
+    """
+    Compute stationary distribution over labour income and assets.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters and grids
+    pfun_a : np.ndarray
+        Savings policy function, shape (N_y, N_a)
+    pfun_c : np.ndarray, optional
+        Consumption policy function. Recovered from the budget constraint
+        if not given.
+    method : str, optional
+        Either 'iterate' to iterate on the distribution until convergence,
+        or 'eigs' to compute the distribution as the eigenvector of the
+        transition operator associated with the unit eigenvalue.
+    tol : float, optional
+        Termination tolerance
+    maxiter : int, optional
+        Max. number of iterations
+    dist_init : np.ndarray, optional
+        Initial guess for the distribution, for example from a previous
+        call with slightly different policies. Defaults to the ergodic
+        income distribution and a uniform distribution over assets.
+    mass_tol : float, optional
+        Warn if the mass on the last asset grid point exceeds this value,
+        since savings above the grid are truncated to the last grid point.
+    callback : callable, optional
+        Called after each iteration with an IterationRecord, see
+        telemetry.py. Only used for method 'iterate'.
+
+    Returns
+    -------
+    dist : np.ndarray
+        Stationary distribution, shape (N_y, N_a)
+    A : float
+        Aggregate assets (savings) held by households
+    C : float
+        Aggregate consumption
+    """
+
+    if method not in ('iterate', 'eigs'):
+        msg = f'Unknown method: {method}'
+        raise ValueError(msg)
+
+    t0 = perf_counter()
+
+    N_y, N_a = pfun_a.shape
+    N = N_y * N_a
+
+    Q = asset_transition(pfun_a, par.grid_a)
+    # Transposed operator moves the distribution forward in time
+    QT = Q.T.tocsr()
+    tm_y_T = np.ascontiguousarray(par.tm_y.T)
+
+    def forward(dist):
+        # Move distribution one period forward: savings choice first,
+        # then realisation of next-period labour income.
+        dist_a = (QT @ np.ravel(dist)).reshape((N_y, N_a))
+        return np.dot(tm_y_T, dist_a)
+
+    if dist_init is None:
+        edist = markov_ergodic_dist(par.tm_y)
+        dist = np.outer(edist, np.full(N_a, 1.0 / N_a))
+    else:
+        dist = np.array(dist_init, dtype=float)
+        dist /= np.sum(dist)
+
+    if method == 'iterate':
+        for it in range(maxiter):
+            t1 = perf_counter()
+            dist_upd = forward(dist)
+            time_step = perf_counter() - t1
+
+            diff = np.max(np.abs(dist_upd - dist))
+            dist = dist_upd
+
+            report(
+                callback, 'Distribution', it, diff, perf_counter() - t0,
+                time_step, tol
+            )
+
+            if diff < tol:
+                break
+        else:
+            warn_not_converged('Distribution', maxiter, diff)
+    else:
+        op = LinearOperator((N, N), matvec=lambda x: np.ravel(forward(x)))
+        vals, vecs = eigs(op, k=1, which='LM', v0=np.ravel(dist), tol=tol)
+        # Eigenvector is only determined up to scale (and sign)
+        dist = np.real(vecs[:, 0]).reshape((N_y, N_a))
+        dist /= np.sum(dist)
+
+    # Eliminate numerical noise and normalise
+    dist = np.maximum(dist, 0.0)
+    dist /= np.sum(dist)
+
+    # Savings above the grid are truncated to the last grid point, which
+    # should therefore not be reached with any significant probability.
+    mass_max = np.sum(dist[:, -1])
+    if mass_max > mass_tol:
+        msg = f'Distribution: Mass on last asset grid point is ' \
+              f'{mass_max:4.2e}, consider increasing the upper bound of ' \
+              f'the asset grid'
+        warnings.warn(msg, RuntimeWarning, stacklevel=2)
+
+    if pfun_c is None:
+        pfun_c = par.cah - pfun_a
+
+    # Aggregate savings and consumption
+    A = np.sum(dist * pfun_a)
+    C = np.sum(dist * pfun_c)
+
+    return dist, A, C
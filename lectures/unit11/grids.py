@@ -0,0 +1,64 @@
+"""
+Asset grids for the household problem.
+
+Power-spaced and double-exponential grids place more points at the lower
+end of the asset grid, where policy functions have more curvature. See
+adaptive.py for grids constructed from the solution itself.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+
+
+def power_grid(a_min, a_max, N_a, curv=1.4):
+    """
+    Create asset grid with more points at the lower end.
+
+    Parameters
+    ----------
+    a_min : float
+        Lower bound
+    a_max : float
+        Upper bound
+    N_a : int
+        Number of grid points
+    curv : float, optional
+        Curvature, grid is uniformly spaced if curv = 1.0
+
+    Returns
+    -------
+    np.ndarray
+    """
+    return a_min + (a_max - a_min) * np.linspace(0.0, 1.0, N_a)**curv
+
+
+def double_exp_grid(a_min, a_max, N_a):
+    """
+    Create asset grid which is uniformly spaced in log(log(a - a_min + 1) + 1),
+    which places even more points at the lower end than a power grid.
+
+    Parameters
+    ----------
+    a_min : float
+        Lower bound
+    a_max : float
+        Upper bound
+    N_a : int
+        Number of grid points
+
+    Returns
+    -------
+    np.ndarray
+    """
+
+    x_max = np.log(np.log(a_max - a_min + 1.0) + 1.0)
+    x = np.linspace(0.0, x_max, N_a)
+    grid_a = a_min + np.exp(np.exp(x) - 1.0) - 1.0
+    # Eliminate rounding errors at the upper bound
+    grid_a[-1] = a_max
+
+    return grid_a
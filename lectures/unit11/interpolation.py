@@ -0,0 +1,59 @@
+"""
+Batched linear interpolation routines.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+
+
+def interp_rows(x, xp, fp, extrapolate=False):
+    """
+    Linearly interpolate each row of a 2-dimensional array of function
+    values at a given set of points.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        Points at which to interpolate. If `fp` is 2-dimensional, `x` must
+        have the same number of rows as `fp`.
+    xp : np.ndarray
+        x-coordinates of the data points, either of shape (N, ) if these
+        are common to all rows of `fp`, or of shape (M, N). Each row must
+        be increasing.
+    fp : np.ndarray
+        Function values at `xp`, either of shape (N, ) or (M, N).
+    extrapolate : bool, optional
+        If True, linearly extrapolate outside of the range of `xp`.
+        Otherwise, use the boundary values as is done by np.interp.
+
+    Returns
+    -------
+    np.ndarray
+        Interpolated values with the same shape as `x`.
+    """
+
+    x = np.asarray(x)
+
+    if fp.ndim == 1:
+        fx = np.interp(x, xp, fp)
+    else:
+        # The loop over rows is short (usually the number of income
+        # states), while np.interp locates all points within a row in a
+        # single pass in compiled code.
+        xp = np.broadcast_to(xp, fp.shape)
+        fx = np.empty(x.shape)
+        for i in range(fp.shape[0]):
+            fx[i] = np.interp(x[i], xp[i], fp[i])
+
+    if extrapolate:
+        # Use slopes of the first and last segment in each row
+        x0, x1, xm, xn = (xp[..., i, None] for i in (0, 1, -2, -1))
+        f0, f1, fm, fn = (fp[..., i, None] for i in (0, 1, -2, -1))
+        fx = np.where(x < x0, f0 + (f1 - f0) / (x1 - x0) * (x - x0), fx)
+        fx = np.where(x > xn, fn + (fn - fm) / (xn - xm) * (x - xn), fx)
+
+    return fx
@@ -0,0 +1,279 @@
+"""
+Compiled kernels for the inner loops of the VFI and EGM solvers.
+
+The kernels are compiled with Numba if it is installed. Solvers select them
+with backend='numba' and fall back to their NumPy implementation
+otherwise.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import warnings
+from math import log, sqrt
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+HAS_NUMBA = njit is not None
+
+
+def _jit(func):
+    # Compile function if Numba is available, otherwise return it unchanged
+    if HAS_NUMBA:
+        return njit(cache=True)(func)
+    return func
+
+
+def resolve_backend(backend):
+    """
+    Determine the backend that is actually used for a requested backend.
+
+    Parameters
+    ----------
+    backend : str
+        Requested backend, either 'numpy' or 'numba'
+
+    Returns
+    -------
+    str
+        Backend to use. This is 'numpy' if 'numba' was requested but Numba
+        is not installed.
+    """
+
+    if backend not in ('numpy', 'numba'):
+        msg = f'Unknown backend: {backend}'
+        raise ValueError(msg)
+
+    if backend == 'numba' and not HAS_NUMBA:
+        msg = 'Numba is not installed, falling back to NumPy backend'
+        warnings.warn(msg, RuntimeWarning, stacklevel=3)
+        backend = 'numpy'
+
+    return backend
+
+
+@_jit
+def _util(cons, gamma):
+    # CRRA utility of a single consumption level
+    if cons <= 0.0:
+        return -np.inf
+    elif gamma == 1.0:
+        return log(cons)
+    else:
+        return (cons**(1.0 - gamma) - 1.0) / (1.0 - gamma)
+
+
+@_jit
+def _interp(x, xp, fp):
+    # Linearly interpolate at a single point, using boundary values
+    # outside of the range of xp (same as np.interp)
+    N = xp.shape[0]
+    if x <= xp[0]:
+        return fp[0]
+    elif x >= xp[N-1]:
+        return fp[N-1]
+
+    # Bisection to find bracketing interval
+    ilo, ihi = 0, N - 1
+    while ihi - ilo > 1:
+        imid = (ilo + ihi) // 2
+        if xp[imid] <= x:
+            ilo = imid
+        else:
+            ihi = imid
+
+    wgt = (x - xp[ilo]) / (xp[ihi] - xp[ilo])
+    return fp[ilo] + wgt * (fp[ihi] - fp[ilo])
+
+
+@_jit
+def bellman_grid(cah, grid_a, vcont, beta, gamma, monotone, vfun_out, pfun_out):
+    """
+    Perform one maximisation step of VFI with grid search.
+
+    Parameters
+    ----------
+    cah : np.ndarray
+        Cash-at-hand for each (y, a) grid point, shape (N_y, N_a)
+    grid_a : np.ndarray
+        Asset grid
+    vcont : np.ndarray
+        (Expected) continuation value for each (y, a'), shape (N_y, N_a)
+    beta : float
+        Discount factor
+    gamma : float
+        Coefficient of relative risk aversion
+    monotone : bool
+        If true, exploit monotonicity of the savings policy and
+        concavity of the objective to restrict the search over a'.
+    vfun_out : np.ndarray
+        Array where the maximised value is stored
+    pfun_out : np.ndarray
+        Array where the index of the optimal a' is stored
+    """
+
+    N_y, N_a = cah.shape
+
+    for iy in range(N_y):
+        ia_start = 0
+        for ia in range(N_a):
+            vmax = -np.inf
+            ia_max = ia_start
+            for ia_to in range(ia_start, N_a):
+                cons = cah[iy, ia] - grid_a[ia_to]
+                if cons < 0.0:
+                    # a' and all subsequent choices are infeasible
+                    break
+                v = _util(cons, gamma) + beta * vcont[iy, ia_to]
+                if v > vmax or ia_to == ia_start:
+                    vmax = v
+                    ia_max = ia_to
+                elif monotone:
+                    # Objective is concave in a', stop once it falls
+                    break
+
+            vfun_out[iy, ia] = vmax
+            pfun_out[iy, ia] = ia_max
+
+            if monotone:
+                ia_start = ia_max
+
+
+@_jit
+def bellman_interp(cah, grid_a, vcont, beta, gamma, xtol, maxiter,
+                   vfun_out, pfun_out):
+    """
+    Perform one maximisation step of VFI with linear interpolation of the
+    continuation value, using golden-section search at each grid point.
+
+    Parameters
+    ----------
+    cah : np.ndarray
+        Cash-at-hand for each (y, a) grid point, shape (N_y, N_a)
+    grid_a : np.ndarray
+        Asset grid
+    vcont : np.ndarray
+        (Expected) continuation value for each (y, a'), shape (N_y, N_a)
+    beta : float
+        Discount factor
+    gamma : float
+        Coefficient of relative risk aversion
+    xtol : float
+        Absolute tolerance on the optimal savings level
+    maxiter : int
+        Max. number of golden-section iterations
+    vfun_out : np.ndarray
+        Array where the maximised value is stored
+    pfun_out : np.ndarray
+        Array where the optimal savings level is stored
+    """
+
+    N_y, N_a = cah.shape
+    invphi = (sqrt(5.0) - 1.0) / 2.0
+
+    for iy in range(N_y):
+        for ia in range(N_a):
+            x = cah[iy, ia]
+            a, b = 0.0, x
+            c = b - invphi * (b - a)
+            d = a + invphi * (b - a)
+            fc = _util(x - c, gamma) + beta * _interp(c, grid_a, vcont[iy])
+            fd = _util(x - d, gamma) + beta * _interp(d, grid_a, vcont[iy])
+
+            for it in range(maxiter):
+                if b - a < xtol:
+                    break
+                if fc > fd:
+                    b, d, fd = d, c, fc
+                    c = b - invphi * (b - a)
+                    fc = _util(x - c, gamma) \
+                        + beta * _interp(c, grid_a, vcont[iy])
+                else:
+                    a, c, fc = c, d, fd
+                    d = a + invphi * (b - a)
+                    fd = _util(x - d, gamma) \
+                        + beta * _interp(d, grid_a, vcont[iy])
+
+            if fc > fd:
+                xmax, fmax = c, fc
+            else:
+                xmax, fmax = d, fd
+
+            # Check for corner solution at lower bound
+            flb = _util(x, gamma) + beta * _interp(0.0, grid_a, vcont[iy])
+            if flb >= fmax:
+                xmax, fmax = 0.0, flb
+
+            vfun_out[iy, ia] = fmax
+            pfun_out[iy, ia] = xmax
+
+
+@_jit
+def egm_step(pfun_c, cah, grid_a, grid_y, tm_y, beta, gamma, r, pfun_c_out):
+    """
+    Perform one EGM iteration on the consumption policy function.
+
+    Parameters
+    ----------
+    pfun_c : np.ndarray
+        Consumption policy function from previous iteration, shape (N_y, N_a)
+    cah : np.ndarray
+        Cash-at-hand for each (y, a) grid point, shape (N_y, N_a)
+    grid_a : np.ndarray
+        Asset grid, also used as grid for savings
+    grid_y : np.ndarray
+        Labour income grid
+    tm_y : np.ndarray
+        Transition matrix of the labour income process
+    beta : float
+        Discount factor
+    gamma : float
+        Coefficient of relative risk aversion
+    r : float
+        Interest rate
+    pfun_c_out : np.ndarray
+        Array where the updated consumption policy is stored
+    """
+
+    N_y, N_a = pfun_c.shape
+
+    # Marginal utility tomorrow, computed only once for each (y', a')
+    mu = np.empty((N_y, N_a))
+    for iy in range(N_y):
+        for ia in range(N_a):
+            mu[iy, ia] = pfun_c[iy, ia]**(-gamma)
+
+    cons_sav = np.empty(N_a)
+    assets_sav = np.empty(N_a)
+
+    for iy in range(N_y):
+        for ia in range(N_a):
+            # Expected marginal utility
+            emu = 0.0
+            for iy_to in range(N_y):
+                emu += tm_y[iy, iy_to] * mu[iy_to, ia]
+            # Invert Euler equation and use budget constraint to get
+            # beginning-of-period assets
+            cons_sav[ia] = (beta * (1.0 + r) * emu)**(-1.0/gamma)
+            assets_sav[ia] = (cons_sav[ia] + grid_a[ia] - grid_y[iy]) / (1.0 + r)
+
+        # Interpolate back onto exogenous grid. Both grids are increasing,
+        # so the bracketing interval can be found by walking forward.
+        j = 0
+        for ia in range(N_a):
+            a = grid_a[ia]
+            if a <= assets_sav[0]:
+                # HH does not save and consumes entire cash-at-hand
+                pfun_c_out[iy, ia] = cah[iy, ia]
+                continue
+            while j < N_a - 2 and assets_sav[j+1] < a:
+                j += 1
+            wgt = (a - assets_sav[j]) / (assets_sav[j+1] - assets_sav[j])
+            pfun_c_out[iy, ia] = cons_sav[j] + wgt * (cons_sav[j+1] - cons_sav[j])
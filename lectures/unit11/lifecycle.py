@@ -0,0 +1,138 @@
+"""
+Solve the finite-horizon (life-cycle) household problem with risky labour
+income by backward induction, using the batched EGM step from EGM_risk.py.
+
+Labour income at age t is income_profile[t] * y, where y follows the
+Markov chain in par.grid_y and par.tm_y. Households survive from age t
+to t+1 with probability surv[t] and have no bequest motive, so the
+effective discount factor at age t is beta * surv[t].
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import os.path
+from dataclasses import replace
+
+import numpy as np
+
+from EGM_risk import egm_update
+
+
+def policy_array(shape, filename=None):
+    """
+    Allocate contiguous array for policy functions, optionally memory-mapped
+    to disk.
+
+    Parameters
+    ----------
+    shape : tuple
+        Array shape
+    filename : str, optional
+        If given, create memory-mapped .npy file with this name. The file
+        can later be loaded with np.load(filename, mmap_mode='r').
+
+    Returns
+    -------
+    np.ndarray or np.memmap
+    """
+
+    if filename is None:
+        return np.empty(shape)
+
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    return np.lib.format.open_memmap(
+        filename, mode='w+', dtype=np.float64, shape=shape
+    )
+
+
+def egm_lifecycle(par, T, income_profile=None, surv=None, mmap_dir=None):
+    """
+    Solve life-cycle problem with stochastic labour income using EGM.
+
+    Households consume all cash-at-hand in the last period. Each earlier
+    age requires a single EGM step for all income states at once.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters. If par.grid_y is None, labour income is
+        deterministic and equal to par.y times the income profile.
+    T : int
+        Number of periods
+    income_profile : np.ndarray, optional
+        Age-dependent scaling of labour income, shape (T, ). Defaults to 1.
+    surv : np.ndarray, optional
+        Probability to survive from age t to t+1, shape (T, ). The last
+        element is ignored. Defaults to 1.
+    mmap_dir : str, optional
+        If given, policy functions are stored in memory-mapped files
+        pfun_a.npy and pfun_c.npy in this directory instead of in RAM.
+
+    Returns
+    -------
+    pfun_a : np.ndarray
+        Savings policy functions, shape (T, N_y, N_a)
+    pfun_c : np.ndarray
+        Consumption policy functions, shape (T, N_y, N_a)
+    """
+
+    if par.grid_y is None:
+        # Deterministic income is a special case with a single state
+        par = replace(par, grid_y=np.array([par.y]), tm_y=np.ones((1, 1)))
+
+    if income_profile is None:
+        income_profile = np.ones(T)
+    if surv is None:
+        surv = np.ones(T)
+    income_profile = np.asarray(income_profile, dtype=float)
+    surv = np.asarray(surv, dtype=float)
+
+    if T < 1:
+        raise ValueError('Number of periods must be positive')
+    if income_profile.shape != (T, ) or surv.shape != (T, ):
+        msg = 'Income profile and survival probabilities must have shape (T, )'
+        raise ValueError(msg)
+    if np.any(income_profile <= 0.0):
+        raise ValueError('Income profile must be positive')
+    if np.any(surv < 0.0) or np.any(surv > 1.0):
+        raise ValueError('Survival probabilities must be in [0, 1]')
+
+    shape = (T, par.N_y, par.N_a)
+
+    if mmap_dir is None:
+        pfun_a = policy_array(shape)
+        pfun_c = policy_array(shape)
+    else:
+        pfun_a = policy_array(shape, os.path.join(mmap_dir, 'pfun_a.npy'))
+        pfun_c = policy_array(shape, os.path.join(mmap_dir, 'pfun_c.npy'))
+
+    for t in reversed(range(T)):
+
+        # Labour income and cash-at-hand at age t
+        grid_y = income_profile[t] * par.grid_y
+        cah = (1.0 + par.r) * par.grid_a[None] + grid_y[:, None]
+
+        beta = par.beta * surv[t]
+
+        if t == T - 1 or beta == 0.0:
+            # No continuation value: consume entire cash-at-hand
+            pfun_c[t] = cah
+        else:
+            egm_update(
+                par, pfun_c[t + 1], cah, out=pfun_c[t], grid_y=grid_y,
+                beta=beta
+            )
+
+        np.subtract(cah, pfun_c[t], out=pfun_a[t])
+
+    if mmap_dir is not None:
+        pfun_a.flush()
+        pfun_c.flush()
+
+    return pfun_a, pfun_c
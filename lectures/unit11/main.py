@@ -10,28 +10,25 @@ Author: Richard Foltyn
 
 #%% Imports and definitions
 
-import numpy as np
+import logging
 
-from dataclasses import dataclass
+from dataclasses import replace
 
 from VFI import vfi_grid, vfi_interp
 from EGM import egm
+from grids import power_grid
+from parameters import Parameters
 from plots import plot_solution
+from telemetry import LoggingCollector
 
-#%% Create model parameters
+# Report solver progress via the logging module
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+progress = LoggingCollector()
 
-@dataclass
-class Parameters:
-    """
-    Define object to store model parameters and their default values
-    """
-    beta = 0.96
-    gamma = 1.0
-    y = 1.0
-    r = 0.04
-    grid_a = None
+#%% Create model parameters
 
-par = Parameters()
+# Parameters object with default values (see parameters.py)
+par = Parameters(beta=0.96, gamma=1.0, y=1.0, r=0.04)
 
 #%% Create asset grid
 
@@ -40,22 +37,22 @@ a_min = 0.0
 a_max = 10.0
 # Number of grid points
 N_a = 50
-# Create asset grid with more points at the beginning
-grid_a  = a_min + (a_max - a_min) * np.linspace(0.0, 1.0, N_a)**1.4
+# Create asset grid with more points at the beginning (see grids.py for
+# alternatives)
+grid_a = power_grid(a_min, a_max, N_a)
 
-# Store asset grid in Parameters object
-par.grid_a = grid_a
+# Parameters are immutable, create copy which contains asset grid
+par = replace(par, grid_a=grid_a)
 
 #%% Solve HH problem using VFI + grid search
 
-vfun, pfun_ia = vfi_grid(par)
+vfun, pfun_ia = vfi_grid(par, callback=progress)
 
 # Recover savings policy function from optimal asset indices
 pfun_a = par.grid_a[pfun_ia]
 
 # Recover consumption policy function from budget constraint
-cah = (1.0 + par.r) * par.grid_a + par.y
-pfun_c = cah - pfun_a
+pfun_c = par.cah - pfun_a
 
 # Plot results
 fig, axes = plot_solution(par, pfun_a, pfun_c, vfun)
@@ -66,11 +63,10 @@ fig, axes = plot_solution(par, pfun_a, pfun_c, vfun)
 
 #%% Solve HH problem using VFI + interpolation
 
-vfun, pfun_a = vfi_interp(par)
+vfun, pfun_a = vfi_interp(par, callback=progress)
 
 # Recover consumption policy function from budget constraint
-cah = (1.0 + par.r) * par.grid_a + par.y
-pfun_c = cah - pfun_a
+pfun_c = par.cah - pfun_a
 
 # Plot results
 fig, axes = plot_solution(par, pfun_a, pfun_c, vfun)
@@ -80,7 +76,7 @@ fig, axes = plot_solution(par, pfun_a, pfun_c, vfun)
 
 #%% Solve HH problem using EGM
 
-pfun_a, pfun_c = egm(par)
+pfun_a, pfun_c = egm(par, callback=progress)
 
 # Plot results
 fig, axes = plot_solution(par, pfun_a, pfun_c)
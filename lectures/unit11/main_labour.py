@@ -0,0 +1,78 @@
+"""
+Main script to solve household problem with risky labour income and
+endogenous labour supply, using either VFI + grid search or EGM.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+#%% Imports and definitions
+
+import logging
+
+import numpy as np
+
+from dataclasses import replace
+
+from VFI_labour import vfi_grid, egm
+from grids import power_grid
+from markov import discretize, markov_ergodic_dist
+from parameters import Parameters
+from plots import plot_solution
+from telemetry import LoggingCollector
+
+# Report solver progress via the logging module
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+progress = LoggingCollector()
+
+#%% Create model parameters
+
+# Parameters object with default values (see parameters.py), including
+# weight on leisure chi and the wage rate w
+par = Parameters(beta=0.96, gamma=1.0, r=0.04, chi=1.0, w=1.0)
+
+#%% Create asset and labour grids
+
+# Create asset grid with more points at the beginning
+N_a = 50
+grid_a = power_grid(0.0, 10.0, N_a)
+
+# Discretise labour income process using Rouwenhorst method (cached)
+N_y = 3
+states, tm_y = discretize(N_y, mu=0.0, rho=par.rho, sigma=par.sigma)
+
+# Normalise states such that unconditional expectation is 1.0
+edist = markov_ergodic_dist(tm_y)
+grid_y = np.exp(states)
+grid_y /= np.dot(edist, grid_y)
+
+par = replace(par, grid_a=grid_a, grid_y=grid_y, tm_y=tm_y)
+
+#%% Solve HH problem using VFI + grid search
+
+# Labour supply for given (a, a') is determined by the intratemporal FOC.
+# Use labour='grid' to restrict labour supply to a grid instead.
+vfun, pfun_ia, pfun_l = vfi_grid(par, labour='foc', callback=progress)
+
+# Recover savings policy function from optimal asset indices
+pfun_a = par.grid_a[pfun_ia]
+
+# Recover consumption policy function from budget constraint
+labour_income = par.w * par.grid_y[:, None] * pfun_l
+pfun_c = (1.0 + par.r) * par.grid_a + labour_income - pfun_a
+
+# Plot results
+fig, axes = plot_solution(par, pfun_a, pfun_c, vfun, pfun_l=pfun_l)
+labels = [f'$y={y:.2f}$' for y in par.grid_y]
+axes[0].legend(labels, loc='upper left')
+
+#%% Solve HH problem using EGM
+
+pfun_a, pfun_c, pfun_l = egm(par, callback=progress)
+
+# Plot results
+fig, axes = plot_solution(par, pfun_a, pfun_c, pfun_l=pfun_l)
+labels = [f'$y={y:.2f}$' for y in par.grid_y]
+axes[0].legend(labels, loc='upper left')
@@ -10,53 +10,59 @@ Author: Richard Foltyn
 
 #%% Imports and definitions
 
+import logging
+
 import numpy as np
 
-from dataclasses import dataclass
+from dataclasses import replace
 
 from VFI_risk import vfi_grid, vfi_interp
 from EGM_risk import egm
-from markov import rouwenhorst, markov_ergodic_dist
+from grids import power_grid
+from lifecycle import egm_lifecycle
+from aiyagari import solve_equilibrium
+from markov import discretize, markov_ergodic_dist
+from distribution import stationary_distribution
+from simulate import simulate_moments
+from parameters import Parameters
 from plots import plot_solution
+from telemetry import LoggingCollector
+
+# Report solver progress via the logging module
+logging.basicConfig(level=logging.INFO, format='%(message)s')
+progress = LoggingCollector()
 
 #%% Create model parameters
 
-@dataclass
-class Parameters:
-    """
-    Define object to store model parameters and their default values
-    """
-    beta = 0.96         # Discount factor
-    gamma = 1.0         # Risk aversion
-    r = 0.04            # Interest rate
-    rho = 0.95          # Autocorrelation of log labour income
-    sigma = 0.20        # Conditional standard deviation of log labour income
-    grid_a = None       # Asset grid (to be created)
-    grid_y = None       # Discretised labour income grid (to be created)
-    tm_y = None         # Labour transition matrix (to be created)
-
-par = Parameters()
+# Parameters object with default values (see parameters.py). The interest
+# rate is set well below 1/beta - 1: as beta*(1+r) approaches 1, households
+# accumulate (almost) unbounded buffer stocks and the stationary distribution
+# cannot be computed on any reasonable asset grid.
+par = Parameters(beta=0.96, gamma=1.0, r=0.03, rho=0.95, sigma=0.20)
 
 #%% Create asset grid
 
-# Start + end point for asset grid
+# Start + end point for asset grid. The grid needs to be wide enough for the
+# stationary distribution to put (almost) no mass on its upper bound, as
+# savings above the grid are truncated (see distribution.py).
 a_min = 0.0
-a_max = 10.0
+a_max = 50.0
 # Number of grid points
-N_a = 50
-# Create asset grid with more points at the beginning
-grid_a  = a_min + (a_max - a_min) * np.linspace(0.0, 1.0, N_a)**1.4
+N_a = 100
+# Create asset grid with more points at the beginning (see grids.py for
+# alternatives)
+grid_a = power_grid(a_min, a_max, N_a)
 
-# Store asset grid in Parameters object
-par.grid_a = grid_a
+# Parameters are immutable, create copy which contains asset grid
+par = replace(par, grid_a=grid_a)
 
 #%% Create labour grid
 
 # Number of grid points
 N_y = 3
 
-# Discretise labour income process
-states, tm_y = rouwenhorst(N_y, mu=0.0, rho=par.rho, sigma=par.sigma)
+# Discretise labour income process using Rouwenhorst method (cached)
+states, tm_y = discretize(N_y, mu=0.0, rho=par.rho, sigma=par.sigma)
 
 # Ergodic distribution of labour income
 edist = markov_ergodic_dist(tm_y)
@@ -68,19 +74,26 @@ grid_y = np.exp(states)
 grid_y /= np.dot(edist, grid_y)
 
 # Store labour grid and transition matrix
-par.grid_y = grid_y
-par.tm_y = tm_y
+par = replace(par, grid_y=grid_y, tm_y=tm_y)
+
+#%% Create asset grid adapted to the solution (optional)
+
+# Add grid points where Euler equation errors are largest, mostly close to
+# the kink where the borrowing constraint starts to bind. Uncomment to
+# solve the model on the adapted grid instead.
+# from adaptive import adaptive_grid
+# grid_a = adaptive_grid(par, a_min, a_max, N_a)
+# par = replace(par, grid_a=grid_a)
 
 #%% Solve HH problem using VFI + grid search
 
-vfun, pfun_ia = vfi_grid(par)
+vfun, pfun_ia = vfi_grid(par, callback=progress)
 
 # Recover savings policy function from optimal asset indices
 pfun_a = par.grid_a[pfun_ia]
 
 # Recover consumption policy function from budget constraint
-cah = (1.0 + par.r) * par.grid_a + par.grid_y[:, None]
-pfun_c = cah - pfun_a
+pfun_c = par.cah - pfun_a
 
 # Plot results
 fig, axes = plot_solution(par, pfun_a, pfun_c, vfun)
@@ -94,11 +107,10 @@ axes[0].legend(labels, loc='upper left')
 
 #%% Solve HH problem using VFI + interpolation
 
-vfun, pfun_a = vfi_interp(par)
+vfun, pfun_a = vfi_interp(par, callback=progress)
 
 # Recover consumption policy function from budget constraint
-cah = (1.0 + par.r) * par.grid_a + par.grid_y[:, None]
-pfun_c = cah - pfun_a
+pfun_c = par.cah - pfun_a
 
 # Plot results
 fig, axes = plot_solution(par, pfun_a, pfun_c, vfun)
@@ -111,7 +123,7 @@ axes[0].legend(labels, loc='upper left')
 
 #%% Solve HH problem using EGM
 
-pfun_a, pfun_c = egm(par)
+pfun_a, pfun_c = egm(par, callback=progress)
 
 # Plot results
 fig, axes = plot_solution(par, pfun_a, pfun_c)
@@ -120,4 +132,58 @@ labels = [f'$y={y:.2f}$' for y in par.grid_y]
 axes[0].legend(labels, loc='upper left')
 
 # Optionally save graph as PDF
-# fig.savefig('solution_risk_egm.pdf')
\ No newline at end of file
+# fig.savefig('solution_risk_egm.pdf')
+
+#%% Stationary distribution implied by EGM solution
+
+dist, A, C = stationary_distribution(par, pfun_a, pfun_c, callback=progress)
+
+print(f'Aggregate assets: {A:.4f}, aggregate consumption: {C:.4f}')
+
+#%% Simulate cross-sectional moments for a large panel of households
+
+moments = simulate_moments(par, pfun_a, N=100000, T=200, seed=1234)
+
+print(f'Simulated mean assets in period T: {moments["mean_a"][-1]:.4f}')
+
+#%% Solve life-cycle problem using EGM with backward induction
+
+# Number of periods, retirement age
+T = 60
+T_retire = 45
+
+# Labour income profile: retirement benefits replace 40% of labour income
+income_profile = np.where(np.arange(T) < T_retire, 1.0, 0.4)
+
+# Survival probabilities, decreasing after retirement
+surv = np.where(np.arange(T) < T_retire, 1.0, 0.95)
+
+pfun_a_lc, pfun_c_lc = egm_lifecycle(par, T, income_profile, surv)
+
+# Plot policy functions at the beginning of working life
+fig, axes = plot_solution(par, pfun_a_lc[0], pfun_c_lc[0])
+labels = [f'$y={y:.2f}$' for y in par.grid_y]
+axes[0].legend(labels, loc='upper left')
+
+#%% Solve for the general equilibrium interest rate (Aiyagari model)
+
+# Interest rate and wage are determined by a Cobb-Douglas firm with
+# capital share alpha and depreciation rate delta. Household solutions are
+# cached and warm-started across interest rates.
+eq = solve_equilibrium(par, alpha=0.36, delta=0.08, callback=progress)
+
+print(f'Equilibrium interest rate: {eq.r:.4f}, wage: {eq.w:.4f}, '
+      f'capital: {eq.K:.4f}')
+
+#%% Derivatives of aggregate moments for calibration
+
+# Aggregate assets and consumption and their derivatives with respect to
+# beta and sigma, computed by implicit differentiation if JAX is installed
+# and by finite differences otherwise. EGM_jax is only imported here since
+# importing JAX is slow.
+from EGM_jax import HAS_JAX, value_and_jacobian
+
+backend = 'jax' if HAS_JAX else 'numpy'
+values, jac = value_and_jacobian(par, wrt=('beta', 'sigma'), backend=backend)
+
+print(f'dA/dbeta: {jac["A"]["beta"]:.4f}, dA/dsigma: {jac["A"]["sigma"]:.4f}')
@@ -7,7 +7,27 @@ University of Glasgow
 Author: Richard Foltyn
 """
 
+import warnings
+from functools import lru_cache
+
 import numpy as np
+from scipy.sparse import csr_matrix, identity, issparse
+from scipy.sparse.linalg import eigs, spsolve
+from scipy.stats import binom, norm
+
+
+def _check_ar1(n, rho, sigma):
+    # Validate arguments common to all discretisation methods
+    if n < 1:
+        msg = 'Invalid number of states'
+        raise ValueError(msg)
+    if sigma < 0.0:
+        msg = 'Argument sigma must be non-negative'
+        raise ValueError(msg)
+    if abs(rho) >= 1.0:
+        msg = 'Cannot create stationary process with abs(rho) >= 1.0'
+        raise ValueError(msg)
+
 
 def rouwenhorst(n, mu, rho, sigma):
     """
@@ -35,15 +55,7 @@ def rouwenhorst(n, mu, rho, sigma):
             Pi[i,j] = Prob[z'=z_j | z=z_i]
     """
 
-    if n < 1:
-        msg = 'Invalid number of states'
-        raise ValueError(msg)
-    if sigma < 0.0:
-        msg = 'Argument sigma must be non-negative'
-        raise ValueError(msg)
-    if abs(rho) >= 1.0:
-        msg = 'Cannot create stationary process with abs(rho) >= 1.0'
-        raise ValueError(msg)
+    _check_ar1(n, rho, sigma)
 
     if n == 1:
         # Degenerate process on a single state: disregard variance and
@@ -52,14 +64,18 @@ def rouwenhorst(n, mu, rho, sigma):
         Pi = np.ones((1, 1))
         return z, Pi
 
+    # Closed-form transition matrix: state i corresponds to i out of n-1
+    # independent binary components being "on". Each "on" component stays
+    # on with prob. p, each "off" component switches on with prob. 1-p, so
+    # row i is the convolution of Binomial(i, p) and Binomial(n-1-i, 1-p).
     p = (1+rho)/2
-    Pi = np.array([[p, 1-p], [1-p, p]])
+    k = np.arange(n)
+    on = binom.pmf(k[None], k[:, None], p)
+    off = binom.pmf(k[None], n - 1 - k[:, None], 1 - p)
 
-    for i in range(Pi.shape[0], n):
-        tmp = np.pad(Pi, 1, mode='constant', constant_values=0)
-        Pi = p * tmp[1:, 1:] + (1-p) * tmp[1:, :-1] + \
-             (1-p) * tmp[:-1, 1:] + p * tmp[:-1, :-1]
-        Pi[1:-1, :] /= 2
+    Pi = np.empty((n, n))
+    for i in range(n):
+        Pi[i] = np.convolve(on[i, :i+1], off[i, :n-i])
 
     fi = np.sqrt(n-1) * sigma / np.sqrt(1 - rho ** 2)
     z = np.linspace(-fi, fi, n) + mu
@@ -67,16 +83,178 @@ def rouwenhorst(n, mu, rho, sigma):
     return z, Pi
 
 
-def markov_ergodic_dist(transm):
+def tauchen(n, mu, rho, sigma, m=3.0):
+    """
+    Approximate an AR(1) process using the method of
+    Tauchen, Economics Letters (1986), Vol. 20, pp. 177-181.
+
+    Parameters
+    ----------
+    n : int
+        Number of states for discretized Markov process
+    mu : float
+        Unconditional mean or AR(1) process
+    rho : float
+        Autocorrelation of AR(1) process
+    sigma : float
+        Conditional standard deviation of AR(1) innovations
+    m : float, optional
+        Width of the state space in terms of unconditional standard
+        deviations of the process
+
+    Returns
+    -------
+    z : numpy.ndarray
+        Discretized state space
+    Pi : numpy.ndarray
+        Transition matrix of discretized process where
+            Pi[i,j] = Prob[z'=z_j | z=z_i]
+    """
+
+    _check_ar1(n, rho, sigma)
+
+    if n == 1 or sigma == 0.0:
+        z = np.full(n, float(mu))
+        Pi = np.full((n, n), 1.0 / n)
+        return z, Pi
+
+    sigma_z = sigma / np.sqrt(1 - rho ** 2)
+    z = np.linspace(-m * sigma_z, m * sigma_z, n)
+    step = z[1] - z[0]
+
+    # Standardised distance of each bin edge from conditional mean
+    cond_mean = rho * z[:, None]
+    upper = norm.cdf((z[None, :-1] + step / 2 - cond_mean) / sigma)
+
+    # Probability mass in each bin, boundary bins extend to +/- infinity
+    Pi = np.diff(upper, axis=1, prepend=0.0, append=1.0)
+
+    z += mu
+
+    return z, Pi
+
+
+def tauchen_hussey(n, mu, rho, sigma):
+    """
+    Approximate an AR(1) process using Gauss-Hermite quadrature as in
+    Tauchen & Hussey, Econometrica (1991), Vol. 59, pp. 371-396.
+
+    Parameters
+    ----------
+    n : int
+        Number of states for discretized Markov process
+    mu : float
+        Unconditional mean or AR(1) process
+    rho : float
+        Autocorrelation of AR(1) process
+    sigma : float
+        Conditional standard deviation of AR(1) innovations
+
+    Returns
+    -------
+    z : numpy.ndarray
+        Discretized state space
+    Pi : numpy.ndarray
+        Transition matrix of discretized process where
+            Pi[i,j] = Prob[z'=z_j | z=z_i]
+    """
+
+    _check_ar1(n, rho, sigma)
+
+    if n == 1 or sigma == 0.0:
+        z = np.full(n, float(mu))
+        Pi = np.full((n, n), 1.0 / n)
+        return z, Pi
+
+    # Quadrature nodes and weights for the standard normal distribution
+    x, w = np.polynomial.hermite.hermgauss(n)
+    z = np.sqrt(2.0) * sigma * x
+    w = w / np.sqrt(np.pi)
+
+    # Reweight quadrature weights by ratio of conditional density given
+    # z_i to the density the nodes were constructed for.
+    cond_mean = rho * z[:, None]
+    Pi = w[None] * norm.pdf(z[None], cond_mean, sigma) / norm.pdf(z, 0.0, sigma)
+    Pi /= np.sum(Pi, axis=1, keepdims=True)
+
+    z += mu
+
+    return z, Pi
+
+
+@lru_cache(maxsize=256)
+def _discretize(method, n, mu, rho, sigma):
+    # Cached implementation of discretize(). Returned arrays are shared
+    # across calls and therefore made read-only.
+    methods = {
+        'rouwenhorst': rouwenhorst,
+        'tauchen': tauchen,
+        'tauchen-hussey': tauchen_hussey,
+    }
+    if method not in methods:
+        msg = f'Unknown method: {method}'
+        raise ValueError(msg)
+
+    z, Pi = methods[method](n, mu, rho, sigma)
+    z.flags.writeable = False
+    Pi.flags.writeable = False
+
+    return z, Pi
+
+
+def discretize(n, mu, rho, sigma, method='rouwenhorst'):
+    """
+    Approximate an AR(1) process with a Markov chain, caching results
+    for repeated calls with the same arguments.
+
+    Parameters
+    ----------
+    n : int
+        Number of states for discretized Markov process
+    mu : float
+        Unconditional mean or AR(1) process
+    rho : float
+        Autocorrelation of AR(1) process
+    sigma : float
+        Conditional standard deviation of AR(1) innovations
+    method : str, optional
+        One of 'rouwenhorst', 'tauchen' or 'tauchen-hussey'
+
+    Returns
+    -------
+    z : numpy.ndarray
+        Discretized state space (read-only)
+    Pi : numpy.ndarray
+        Transition matrix of discretized process (read-only)
+    """
+    return _discretize(method, int(n), float(mu), float(rho), float(sigma))
+
+
+def markov_ergodic_dist(transm, method='auto', tol=1.0e-12, maxiter=100000):
     """
     Compute the ergodic distribution implied by a given Markov chain transition
     matrix.
 
     Parameters
     ----------
-    transm : numpy.ndarray
+    transm : numpy.ndarray or scipy.sparse matrix
         Markov chain transition matrix where the element at position (i,j)
         represents the transition probability from i to j.
+    method : str, optional
+        One of
+            'solve': Solve the linear system mu' (I - P) = 0 subject to
+                sum(mu) = 1 (LU factorisation, sparse if transm is sparse)
+            'power': Iterate mu' = mu' P until convergence
+            'eigs': Compute the left eigenvector for the unit eigenvalue
+                with ARPACK
+            'auto': Use 'solve' for small dense chains, 'eigs' for sparse
+                or large chains with few non-zero elements, and 'power'
+                otherwise.
+    tol : float, optional
+        Tolerance used to validate the transition matrix and the
+        resulting distribution, and termination tolerance for 'power'.
+    maxiter : int, optional
+        Max. number of iterations for method 'power'
 
     Returns
     -------
@@ -84,16 +262,87 @@ def markov_ergodic_dist(transm):
         Ergodic distribution
     """
 
+    n = transm.shape[0]
+    is_sparse = issparse(transm)
+
+    if transm.shape != (n, n):
+        msg = 'Transition matrix must be square'
+        raise ValueError(msg)
+
     # Check that this is a transition matrix
-    assert np.all(np.abs(transm.sum(axis=1) - 1) < 1e-12)
-    assert np.all(transm >= 0.0)
-
-    transm = transm.transpose()
-    m = transm - np.identity(transm.shape[0])
-    m[-1] = 1
-    m = np.linalg.inv(m)
-    mu = np.ascontiguousarray(m[:, -1])
-    assert np.abs(np.sum(mu) - 1) < 1e-9
+    row_sums = np.ravel(transm.sum(axis=1))
+    if np.any(np.abs(row_sums - 1.0) > tol * max(n, 1)):
+        msg = 'Rows of transition matrix do not sum to 1'
+        raise ValueError(msg)
+    values = transm.data if is_sparse else transm
+    if np.any(values < 0.0):
+        msg = 'Transition matrix contains negative elements'
+        raise ValueError(msg)
+
+    if method == 'auto':
+        if is_sparse:
+            method = 'eigs'
+        elif n <= 2000:
+            method = 'solve'
+        elif np.count_nonzero(transm) < 0.1 * n * n:
+            transm = csr_matrix(transm)
+            is_sparse = True
+            method = 'eigs'
+        else:
+            method = 'power'
+
+    if n == 1:
+        return np.ones(1)
+    elif n < 3 and method == 'eigs':
+        # ARPACK requires at least 3 states
+        method = 'solve'
+
+    if method == 'solve':
+        if is_sparse:
+            # Normalise mu[-1] = 1 and drop the last (redundant) equation
+            # of (I - P') mu = 0, which keeps the system sparse.
+            m = (identity(n, format='csc') - transm.T.tocsc())
+            rhs = m[:-1, -1].toarray().ravel()
+            mu = np.append(spsolve(m[:-1, :-1], -rhs), 1.0)
+        else:
+            # Replace last equation of (P' - I) mu = 0 by the adding-up
+            # constraint sum(mu) = 1
+            rhs = np.zeros(n)
+            rhs[-1] = 1.0
+            m = transm.T - np.identity(n)
+            m[-1] = 1.0
+            mu = np.linalg.solve(m, rhs)
+    elif method == 'power':
+        transm_T = transm.T.tocsr() if is_sparse else transm.T
+        mu = np.full(n, 1.0 / n)
+        for it in range(maxiter):
+            mu_upd = transm_T @ mu
+            diff = np.max(np.abs(mu_upd - mu))
+            mu = mu_upd
+            if diff < tol:
+                break
+        else:
+            msg = f'Power iteration did not converge in {maxiter:d} iterations'
+            warnings.warn(msg, RuntimeWarning, stacklevel=2)
+    elif method == 'eigs':
+        transm_T = transm.T.tocsr() if is_sparse else transm.T
+        v0 = np.full(n, 1.0 / n)
+        vals, vecs = eigs(transm_T, k=1, which='LM', v0=v0, tol=tol)
+        # Eigenvector is only determined up to scale (and sign)
+        mu = np.real(vecs[:, 0])
+    else:
+        msg = f'Unknown method: {method}'
+        raise ValueError(msg)
+
+    mu = np.ascontiguousarray(mu)
+    mu /= np.sum(mu)
+
+    if not np.all(np.isfinite(mu)) or np.any(mu < -np.sqrt(tol)):
+        msg = 'Failed to compute ergodic distribution'
+        raise ValueError(msg)
+
+    # Eliminate numerical noise
+    mu = np.maximum(mu, 0.0)
     mu /= np.sum(mu)
 
     return mu
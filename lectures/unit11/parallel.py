@@ -0,0 +1,152 @@
+"""
+Pool of workers to process labour income states in parallel.
+
+Large arrays are placed in shared memory when using a process pool, so
+they are not pickled and sent to the workers in every iteration.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+# Arrays attached to shared memory in worker processes
+_shared = {}
+_shared_mem = []
+
+
+def _attach(specs):
+    """
+    Attach shared memory blocks in a worker process.
+
+    Parameters
+    ----------
+    specs : dict
+        Maps array names to tuples (shm_name, shape, dtype)
+    """
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = SharedMemory(name=shm_name)
+        _shared_mem.append(shm)
+        _shared[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _call(func, iy, args):
+    # Invoke function in worker process on shared arrays
+    return func(_shared, iy, *args)
+
+
+def _release(pool, shm_list):
+    # Shut down executor and release shared memory blocks. Also called when
+    # the StatePool is garbage-collected without being closed.
+    pool.shutdown()
+    for shm in shm_list:
+        try:
+            shm.close()
+        except BufferError:
+            # Arrays referencing the buffer are still alive, memory is
+            # released once they are garbage-collected.
+            pass
+        shm.unlink()
+    shm_list.clear()
+
+
+class StatePool:
+    """
+    Pool of workers which process income states in parallel.
+
+    Parameters
+    ----------
+    workers : int
+        Number of workers
+    arrays : dict
+        Maps names to arrays which are accessed by the workers. Arrays are
+        copied into shared memory if a process pool is used.
+    executor : str, optional
+        Either 'process' or 'thread'
+
+    Attributes
+    ----------
+    arrays : dict
+        Maps names to arrays that are visible to the workers. Values
+        written to these arrays by the main process are seen by the
+        workers and vice versa.
+    """
+
+    def __init__(self, workers, arrays, executor='process'):
+
+        if executor not in ('process', 'thread'):
+            msg = f'Unknown executor: {executor}'
+            raise ValueError(msg)
+
+        self.arrays = {}
+        self._shm = []
+
+        if executor == 'thread':
+            self.arrays.update(arrays)
+            self._pool = ThreadPoolExecutor(max_workers=workers)
+            self._process = False
+        else:
+            specs = {}
+            for name, arr in arrays.items():
+                arr = np.asarray(arr)
+                shm = SharedMemory(create=True, size=max(arr.nbytes, 1))
+                self._shm.append(shm)
+                shared = np.ndarray(arr.shape, dtype=arr.dtype, buffer=shm.buf)
+                shared[...] = arr
+                self.arrays[name] = shared
+                specs[name] = (shm.name, arr.shape, arr.dtype)
+
+            self._pool = ProcessPoolExecutor(
+                max_workers=workers, initializer=_attach, initargs=(specs, )
+            )
+            self._process = True
+
+        self._finalizer = weakref.finalize(self, _release, self._pool, self._shm)
+
+    def map(self, func, iys, *args):
+        """
+        Call function for each income state in parallel.
+
+        Parameters
+        ----------
+        func : callable
+            Module-level function with signature func(arrays, iy, *args)
+        iys : iterable
+            Indices of income states to process
+        args
+            Additional (small) arguments passed to each function call
+
+        Returns
+        -------
+        list
+            Return values of each function call
+        """
+
+        if self._process:
+            futures = [self._pool.submit(_call, func, iy, args) for iy in iys]
+        else:
+            futures = [
+                self._pool.submit(func, self.arrays, iy, *args) for iy in iys
+            ]
+
+        return [f.result() for f in futures]
+
+    def close(self):
+        """
+        Shut down workers and release shared memory.
+        """
+        # Drop references to buffers before releasing shared memory
+        self.arrays.clear()
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
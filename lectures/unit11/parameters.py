@@ -0,0 +1,207 @@
+"""
+Model parameters and grids of the household problem.
+
+Parameters objects are immutable and validated on creation. Arrays derived
+from parameters and grids (cash-at-hand, feasible choices, cumulative
+transition probabilities) are computed the first time they are needed and
+then cached, so solvers do not recompute them in every call. Parameters
+objects are hashable and can be used as dictionary keys.
+
+Use dataclasses.replace() to create a copy with some attributes changed.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import hashlib
+from dataclasses import dataclass, field, fields, replace
+
+import numpy as np
+
+from markov import discretize, markov_ergodic_dist
+
+
+def _readonly(x):
+    # Return read-only float copy of array argument
+    x = np.array(x, dtype=float)
+    x.flags.writeable = False
+    return x
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Parameters:
+    """
+    Model parameters and grids. Labour income is deterministic and equal
+    to y if no income grid is given, and follows a Markov chain with states
+    grid_y and transition matrix tm_y otherwise.
+    """
+    beta: float = 0.96              # Discount factor
+    gamma: float = 1.0              # Risk aversion
+    r: float = 0.04                 # Interest rate
+    y: float = 1.0                  # Labour income (deterministic model)
+    rho: float = 0.95               # Autocorrelation of log labour income
+    sigma: float = 0.20             # Cond. std. dev. of log labour income
+    chi: float = 1.0                # Weight on leisure (endogenous labour)
+    w: float = 1.0                  # Wage rate (endogenous labour)
+    grid_a: np.ndarray = None       # Asset grid
+    grid_y: np.ndarray = None       # Labour income grid (risky model)
+    tm_y: np.ndarray = None         # Labour transition matrix (risky model)
+    utility: object = None          # Preferences, CRRA(gamma) if None
+    # Cache for derived arrays
+    _cache: dict = field(
+        default_factory=dict, init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self):
+        if not 0.0 < self.beta < 1.0:
+            raise ValueError('Discount factor must be in (0, 1)')
+        if self.gamma <= 0.0:
+            msg = 'Coefficient of relative risk aversion must be positive'
+            raise ValueError(msg)
+        if self.r <= -1.0:
+            raise ValueError('Interest rate must be larger than -1')
+        if self.chi <= 0.0 or self.w <= 0.0:
+            raise ValueError('Leisure weight and wage must be positive')
+
+        if self.grid_a is not None:
+            grid_a = _readonly(self.grid_a)
+            if grid_a.ndim != 1 or len(grid_a) < 2:
+                raise ValueError('Asset grid must be 1-d with at least 2 points')
+            if np.any(np.diff(grid_a) <= 0.0):
+                raise ValueError('Asset grid must be strictly increasing')
+            object.__setattr__(self, 'grid_a', grid_a)
+
+        if (self.grid_y is None) != (self.tm_y is None):
+            msg = 'Labour grid and transition matrix must be given together'
+            raise ValueError(msg)
+
+        if self.grid_y is not None:
+            grid_y = _readonly(self.grid_y)
+            tm_y = _readonly(self.tm_y)
+            N_y = len(grid_y)
+            if grid_y.ndim != 1 or tm_y.shape != (N_y, N_y):
+                msg = 'Transition matrix must have shape (N_y, N_y)'
+                raise ValueError(msg)
+            if np.any(tm_y < 0.0) or np.any(np.abs(tm_y.sum(axis=1) - 1.0) > 1.0e-8):
+                msg = 'Rows of transition matrix must be probability distributions'
+                raise ValueError(msg)
+            object.__setattr__(self, 'grid_y', grid_y)
+            object.__setattr__(self, 'tm_y', tm_y)
+
+    def _key(self):
+        # Tuple of scalar attributes and hash of array contents which
+        # identifies a Parameters object.
+        key = self._cache.get('key')
+        if key is None:
+            h = hashlib.sha1()
+            scalars = []
+            for f in fields(self):
+                value = getattr(self, f.name)
+                if f.name == '_cache':
+                    continue
+                elif isinstance(value, np.ndarray):
+                    h.update(f'{f.name}{value.shape}'.encode())
+                    h.update(value.tobytes())
+                elif f.name == 'utility':
+                    scalars.append(repr(value))
+                else:
+                    scalars.append(value)
+            key = tuple(scalars) + (h.hexdigest(), )
+            self._cache['key'] = key
+        return key
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def _derived(self, name, func):
+        # Return cached derived array, computing it on first access
+        value = self._cache.get(name)
+        if value is None:
+            value = func()
+            value.flags.writeable = False
+            self._cache[name] = value
+        return value
+
+    @property
+    def N_a(self):
+        """
+        Number of asset grid points
+        """
+        return len(self.grid_a)
+
+    @property
+    def N_y(self):
+        """
+        Number of labour income states, 1 for deterministic labour income
+        """
+        return 1 if self.grid_y is None else len(self.grid_y)
+
+    @property
+    def cah(self):
+        """
+        Cash-at-hand at each asset grid point, shape (N_a, ) for
+        deterministic and (N_y, N_a) for risky labour income.
+        """
+        def f():
+            if self.grid_y is None:
+                return (1.0 + self.r) * self.grid_a + self.y
+            else:
+                return (1.0 + self.r) * self.grid_a[None] + self.grid_y[:, None]
+        return self._derived('cah', f)
+
+    @property
+    def n_feasible(self):
+        """
+        Number of feasible choices a' (those which satisfy a' <= cah) at each
+        grid point, same shape as cah. Feasible choices are
+        grid_a[:n_feasible].
+        """
+        return self._derived(
+            'n_feasible',
+            lambda: np.searchsorted(self.grid_a, self.cah, side='right')
+        )
+
+    @property
+    def cdf_y(self):
+        """
+        Cumulative transition probabilities of labour income, last column
+        is exactly 1.
+        """
+        def f():
+            cdf = np.cumsum(self.tm_y, axis=1)
+            cdf[:, -1] = 1.0
+            return cdf
+        return self._derived('cdf_y', f)
+
+
+def with_income(par, N_y):
+    """
+    Return copy of Parameters object with labour income process discretised
+    using its current values of rho and sigma.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+    N_y : int
+        Number of labour income states
+
+    Returns
+    -------
+    Parameters
+    """
+
+    states, tm_y = discretize(N_y, mu=0.0, rho=par.rho, sigma=par.sigma)
+    edist = markov_ergodic_dist(tm_y)
+    grid_y = np.exp(states)
+    # Normalise states such that unconditional expectation is 1.0
+    grid_y /= np.dot(edist, grid_y)
+
+    return replace(par, grid_y=grid_y, tm_y=tm_y)
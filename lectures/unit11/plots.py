@@ -11,7 +11,7 @@ Author: Richard Foltyn
 import matplotlib.pyplot as plt
 import numpy as np
 
-def plot_solution(par, pfun_a, pfun_c, vfun=None, xlim=None):
+def plot_solution(par, pfun_a, pfun_c, vfun=None, xlim=None, pfun_l=None):
     """
     Plot solution to household problem.
 
@@ -27,6 +27,8 @@ def plot_solution(par, pfun_a, pfun_c, vfun=None, xlim=None):
         Array containing value function. The default is None.
     xlim : tuple, optional
         Plot limits for x-axis. The default is None.
+    pfun_l : np.ndarray, optional
+        Array containing labour supply policy function. The default is None.
 
     Returns
     -------
@@ -38,7 +40,7 @@ def plot_solution(par, pfun_a, pfun_c, vfun=None, xlim=None):
     """
 
     # Number of columns
-    ncols = 3 if vfun is not None else 2
+    ncols = 2 + (vfun is not None) + (pfun_l is not None)
 
     fig, axes = plt.subplots(
         nrows=1, ncols=ncols, 
@@ -84,13 +86,23 @@ def plot_solution(par, pfun_a, pfun_c, vfun=None, xlim=None):
     axes[1].set_xlim(xlim)
     axes[1].grid(**grid)
 
+    # Plot labour supply, if present
+    icol = 2
+    if pfun_l is not None:
+        axes[icol].plot(xvalues, pfun_l[..., :imax].T, **style)
+        axes[icol].set_title(r'Labour supply $\ell$')
+        axes[icol].set_xlabel('Assets')
+        axes[icol].set_xlim(xlim)
+        axes[icol].grid(**grid)
+        icol += 1
+
     # Plot value function, if present
     if vfun is not None:    
-        axes[2].plot(xvalues, vfun[..., :imax].T, **style)
-        axes[2].set_title('Value func. $V$')
-        axes[2].set_xlabel('Assets')
-        axes[2].set_xlim(xlim)
-        axes[2].grid(**grid)
+        axes[icol].plot(xvalues, vfun[..., :imax].T, **style)
+        axes[icol].set_title('Value func. $V$')
+        axes[icol].set_xlabel('Assets')
+        axes[icol].set_xlim(xlim)
+        axes[icol].grid(**grid)
 
     fig.tight_layout()
 
@@ -0,0 +1,212 @@
+"""
+Simulate a panel of households for the model with risky labour income.
+
+All households are simulated simultaneously: in each period, savings are
+obtained with one vectorized interpolation of the policy function and
+next-period income states are drawn by inverting the cumulative
+transition probabilities.
+
+Assets are kept on the asset grid using the same rule as the histogram
+method in distribution.py: savings outside of the grid are assigned to the
+boundary points, so simulated moments are comparable to those implied by
+the stationary distribution.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+
+from distribution import lottery
+from markov import markov_ergodic_dist
+
+
+def draw_states(cdf, iy, u):
+    """
+    Draw next-period Markov states by inverting the conditional CDF.
+
+    Parameters
+    ----------
+    cdf : np.ndarray
+        Cumulative transition probabilities, cdf[i, j] = Prob[z' <= z_j | z=z_i]
+    iy : np.ndarray
+        Current state of each household
+    u : np.ndarray
+        Uniform random draws on [0, 1), one for each household
+
+    Returns
+    -------
+    np.ndarray
+        Next-period state of each household
+    """
+
+    N_y = cdf.shape[1]
+    # Shift CDF of row i to (i, i+1] so that a single sorted search finds
+    # the next state for all households, irrespective of their current state.
+    cdf_flat = (cdf + np.arange(cdf.shape[0])[:, None]).ravel()
+    idx = np.searchsorted(cdf_flat, u + iy, side='right') - iy * N_y
+
+    # Guard against rounding of u + iy up to iy + 1
+    return np.minimum(idx, N_y - 1)
+
+
+def _periods(par, pfun_a, N, T, seed, a_init, iy_init):
+    """
+    Generator which yields the cross-section of households in each period.
+
+    Yields
+    ------
+    a : np.ndarray
+        Beginning-of-period assets
+    a_to : np.ndarray
+        Savings
+    c : np.ndarray
+        Consumption
+    iy : np.ndarray
+        Index of labour income state
+    """
+
+    grid_a, grid_y = par.grid_a, par.grid_y
+
+    if np.issubdtype(pfun_a.dtype, np.integer):
+        # Policy returned by VFI grid search contains indices of optimal
+        # savings levels
+        pfun_a = grid_a[pfun_a]
+
+    # Cumulative transition probabilities, last column is exactly 1
+    cdf = par.cdf_y
+
+    # Independent random streams for initial conditions and income shocks
+    ss_init, ss_shocks = np.random.SeedSequence(seed).spawn(2)
+    rng_init = np.random.default_rng(ss_init)
+    rng = np.random.default_rng(ss_shocks)
+
+    if iy_init is None:
+        # Draw initial states from ergodic distribution
+        edist = markov_ergodic_dist(par.tm_y)
+        cdf_init = np.cumsum(edist)[None]
+        cdf_init[:, -1] = 1.0
+        iy = draw_states(cdf_init, np.zeros(N, dtype=int), rng_init.random(N))
+    else:
+        iy = np.array(np.broadcast_to(iy_init, N), dtype=int)
+
+    if a_init is None:
+        a = np.full(N, grid_a[0])
+    else:
+        a = np.array(np.broadcast_to(a_init, N), dtype=float)
+
+    for t in range(T):
+        # Interpolate savings policy at each household's (y, a). The asset
+        # grid is the same for all income states, so bracketing indices
+        # are determined once for all households.
+        ilo, wgt = lottery(a, grid_a)
+        a_to = wgt * pfun_a[iy, ilo] + (1.0 - wgt) * pfun_a[iy, ilo + 1]
+        # Savings outside of the grid are assigned to the boundary points
+        a_to = np.clip(a_to, grid_a[0], grid_a[-1])
+
+        # Recover consumption from budget constraint
+        c = (1.0 + par.r) * a + grid_y[iy] - a_to
+
+        yield a, a_to, c, iy
+
+        iy = draw_states(cdf, iy, rng.random(N))
+        a = a_to
+
+
+def simulate(par, pfun_a, N=10000, T=100, seed=None, a_init=None,
+             iy_init=None):
+    """
+    Simulate panel of households and store the full histories.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters and grids
+    pfun_a : np.ndarray
+        Savings policy function, shape (N_y, N_a). Can also be an integer
+        array of asset indices as returned by vfi_grid().
+    N : int, optional
+        Number of households
+    T : int, optional
+        Number of periods
+    seed : int, optional
+        Seed for the random number generator
+    a_init : float or np.ndarray, optional
+        Initial assets. Defaults to the lowest asset grid point.
+    iy_init : int or np.ndarray, optional
+        Initial income states. Drawn from the ergodic distribution if
+        not given.
+
+    Returns
+    -------
+    sim_a : np.ndarray
+        Beginning-of-period assets, shape (T, N)
+    sim_c : np.ndarray
+        Consumption, shape (T, N)
+    sim_iy : np.ndarray
+        Index of labour income state, shape (T, N)
+    """
+
+    sim_a = np.empty((T, N))
+    sim_c = np.empty((T, N))
+    sim_iy = np.empty((T, N), dtype=int)
+
+    periods = _periods(par, pfun_a, N, T, seed, a_init, iy_init)
+    for t, (a, a_to, c, iy) in enumerate(periods):
+        sim_a[t] = a
+        sim_c[t] = c
+        sim_iy[t] = iy
+
+    return sim_a, sim_c, sim_iy
+
+
+def simulate_moments(par, pfun_a, N=10000, T=100, seed=None, a_init=None,
+                     iy_init=None):
+    """
+    Simulate panel of households, storing only cross-sectional moments
+    in each period. Memory use is independent of T.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters and grids
+    pfun_a : np.ndarray
+        Savings policy function, shape (N_y, N_a). Can also be an integer
+        array of asset indices as returned by vfi_grid().
+    N : int, optional
+        Number of households
+    T : int, optional
+        Number of periods
+    seed : int, optional
+        Seed for the random number generator
+    a_init : float or np.ndarray, optional
+        Initial assets. Defaults to the lowest asset grid point.
+    iy_init : int or np.ndarray, optional
+        Initial income states. Drawn from the ergodic distribution if
+        not given.
+
+    Returns
+    -------
+    dict
+        Maps 'mean_a', 'std_a', 'mean_c', 'std_c', 'mean_y', 'std_y' and
+        'frac_constrained' (share of households with savings at the lowest
+        grid point) to arrays of length T.
+    """
+
+    names = (
+        'mean_a', 'std_a', 'mean_c', 'std_c', 'mean_y', 'std_y',
+        'frac_constrained'
+    )
+    moments = {name: np.empty(T) for name in names}
+
+    periods = _periods(par, pfun_a, N, T, seed, a_init, iy_init)
+    for t, (a, a_to, c, iy) in enumerate(periods):
+        y = par.grid_y[iy]
+        moments['mean_a'][t], moments['std_a'][t] = np.mean(a), np.std(a)
+        moments['mean_c'][t], moments['std_c'][t] = np.mean(c), np.std(c)
+        moments['mean_y'][t], moments['std_y'][t] = np.mean(y), np.std(y)
+        moments['frac_constrained'][t] = np.mean(a_to <= par.grid_a[0])
+
+    return moments
@@ -0,0 +1,58 @@
+"""
+Registry of the VFI and EGM solvers, shared by benchmark.py and sweep.py,
+and recovery of policy functions from their return values.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import EGM
+import EGM_risk
+import VFI
+import VFI_risk
+
+# Solvers for each model
+SOLVERS = {
+    'deterministic': {
+        'vfi_grid': VFI.vfi_grid,
+        'vfi_interp': VFI.vfi_interp,
+        'egm': EGM.egm,
+    },
+    'risky': {
+        'vfi_grid': VFI_risk.vfi_grid,
+        'vfi_interp': VFI_risk.vfi_interp,
+        'egm': EGM_risk.egm,
+    },
+}
+
+
+def policies(par, solver_name, sol):
+    """
+    Recover savings and consumption policies from a solver's return value.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+    solver_name : str
+        One of 'vfi_grid', 'vfi_interp' or 'egm'
+    sol : tuple
+        Solution returned by the solver
+
+    Returns
+    -------
+    pfun_a : np.ndarray
+    pfun_c : np.ndarray
+    """
+
+    if solver_name == 'egm':
+        return sol
+
+    pfun_a = sol[1]
+    if solver_name == 'vfi_grid':
+        # Grid search returns indices of optimal savings levels
+        pfun_a = par.grid_a[pfun_a]
+
+    return pfun_a, par.cah - pfun_a
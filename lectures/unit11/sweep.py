@@ -0,0 +1,408 @@
+"""
+Solve the household problem with risky labour income for all combinations
+of parameter values, distributing independent solves across a process pool.
+
+Each worker receives the base parameters and grids once when it is started,
+individual tasks only contain the parameter values that differ. Workers
+write policy functions directly into memory-mapped arrays in the output
+directory, while the main process appends summary statistics to a CSV file
+as tasks finish. Completed tasks are recorded in a manifest, so an
+interrupted sweep resumes where it stopped when run again with the same
+output directory.
+
+Output directory layout:
+    tasks.json      Sweep configuration and parameters of each task
+    pfun_a.npy      Savings policies, shape (N_tasks, N_y, N_a)
+    pfun_c.npy      Consumption policies, shape (N_tasks, N_y, N_a)
+    summary.csv     One row of parameters and statistics per task. The
+                    column mass_max contains the mass on the last asset
+                    grid point: aggregates are biased unless it is close
+                    to zero.
+    manifest.txt    Indices of completed tasks
+
+Usage:
+    python sweep.py --beta 0.94 0.96 --gamma 1 2 --sigma 0.1 0.2 \\
+        --workers 4 --output sweep_results
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os.path
+import sys
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import replace
+from time import perf_counter
+
+import numpy as np
+
+from diagnostics import euler_error_stats
+from distribution import stationary_distribution
+from grids import power_grid
+from parameters import Parameters, with_income
+from solvers import SOLVERS, policies
+from telemetry import MemoryCollector
+
+# Parameters which can be varied in a sweep
+SWEEP_FIELDS = ('beta', 'gamma', 'r', 'rho', 'sigma')
+
+# State of a worker process, set by _init_worker()
+_worker = {}
+
+
+def parameter_grid(values):
+    """
+    Create list of all combinations of parameter values.
+
+    Parameters
+    ----------
+    values : dict
+        Maps parameter names to sequences of values
+
+    Returns
+    -------
+    list of dict
+    """
+
+    for name in values:
+        if name not in SWEEP_FIELDS:
+            msg = f'Cannot sweep over parameter: {name}'
+            raise ValueError(msg)
+
+    names = list(values)
+    return [
+        dict(zip(names, map(float, combination)))
+        for combination in itertools.product(*values.values())
+    ]
+
+
+def _init_worker(par, solver_name, output, kwargs):
+    """
+    Store data shared by all tasks in a worker process.
+    """
+    _worker['par'] = par
+    _worker['solver_name'] = solver_name
+    _worker['kwargs'] = kwargs
+    _worker['out'] = None
+    if output is not None:
+        _worker['out'] = {
+            name: np.load(os.path.join(output, f'{name}.npy'), mmap_mode='r+')
+            for name in ('pfun_a', 'pfun_c')
+        }
+
+
+def _run_task(itask, values):
+    """
+    Solve household problem for a single combination of parameter values.
+    Executed by worker processes.
+
+    Parameters
+    ----------
+    itask : int
+        Task index
+    values : dict
+        Parameter values which differ from the base parameters
+
+    Returns
+    -------
+    dict
+        Parameter values and summary statistics
+    """
+
+    par = replace(_worker['par'], **values)
+    if 'rho' in values or 'sigma' in values:
+        par = with_income(par, par.N_y)
+
+    solver_name = _worker['solver_name']
+    solver = SOLVERS['risky'][solver_name]
+    collector = MemoryCollector()
+
+    with warnings.catch_warnings():
+        # Non-convergence is recorded in the results instead
+        warnings.simplefilter('ignore', RuntimeWarning)
+
+        t0 = perf_counter()
+        sol = solver(par, callback=collector, **_worker['kwargs'])
+        time = perf_counter() - t0
+
+    pfun_a, pfun_c = policies(par, solver_name, sol)
+    dist, A, C = stationary_distribution(par, pfun_a, pfun_c)
+
+    max_err, mean_err = euler_error_stats(par, pfun_a, pfun_c)
+
+    out = _worker['out']
+    if out is not None:
+        out['pfun_a'][itask] = pfun_a
+        out['pfun_c'][itask] = pfun_c
+        out['pfun_a'].flush()
+        out['pfun_c'].flush()
+
+    record = {
+        'task': itask,
+        **values,
+        'time': time,
+        'iterations': collector.iterations,
+        'converged': collector.converged,
+        # Mass truncated at the upper bound of the asset grid
+        'mass_max': float(np.sum(dist[:, -1])),
+        'euler_max': float(max_err),
+        'euler_mean': float(mean_err),
+        'A': float(A),
+        'C': float(C),
+    }
+
+    return record
+
+
+def _prepare_output(output, config, shape):
+    """
+    Create output files, or check that existing files belong to the same
+    sweep and return indices of tasks which were completed.
+    """
+
+    path = os.path.join(output, 'tasks.json')
+    if os.path.isfile(path):
+        with open(path) as f:
+            config_prev = json.load(f)
+        if config_prev != config:
+            msg = f'Output directory {output} contains a different sweep'
+            raise ValueError(msg)
+
+        with open(os.path.join(output, 'manifest.txt')) as f:
+            completed = {int(line) for line in f if line.strip()}
+        return completed
+
+    os.makedirs(output, exist_ok=True)
+    for name in ('pfun_a', 'pfun_c'):
+        arr = np.lib.format.open_memmap(
+            os.path.join(output, f'{name}.npy'), mode='w+',
+            dtype=np.float64, shape=shape
+        )
+        del arr
+    # Create empty files
+    for name in ('summary.csv', 'manifest.txt'):
+        open(os.path.join(output, name), 'w').close()
+    # Write configuration last: directory is only considered valid once
+    # all other files exist.
+    with open(path, 'w') as f:
+        json.dump(config, f, indent=2)
+
+    return set()
+
+
+def sweep(par, values, solver_name='egm', N_y=3, output=None, workers=None,
+          verbose=False, **kwargs):
+    """
+    Solve household problem for all combinations of parameter values.
+
+    Parameters
+    ----------
+    par : Parameters
+        Base parameters, including the asset grid
+    values : dict
+        Maps names of parameters in SWEEP_FIELDS to sequences of values
+    solver_name : str, optional
+        One of 'vfi_grid', 'vfi_interp' or 'egm'
+    N_y : int, optional
+        Number of labour income states
+    output : str, optional
+        Output directory. If it contains results from an interrupted sweep
+        with the same configuration, only tasks which were not completed
+        are run.
+    workers : int, optional
+        Number of worker processes. Defaults to the number of CPUs. If 1,
+        all tasks are run in the calling process.
+    verbose : bool, optional
+        If true, print a line for each completed task
+    kwargs
+        Additional keyword arguments passed to the solver
+
+    Returns
+    -------
+    list of dict
+        Summary records of tasks completed in this call, in the order in
+        which they finished. Failed tasks are reported with a warning.
+    """
+
+    tasks = parameter_grid(values)
+    par = with_income(par, N_y)
+    N_a = len(par.grid_a)
+
+    completed = set()
+    if output is not None:
+        config = {
+            'solver': solver_name,
+            'grid_a': par.grid_a.tolist(),
+            'N_y': N_y,
+            'base': {name: getattr(par, name) for name in SWEEP_FIELDS},
+            'kwargs': {k: repr(v) for k, v in sorted(kwargs.items())},
+            'tasks': tasks,
+        }
+        shape = (len(tasks), N_y, N_a)
+        completed = _prepare_output(output, config, shape)
+
+    pending = [i for i in range(len(tasks)) if i not in completed]
+    initargs = (par, solver_name, output, kwargs)
+
+    summary = None
+    manifest = None
+    if output is not None:
+        summary = open(os.path.join(output, 'summary.csv'), 'a', newline='')
+        manifest = open(os.path.join(output, 'manifest.txt'), 'a')
+
+    records = []
+
+    def finish(itask, record):
+        records.append(record)
+        if summary is not None:
+            writer = csv.DictWriter(summary, fieldnames=list(record))
+            if summary.tell() == 0:
+                writer.writeheader()
+            writer.writerow(record)
+            summary.flush()
+            # Record completion only after results have been written
+            manifest.write(f'{itask}\n')
+            manifest.flush()
+            os.fsync(manifest.fileno())
+        if verbose:
+            params = ' '.join(f'{k}={v:g}' for k, v in tasks[itask].items())
+            print(f'Task {itask:4d} {params}: {record["time"]:.3f} sec., '
+                  f'A={record["A"]:.4f}')
+
+    def fail(itask, exc):
+        msg = f'Task {itask} {tasks[itask]} failed: {exc!r}'
+        warnings.warn(msg, RuntimeWarning, stacklevel=3)
+
+    try:
+        if workers == 1:
+            _init_worker(*initargs)
+            for itask in pending:
+                try:
+                    record = _run_task(itask, tasks[itask])
+                except Exception as exc:
+                    fail(itask, exc)
+                else:
+                    finish(itask, record)
+        else:
+            with ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker,
+                initargs=initargs
+            ) as pool:
+                futures = {
+                    pool.submit(_run_task, itask, tasks[itask]): itask
+                    for itask in pending
+                }
+                for future in as_completed(futures):
+                    itask = futures[future]
+                    try:
+                        record = future.result()
+                    except Exception as exc:
+                        fail(itask, exc)
+                    else:
+                        finish(itask, record)
+    finally:
+        if summary is not None:
+            summary.close()
+            manifest.close()
+
+    return records
+
+
+def load_results(output):
+    """
+    Load results of a sweep.
+
+    Parameters
+    ----------
+    output : str
+        Output directory
+
+    Returns
+    -------
+    tasks : list of dict
+        Parameter values of each task
+    summary : list of dict
+        Summary records of completed tasks, sorted by task index
+    pfun_a : np.ndarray
+        Memory-mapped savings policies, shape (N_tasks, N_y, N_a). Entries
+        of tasks which have not completed are undefined.
+    pfun_c : np.ndarray
+        Memory-mapped consumption policies
+    """
+
+    with open(os.path.join(output, 'tasks.json')) as f:
+        tasks = json.load(f)['tasks']
+
+    with open(os.path.join(output, 'manifest.txt')) as f:
+        completed = {int(line) for line in f if line.strip()}
+
+    # Tasks interrupted after writing their summary may appear more than
+    # once, keep the last record of each completed task.
+    records = {}
+    with open(os.path.join(output, 'summary.csv'), newline='') as f:
+        for rec in csv.DictReader(f):
+            for name, value in rec.items():
+                if value in ('True', 'False'):
+                    rec[name] = value == 'True'
+                else:
+                    rec[name] = float(value)
+            rec['task'] = int(rec['task'])
+            rec['iterations'] = int(rec['iterations'])
+            if rec['task'] in completed:
+                records[rec['task']] = rec
+    summary = [records[itask] for itask in sorted(records)]
+
+    pfun_a = np.load(os.path.join(output, 'pfun_a.npy'), mmap_mode='r')
+    pfun_c = np.load(os.path.join(output, 'pfun_c.npy'), mmap_mode='r')
+
+    return tasks, summary, pfun_a, pfun_c
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+    """
+
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    for name in SWEEP_FIELDS:
+        parser.add_argument(f'--{name}', nargs='+', type=float)
+    parser.add_argument(
+        '--solver', default='egm', choices=list(SOLVERS['risky'])
+    )
+    parser.add_argument('--N-a', type=int, default=100)
+    parser.add_argument('--N-y', type=int, default=3)
+    # Default parameters imply large buffer stocks, so the asset grid must
+    # be wide to avoid truncating the stationary distribution.
+    parser.add_argument('--a-max', type=float, default=200.0)
+    parser.add_argument('--workers', type=int, help='Number of processes')
+    parser.add_argument('--output', required=True, help='Output directory')
+    args = parser.parse_args(argv)
+
+    values = {
+        name: getattr(args, name) for name in SWEEP_FIELDS
+        if getattr(args, name) is not None
+    }
+
+    par = Parameters(grid_a=power_grid(0.0, args.a_max, args.N_a))
+
+    tasks = parameter_grid(values)
+    records = sweep(
+        par, values, args.solver, args.N_y, args.output, args.workers,
+        verbose=True
+    )
+    _, summary, _, _ = load_results(args.output)
+    print(f'Completed {len(records)} tasks in this run, '
+          f'{len(summary)} of {len(tasks)} in total.')
+
+    return 0 if len(summary) == len(tasks) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
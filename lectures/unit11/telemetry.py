@@ -0,0 +1,173 @@
+"""
+Collect convergence information from iterative solvers.
+
+Solvers accept a `callback` argument which is called once per iteration
+with an IterationRecord. By default, solvers report nothing. Use
+LoggingCollector to report progress via the logging module, or
+MemoryCollector to keep all records for later analysis.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import logging
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IterationRecord:
+    """
+    Convergence information for a single iteration
+    """
+    solver: str             # Name of the solver, e.g. 'VFI' or 'EGM'
+    iteration: int          # Number of iterations completed (starting at 1)
+    diff: float             # Sup-norm distance to previous iterate
+    elapsed: float          # Wall time since solver was started
+    time_max: float         # Time spent in maximisation (or EGM) step
+    converged: bool         # True if termination tolerance was reached
+
+
+def report(callback, solver, it, diff, elapsed, time_max, tol):
+    """
+    Pass record for current iteration to callback, if any.
+
+    Parameters
+    ----------
+    callback : callable or None
+        Function (or collector) receiving the IterationRecord
+    solver : str
+        Name of the solver
+    it : int
+        Zero-based iteration index
+    diff : float
+        Sup-norm distance to previous iterate
+    elapsed : float
+        Wall time since solver was started
+    time_max : float
+        Time spent in maximisation step in this iteration
+    tol : float
+        Termination tolerance
+    """
+    if callback is not None:
+        record = IterationRecord(
+            solver, it + 1, float(diff), elapsed, time_max, bool(diff < tol)
+        )
+        callback(record)
+
+
+def warn_not_converged(solver, maxiter, diff):
+    """
+    Warn that a solver did not converge.
+
+    Parameters
+    ----------
+    solver : str
+        Name of the solver
+    maxiter : int
+        Max. number of iterations
+    diff : float
+        Sup-norm distance in the last iteration
+    """
+    msg = f'{solver}: Did not converge in {maxiter:d} iterations: ' \
+          f'diff={diff:4.2e}'
+    warnings.warn(msg, RuntimeWarning, stacklevel=3)
+
+
+class NullCollector:
+    """
+    Collector which discards all records.
+    """
+
+    def __call__(self, record):
+        pass
+
+
+class LoggingCollector:
+    """
+    Collector which reports progress using the logging module.
+
+    Parameters
+    ----------
+    logger : logging.Logger, optional
+        Logger to use. Defaults to the logger of this module.
+    level : int, optional
+        Logging level
+    every : int, optional
+        Report every `every` iterations. Convergence is always reported.
+    """
+
+    def __init__(self, logger=None, level=logging.INFO, every=10):
+        self.logger = logger if logger is not None else _logger
+        self.level = level
+        self.every = every
+
+    def __call__(self, record):
+        if record.converged:
+            self.logger.log(
+                self.level,
+                '%s: Converged after %d iterations (%.3f sec.): diff=%4.2e',
+                record.solver, record.iteration, record.elapsed, record.diff
+            )
+        elif record.iteration == 1 or record.iteration % self.every == 0:
+            self.logger.log(
+                self.level, '%s: Iteration %4d, diff=%4.2e',
+                record.solver, record.iteration, record.diff
+            )
+
+
+class MemoryCollector:
+    """
+    Collector which stores all records in memory.
+
+    Attributes
+    ----------
+    records : list of IterationRecord
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def __call__(self, record):
+        self.records.append(record)
+
+    def clear(self):
+        """
+        Discard all stored records.
+        """
+        self.records = []
+
+    @property
+    def iterations(self):
+        """
+        Number of iterations performed by the last solver call.
+        """
+        return self.records[-1].iteration if self.records else 0
+
+    @property
+    def converged(self):
+        """
+        True if the last recorded iteration reached the tolerance.
+        """
+        return bool(self.records) and self.records[-1].converged
+
+    def as_arrays(self):
+        """
+        Return stored records as a dictionary of arrays.
+
+        Returns
+        -------
+        dict
+            Maps field names of IterationRecord to arrays
+        """
+        names = IterationRecord.__dataclass_fields__.keys()
+        return {
+            name: np.array([getattr(rec, name) for rec in self.records])
+            for name in names
+        }
@@ -0,0 +1,47 @@
+"""
+Tests that the derivatives of aggregate moments computed by implicit
+differentiation in EGM_jax.py agree with central finite differences
+computed with the NumPy solver.
+
+Run with
+    python -m pytest test_EGM_jax.py
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('jax')
+
+from EGM_jax import FIELDS, MOMENTS, value_and_jacobian
+from grids import power_grid
+from parameters import Parameters, with_income
+
+
+@pytest.fixture
+def par():
+    # Small model whose stationary distribution puts no mass on the upper
+    # bound of the asset grid
+    par = Parameters(
+        beta=0.95, gamma=2.0, r=0.02, grid_a=power_grid(0.0, 50.0, 40)
+    )
+    return with_income(par, 3)
+
+
+@pytest.mark.parametrize('income', ['rouwenhorst', 'fixed'])
+def test_value_and_jacobian(par, income):
+    wrt = FIELDS if income == 'rouwenhorst' else ('beta', 'gamma', 'r')
+    values_jax, jac_jax = value_and_jacobian(
+        par, wrt=wrt, income=income, backend='jax'
+    )
+    values_fd, jac_fd = value_and_jacobian(
+        par, wrt=wrt, income=income, backend='numpy'
+    )
+    for m in MOMENTS:
+        assert np.isclose(values_jax[m], values_fd[m], rtol=1.0e-6)
+        for name in wrt:
+            assert np.isclose(jac_jax[m][name], jac_fd[m][name], rtol=1.0e-3)
@@ -0,0 +1,73 @@
+"""
+Regression tests for the variants of the VFI solvers in VFI.py and
+VFI_risk.py: Howard's improvement algorithm, monotone grid search and
+golden-section search.
+
+Run with
+    python -m pytest test_VFI.py
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+import pytest
+from scipy.optimize import minimize_scalar
+
+import VFI
+import VFI_risk
+from VFI import golden_section_max
+from grids import power_grid
+from parameters import Parameters, with_income
+
+
+@pytest.fixture(params=['deterministic', 'risky'])
+def model(request):
+    # Solver module and parameters for each model
+    if request.param == 'deterministic':
+        par = Parameters(gamma=2.0, grid_a=power_grid(0.0, 10.0, 60))
+        return VFI, par
+    else:
+        par = Parameters(gamma=2.0, r=0.02, grid_a=power_grid(0.0, 30.0, 60))
+        return VFI_risk, with_income(par, 3)
+
+
+@pytest.mark.parametrize(
+    'kwargs', [{'method': 'monotone'}, {'howard_steps': 10}],
+    ids=['monotone', 'howard']
+)
+def test_vfi_grid(model, kwargs):
+    # Variants must find the same fixed point as the plain loop
+    solver, par = model
+    vfun, pfun_ia = solver.vfi_grid(par, tol=1.0e-8)
+    vfun_alt, pfun_ia_alt = solver.vfi_grid(par, tol=1.0e-8, **kwargs)
+    assert np.array_equal(pfun_ia, pfun_ia_alt)
+    assert np.allclose(vfun, vfun_alt, atol=1.0e-6)
+
+
+def test_vfi_interp_golden(model):
+    solver, par = model
+    vfun, pfun_a = solver.vfi_interp(par, tol=1.0e-8)
+    vfun_gs, pfun_a_gs = solver.vfi_interp(par, tol=1.0e-8, optimizer='golden')
+    assert np.allclose(vfun, vfun_gs, atol=1.0e-6)
+    assert np.allclose(pfun_a, pfun_a_gs, atol=1.0e-5)
+
+
+def test_golden_section_max():
+    # Batch of concave problems with maxima inside and at the boundaries
+    # of the search interval
+    centre = np.array([-0.5, 0.3, 1.0, 2.5])
+    ub = np.full_like(centre, 2.0)
+    f = lambda x: np.log(1.0 + x) - (x - centre)**2
+
+    xmax, fmax = golden_section_max(f, 0.0, ub)
+
+    for i, c in enumerate(centre):
+        res = minimize_scalar(
+            lambda x: -(np.log(1.0 + x) - (x - c)**2), bounds=(0.0, ub[i]),
+            method='bounded', options={'xatol': 1.0e-10}
+        )
+        assert np.isclose(xmax[i], res.x, atol=1.0e-6)
+        assert np.isclose(fmax[i], -res.fun, atol=1.0e-10)
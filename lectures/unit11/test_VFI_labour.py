@@ -0,0 +1,45 @@
+"""
+Tests that the VFI and EGM solvers for the model with endogenous labour
+supply in VFI_labour.py solve the same problem.
+
+Run with
+    python -m pytest test_VFI_labour.py
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+import pytest
+
+from VFI_labour import egm, vfi_grid
+from grids import power_grid
+from parameters import Parameters, with_income
+
+
+@pytest.fixture(params=[1.0, 2.0], ids=['log', 'gamma2'])
+def par(request):
+    return Parameters(
+        beta=0.96, gamma=request.param, r=0.04, chi=1.0, w=1.0,
+        grid_a=power_grid(0.0, 10.0, 100)
+    )
+
+
+@pytest.mark.parametrize('N_y', [None, 3], ids=['deterministic', 'risky'])
+def test_vfi_grid_egm(par, N_y):
+    if N_y is not None:
+        par = with_income(par, N_y)
+
+    vfun, pfun_ia, pfun_l = vfi_grid(par, tol=1.0e-8)
+    pfun_a, pfun_c, pfun_l_egm = egm(par)
+
+    # Both solvers restrict savings to the asset grid
+    assert np.all(pfun_a >= par.grid_a[0])
+    assert np.all(pfun_a <= par.grid_a[-1])
+
+    # Grid search can only choose savings on the grid, so at interior grid
+    # points policies differ by less than the largest grid spacing.
+    diff = np.abs(pfun_a - par.grid_a[pfun_ia])[..., 1:-1]
+    assert np.max(diff) < np.max(np.diff(par.grid_a))
@@ -0,0 +1,58 @@
+"""
+Regression tests for the cache of household solutions in cache.py.
+
+Run with
+    python -m pytest test_cache.py
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from EGM_risk import egm
+from cache import SolutionCache
+from grids import power_grid
+from parameters import Parameters, with_income
+
+
+@pytest.fixture
+def par():
+    par = Parameters(gamma=2.0, r=0.02, grid_a=power_grid(0.0, 30.0, 50))
+    return with_income(par, 3)
+
+
+def test_memory_hit(par):
+    cache = SolutionCache()
+    sol = cache.solve(par, egm)
+    sol_hit = cache.solve(replace(par), egm)
+    assert (cache.hits, cache.misses) == (1, 1)
+    for x, y in zip(sol, sol_hit):
+        assert np.array_equal(x, y)
+        assert not y.flags.writeable
+
+
+def test_disk_hit(par, tmp_path):
+    sol = SolutionCache(directory=tmp_path).solve(par, egm)
+    # New cache only finds the solution on disk
+    cache = SolutionCache(directory=tmp_path)
+    sol_hit = cache.solve(par, egm)
+    assert (cache.hits, cache.misses) == (1, 0)
+    for x, y in zip(sol, sol_hit):
+        assert np.array_equal(x, y)
+
+
+def test_miss(par):
+    # Different parameters or solver options must not be served from the
+    # cache, but are warm-started from the cached solution.
+    cache = SolutionCache()
+    cache.solve(par, egm)
+    cache.solve(replace(par, beta=0.95), egm)
+    cache.solve(par, egm, tol=1.0e-10)
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert cache.warm_starts == 1
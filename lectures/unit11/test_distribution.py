@@ -0,0 +1,49 @@
+"""
+Regression tests for the stationary distribution in distribution.py.
+
+Run with
+    python -m pytest test_distribution.py
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+import pytest
+
+from EGM_risk import egm
+from distribution import stationary_distribution
+from grids import power_grid
+from parameters import Parameters, with_income
+
+
+@pytest.fixture(scope='module')
+def solution():
+    # Asset grid is wide enough that the distribution is not truncated
+    par = Parameters(gamma=2.0, r=0.02, grid_a=power_grid(0.0, 100.0, 100))
+    par = with_income(par, 5)
+    pfun_a, pfun_c = egm(par)
+    return par, pfun_a, pfun_c
+
+
+@pytest.mark.parametrize('method', ['iterate', 'eigs'])
+def test_aggregate_budget(solution, method):
+    # Average labour income is normalised to 1, so in a stationary
+    # distribution aggregate consumption is C = 1 + r*A.
+    par, pfun_a, pfun_c = solution
+    dist, A, C = stationary_distribution(par, pfun_a, pfun_c, method=method)
+    assert np.isclose(np.sum(dist), 1.0)
+    assert np.all(dist >= 0.0)
+    assert np.isclose(C, 1.0 + par.r * A, rtol=0.0, atol=1.0e-8)
+
+
+def test_methods_agree(solution):
+    par, pfun_a, pfun_c = solution
+    dist, A, C = stationary_distribution(par, pfun_a, pfun_c)
+    dist_eigs, A_eigs, C_eigs = stationary_distribution(
+        par, pfun_a, pfun_c, method='eigs'
+    )
+    assert np.allclose(dist, dist_eigs, atol=1.0e-8)
+    assert np.isclose(A, A_eigs)
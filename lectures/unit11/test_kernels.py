@@ -0,0 +1,80 @@
+"""
+Tests that the compiled kernels in kernels.py give the same results as the
+NumPy implementations of the solvers.
+
+Run with
+    python -m pytest test_kernels.py
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip('numba')
+
+import EGM
+import EGM_risk
+import VFI
+import VFI_risk
+from grids import power_grid
+from parameters import Parameters, with_income
+
+
+@pytest.fixture(params=[1.0, 2.0], ids=['log', 'gamma2'])
+def par(request):
+    # Parameters of the deterministic model
+    return Parameters(gamma=request.param, grid_a=power_grid(0.0, 10.0, 50))
+
+
+@pytest.fixture
+def par_risk(par):
+    # Parameters of the model with risky labour income
+    return with_income(par, 3)
+
+
+def assert_solutions_close(sol_numpy, sol_numba):
+    for x, y in zip(sol_numpy, sol_numba):
+        assert np.allclose(x, y)
+
+
+@pytest.mark.parametrize('method', ['loop', 'monotone'])
+def test_vfi_grid(par, method):
+    sol_numpy = VFI.vfi_grid(par, method=method, backend='numpy')
+    sol_numba = VFI.vfi_grid(par, method=method, backend='numba')
+    assert_solutions_close(sol_numpy, sol_numba)
+
+
+@pytest.mark.parametrize('method', ['loop', 'monotone'])
+def test_vfi_grid_risk(par_risk, method):
+    sol_numpy = VFI_risk.vfi_grid(par_risk, method=method, backend='numpy')
+    sol_numba = VFI_risk.vfi_grid(par_risk, method=method, backend='numba')
+    assert_solutions_close(sol_numpy, sol_numba)
+
+
+def test_vfi_interp(par):
+    # Numba kernel performs golden-section search
+    sol_numpy = VFI.vfi_interp(par, optimizer='golden', backend='numpy')
+    sol_numba = VFI.vfi_interp(par, backend='numba')
+    assert_solutions_close(sol_numpy, sol_numba)
+
+
+def test_vfi_interp_risk(par_risk):
+    sol_numpy = VFI_risk.vfi_interp(par_risk, optimizer='golden', backend='numpy')
+    sol_numba = VFI_risk.vfi_interp(par_risk, backend='numba')
+    assert_solutions_close(sol_numpy, sol_numba)
+
+
+def test_egm(par):
+    sol_numpy = EGM.egm(par, backend='numpy')
+    sol_numba = EGM.egm(par, backend='numba')
+    assert_solutions_close(sol_numpy, sol_numba)
+
+
+def test_egm_risk(par_risk):
+    sol_numpy = EGM_risk.egm(par_risk, backend='numpy')
+    sol_numba = EGM_risk.egm(par_risk, backend='numba')
+    assert_solutions_close(sol_numpy, sol_numba)
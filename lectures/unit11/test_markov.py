@@ -0,0 +1,45 @@
+"""
+Regression tests for the Markov chain discretisations and ergodic
+distributions in markov.py.
+
+Run with
+    python -m pytest test_markov.py
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from markov import discretize, markov_ergodic_dist
+
+METHODS = ('rouwenhorst', 'tauchen', 'tauchen-hussey')
+
+
+@pytest.mark.parametrize('method', METHODS)
+@pytest.mark.parametrize('rho', [0.0, 0.9, 0.99])
+def test_transition_rows(method, rho):
+    z, Pi = discretize(7, mu=0.0, rho=rho, sigma=0.2, method=method)
+    assert z.shape == (7, )
+    assert Pi.shape == (7, 7)
+    assert np.all(Pi >= 0.0)
+    assert np.allclose(np.sum(Pi, axis=1), 1.0, rtol=0.0, atol=1.0e-12)
+
+
+@pytest.mark.parametrize('method', METHODS)
+def test_ergodic_dist(method):
+    # All methods must return the same distribution, for dense and sparse
+    # transition matrices
+    _, Pi = discretize(9, mu=0.0, rho=0.95, sigma=0.2, method=method)
+    mu = markov_ergodic_dist(Pi, method='solve')
+    assert np.isclose(np.sum(mu), 1.0)
+    assert np.allclose(mu @ Pi, mu, atol=1.0e-12)
+
+    for transm in (Pi, csr_matrix(Pi)):
+        for alt in ('power', 'eigs', 'auto'):
+            mu_alt = markov_ergodic_dist(transm, method=alt)
+            assert np.allclose(mu, mu_alt, atol=1.0e-9)
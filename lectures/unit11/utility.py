@@ -0,0 +1,355 @@
+"""
+Utility functions shared by the VFI and EGM solvers.
+
+Each preference class provides array-valued utility and marginal utility,
+the inverse of marginal utility (used by EGM), a scalar version for
+solvers which loop over grid points in Python, and lookup tables of
+utility for every (a, a') combination used by grid search.
+
+Solvers obtain preferences from a Parameters object with preferences(par),
+which returns par.utility if it is defined and CRRA utility with risk
+aversion par.gamma otherwise. Other preferences can therefore be plugged
+in by assigning an object with the same interface to par.utility.
+
+Introduction to Python Programming for Economics & Finance, 2023
+University of Glasgow
+
+Author: Richard Foltyn
+"""
+
+import math
+
+import numpy as np
+
+
+def _int_power(x, n):
+    """
+    Compute x**n for positive integer n by repeated squaring, which is
+    faster than calling pow() for each element.
+    """
+    result = None
+    base = x
+    while n > 0:
+        if n & 1:
+            result = base if result is None else result * base
+        n >>= 1
+        if n > 0:
+            base = base * base
+    return result
+
+
+class CRRA:
+    """
+    CRRA utility u(c) = (c**(1-gamma) - 1) / (1-gamma), or log(c) if
+    gamma = 1.
+
+    Specialised code is used for log utility and integer values of gamma,
+    which avoid the comparatively expensive evaluation of general powers.
+
+    Parameters
+    ----------
+    gamma : float
+        Coefficient of relative risk aversion
+    """
+
+    def __init__(self, gamma):
+        if gamma <= 0.0:
+            msg = 'Coefficient of relative risk aversion must be positive'
+            raise ValueError(msg)
+
+        self.gamma = float(gamma)
+        if self.gamma == 1.0:
+            self.kind = 'log'
+        elif self.gamma.is_integer():
+            self.kind = 'integer'
+        else:
+            self.kind = 'general'
+
+    def __repr__(self):
+        return f'CRRA(gamma={self.gamma})'
+
+    def __call__(self, cons):
+        """
+        Evaluate utility for given consumption levels.
+
+        Parameters
+        ----------
+        cons : np.ndarray
+            Consumption levels
+
+        Returns
+        -------
+        np.ndarray
+            Utility, -inf for zero consumption
+        """
+
+        gamma = self.gamma
+        with np.errstate(divide='ignore'):
+            if self.kind == 'log':
+                u = np.log(cons)
+            elif self.kind == 'integer':
+                # c**(1-gamma) = 1 / c**(gamma-1)
+                u = (1.0 / _int_power(cons, int(gamma) - 1) - 1.0) / (1.0 - gamma)
+            else:
+                u = (np.power(cons, 1.0 - gamma) - 1.0) / (1.0 - gamma)
+
+        return u
+
+    def marginal(self, cons):
+        """
+        Evaluate marginal utility c**(-gamma).
+
+        Parameters
+        ----------
+        cons : np.ndarray
+            Consumption levels
+
+        Returns
+        -------
+        np.ndarray
+        """
+
+        with np.errstate(divide='ignore'):
+            if self.kind == 'log':
+                return 1.0 / cons
+            elif self.kind == 'integer':
+                return 1.0 / _int_power(cons, int(self.gamma))
+            else:
+                return np.power(cons, -self.gamma)
+
+    def inverse_marginal(self, mu):
+        """
+        Evaluate the inverse of marginal utility, mu**(-1/gamma).
+
+        Parameters
+        ----------
+        mu : np.ndarray
+            Marginal utility levels
+
+        Returns
+        -------
+        np.ndarray
+            Consumption levels
+        """
+
+        if self.gamma == 1.0:
+            return 1.0 / mu
+        elif self.gamma == 2.0:
+            return 1.0 / np.sqrt(mu)
+        else:
+            return np.power(mu, -1.0 / self.gamma)
+
+    def scalar(self):
+        """
+        Return function which evaluates utility for a single (Python float)
+        consumption level. Zero consumption must be handled by the caller.
+
+        Returns
+        -------
+        callable
+        """
+
+        gamma = self.gamma
+        if self.kind == 'log':
+            return math.log
+        elif gamma == 2.0:
+            return lambda c: 1.0 - 1.0 / c
+        else:
+            return lambda c: (c**(1.0 - gamma) - 1.0) / (1.0 - gamma)
+
+    def table(self, cah, grid_a):
+        """
+        Compute lookup table of utility for every combination of
+        cash-at-hand and next-period assets.
+
+        Parameters
+        ----------
+        cah : np.ndarray
+            Cash-at-hand at each grid point (array of arbitrary shape)
+        grid_a : np.ndarray
+            Grid of candidate next-period asset choices a'
+
+        Returns
+        -------
+        np.ndarray
+            Array of shape cah.shape + (N_a, ) containing the utility of
+            each choice a'. Infeasible choices are assigned -inf.
+        """
+
+        # consumption implied by each choice a'
+        cons = cah[..., None] - grid_a
+        feasible = cons >= 0.0
+
+        u = np.full(cons.shape, -np.inf)
+        u[feasible] = self(cons[feasible])
+
+        return u
+
+
+class LabourCRRA(CRRA):
+    """
+    Utility over consumption and labour supply,
+        u(c, l) = (c**(1-gamma) - 1) / (1-gamma) + chi * log(1 - l)
+    as in the problem with endogenous labour supply from lab 5.
+
+    Utility is additively separable, so marginal utility of consumption
+    and its inverse are the same as for CRRA utility.
+
+    Parameters
+    ----------
+    gamma : float
+        Coefficient of relative risk aversion
+    chi : float
+        Weight on the utility from leisure
+    """
+
+    def __init__(self, gamma, chi):
+        super().__init__(gamma)
+        self.chi = float(chi)
+
+    def __repr__(self):
+        return f'LabourCRRA(gamma={self.gamma}, chi={self.chi})'
+
+    def __call__(self, cons, lab=0.0):
+        """
+        Evaluate utility for given consumption and labour supply levels.
+
+        Parameters
+        ----------
+        cons : np.ndarray
+            Consumption levels
+        lab : np.ndarray, optional
+            Labour supply, fraction of the time endowment
+
+        Returns
+        -------
+        np.ndarray
+        """
+
+        with np.errstate(divide='ignore'):
+            u_lab = self.chi * np.log(1.0 - lab)
+
+        return super().__call__(cons) + u_lab
+
+    def labour_supply(self, cons, wage):
+        """
+        Optimal labour supply implied by the intratemporal first-order
+        condition chi / (1 - l) = wage * c**(-gamma).
+
+        Parameters
+        ----------
+        cons : np.ndarray
+            Consumption levels
+        wage : np.ndarray
+            Labour income per unit of labour supplied
+
+        Returns
+        -------
+        np.ndarray
+            Labour supply, restricted to [0, 1]
+        """
+
+        lab = 1.0 - self.chi / (wage * self.marginal(cons))
+
+        return np.clip(lab, 0.0, 1.0)
+
+    def intratemporal(self, resources, wage, tol=1.0e-12, maxiter=100):
+        """
+        Solve the static problem of choosing consumption and labour supply
+            max_{c,l} u(c, l)  s.t.  c = resources + wage * l,  l in [0, 1]
+        for given resources (non-labour income net of savings).
+
+        The interior solution satisfies c + chi * c**gamma = resources + wage,
+        which is solved in closed form for gamma = 1 and gamma = 2 and by
+        safeguarded Newton iterations otherwise.
+
+        Parameters
+        ----------
+        resources : np.ndarray
+            Non-labour resources available for consumption
+        wage : np.ndarray
+            Labour income per unit of labour supplied
+        tol : float, optional
+            Termination tolerance for Newton iterations
+        maxiter : int, optional
+            Max. number of Newton iterations
+
+        Returns
+        -------
+        cons : np.ndarray
+            Optimal consumption, NaN if the problem has no feasible
+            solution with positive consumption.
+        lab : np.ndarray
+            Optimal labour supply
+        """
+
+        resources, wage = np.broadcast_arrays(
+            np.asarray(resources, dtype=float), np.asarray(wage, dtype=float)
+        )
+        # Max. consumption if all time is spent working
+        cmax = resources + wage
+        chi, gamma = self.chi, self.gamma
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.kind == 'log':
+                cons = cmax / (1.0 + chi)
+            elif gamma == 2.0:
+                cons = (np.sqrt(1.0 + 4.0 * chi * cmax) - 1.0) / (2.0 * chi)
+            else:
+                # Root of f(c) = c + chi * c**gamma - cmax is bracketed by
+                # [0, cmax] as f is increasing.
+                lo = np.zeros_like(cmax)
+                hi = np.maximum(cmax, 0.0)
+                cons = np.minimum(hi, (hi / chi)**(1.0 / gamma))
+                for it in range(maxiter):
+                    f = cons + chi * cons**gamma - cmax
+                    lo = np.where(f < 0.0, cons, lo)
+                    hi = np.where(f > 0.0, cons, hi)
+                    df = 1.0 + gamma * chi * cons**(gamma - 1.0)
+                    cons_new = cons - f / df
+                    # Bisect if Newton step leaves bracket
+                    outside = ~((cons_new > lo) & (cons_new < hi))
+                    cons_new = np.where(outside, 0.5 * (lo + hi), cons_new)
+                    diff = np.nanmax(np.abs(cons_new - cons), initial=0.0)
+                    cons = cons_new
+                    if diff < tol:
+                        break
+
+        # Interior labour supply from budget constraint
+        with np.errstate(invalid='ignore', divide='ignore'):
+            lab = (cons - resources) / wage
+
+        # Corner solution without labour supply if resources suffice to
+        # finance consumption which satisfies the FOC
+        corner = lab <= 0.0
+        cons = np.where(corner, resources, cons)
+        lab = np.where(corner, 0.0, lab)
+
+        # No solution with positive consumption exists
+        infeasible = ~(cmax > 0.0)
+        cons = np.where(infeasible, np.nan, cons)
+        lab = np.where(infeasible, np.nan, lab)
+
+        return cons, lab
+
+
+def preferences(par):
+    """
+    Return preferences used for given model parameters.
+
+    Parameters
+    ----------
+    par : Parameters
+        Model parameters
+
+    Returns
+    -------
+    object
+        par.utility if present, CRRA(par.gamma) otherwise.
+    """
+
+    utility = getattr(par, 'utility', None)
+    if utility is None:
+        utility = CRRA(par.gamma)
+
+    return utility